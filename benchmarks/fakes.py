@@ -0,0 +1,209 @@
+"""Lightweight stand-ins for the discord objects the handlers touch.
+
+They only implement what the cogs actually call, and every "network" call
+just records what would have been sent.
+"""
+import itertools
+from datetime import datetime, timezone
+
+_ids = itertools.count(10 ** 17)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+class FakeAsset:
+    url = "https://cdn.example.invalid/avatar.png"
+
+
+class FakeRole:
+    def __init__(self, guild, name: str, role_id: int = None, default: bool = False):
+        self.id = role_id or next_id()
+        self.guild = guild
+        self.name = name
+        self.managed = False
+        self._default = default
+
+    @property
+    def mention(self) -> str:
+        return f"<@&{self.id}>"
+
+    @property
+    def members(self):
+        return [member for member in self.guild.members if self in member.roles]
+
+    def is_default(self) -> bool:
+        return self._default
+
+    def is_assignable(self) -> bool:
+        return not self._default
+
+    def __eq__(self, other):
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int = None):
+        self.id = channel_id or next_id()
+        self.sent = 0
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+
+class FakeUser:
+    def __init__(self, name: str = "user", user_id: int = None):
+        self.id = user_id or next_id()
+        self.name = name
+        self.display_name = name
+        self.display_avatar = FakeAsset()
+        self.bot = False
+        self.dms = 0
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    async def send(self, content=None, **kwargs):
+        self.dms += 1
+
+
+class FakeMember(FakeUser):
+    def __init__(self, guild, name: str = "member", user_id: int = None):
+        super().__init__(name, user_id)
+        self.guild = guild
+        self.roles = [guild.default_role]
+        self.joined_at = datetime.now(timezone.utc)
+        self.edits = 0
+
+    async def edit(self, roles=None, reason=None, **kwargs):
+        self.edits += 1
+        if roles is not None:
+            self.roles = [self.guild.default_role, *roles]
+
+    async def add_roles(self, *roles, reason=None):
+        await self.edit(roles=[*self.roles[1:], *roles])
+
+    async def remove_roles(self, *roles, reason=None):
+        await self.edit(roles=[role for role in self.roles[1:] if role not in roles])
+
+    async def timeout(self, until, reason=None):
+        await self.edit(timed_out_until=until)
+
+    async def kick(self, reason=None):
+        await self.edit()  # stays cached, so the benchmarks can keep picking it
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int = None, name: str = "Benchmark Guild"):
+        self.id = guild_id or next_id()
+        self.name = name
+        self.unavailable = False
+        self.default_role = FakeRole(self, "@everyone", role_id=self.id, default=True)
+        self._roles = {self.default_role.id: self.default_role}
+        self.members = []
+
+    @property
+    def roles(self):
+        return list(self._roles.values())
+
+    def get_role(self, role_id: int):
+        return self._roles.get(role_id)
+
+    def add_role(self, name: str) -> FakeRole:
+        role = FakeRole(self, name)
+        self._roles[role.id] = role
+        return role
+
+    def get_member(self, user_id: int):
+        return next((member for member in self.members if member.id == user_id), None)
+
+    def add_member(self, name: str = "member") -> FakeMember:
+        member = FakeMember(self, name)
+        self.members.append(member)
+        return member
+
+
+class FakeResponse:
+    def __init__(self):
+        self._done = False
+        self.messages = 0
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.messages += 1
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+
+    async def send_modal(self, modal):
+        self._done = True
+
+
+class FakeMessage:
+    async def edit(self, **kwargs):
+        pass
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages = 0
+
+    async def send(self, content=None, **kwargs):
+        self.messages += 1
+        return FakeMessage()
+
+
+class FakeClient:
+    def __init__(self):
+        self.user = FakeUser("JinuBot")
+        self.user.avatar = FakeAsset()
+        self.latency = 0.05
+        self.channels = {}
+        self.users = {}
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    def get_user(self, user_id: int):
+        return self.users.get(user_id)
+
+    async def fetch_channel(self, channel_id: int):
+        return self.channels[channel_id]
+
+    async def wait_until_ready(self):
+        pass
+
+    def add_channel(self) -> FakeChannel:
+        channel = FakeChannel()
+        self.channels[channel.id] = channel
+        return channel
+
+
+class FakeInteraction:
+    def __init__(self, client: FakeClient, guild: FakeGuild, user: FakeMember):
+        self.client = client
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+        self.extras = {}
+        self.command = None
+
+    async def edit_original_response(self, **kwargs):
+        return FakeMessage()
@@ -0,0 +1,396 @@
+"""End-to-end load test: the real MyBot against a local mock Discord.
+
+The mock REST API/gateway (benchmarks/mock_discord.py) and the traffic
+generator run in a child process, so their work doesn't show up as lag in the
+bot's event loop. The bot process runs MyBot unchanged, with discord.py's API
+and gateway URLs pointed at the mock and a throwaway database.
+
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --rate 500 --duration 60 --guilds 200
+    python -m benchmarks.loadtest --latency 120 --rate-limit 0.05 --mix roles=1,warn=0,confess=0,fun=0
+    python -m benchmarks.loadtest --rate 2 --members 200 --mix bulk=1
+
+Reports per interaction type: how many were acked in time, acked after the
+3-second deadline (rejected) or never acked, plus ack and end-to-end latency,
+and the bot's event-loop lag while under load.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import sqlite3
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_discord import MockDiscord, build_world, user_payload, member_payload, ACK_DEADLINE  # noqa: E402
+
+DEFAULT_MIX = "roles=4,warn=2,confess=1.5,fun=2.5"
+GIF_SEARCHES = ["cat", "dog", "party", "hello", "thank you", "dance"]
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+# --- Traffic generator (runs next to the mock, in the child process) ---
+
+def find_select(components: list):
+    for component in components:
+        if component.get("type") == 3:
+            return component
+        found = find_select(component.get("components", []))
+        if found:
+            return found
+    return None
+
+
+def fill_modal(components: list) -> list:
+    """Mirrors a modal's layout with every text input filled in, like a submitted form."""
+    filled = []
+    for component in components:
+        if component.get("type") == 4:
+            filled.append({"type": 4, "custom_id": component["custom_id"], "value": "Load test confession."})
+        elif "components" in component:
+            filled.append({"type": component["type"], "components": fill_modal(component["components"])})
+        elif "component" in component:
+            filled.append({"type": component["type"], "component": fill_modal([component["component"]])[0]})
+    return filled
+
+
+class TrafficGenerator:
+    """Starts user flows at random (Poisson) intervals, independent of how fast the bot answers."""
+
+    def __init__(self, mock: MockDiscord, rate: float, duration: float, mix: dict, think_time: float):
+        self.mock = mock
+        self.rate = rate
+        self.duration = duration
+        self.mix = mix
+        self.think_time = think_time
+        self.flows = {"roles": self.roles_flow, "warn": self.warn_flow, "confess": self.confess_flow, "fun": self.fun_flow,
+                      "bulk": self.bulk_warn_flow}
+        self.started = None
+        self.finished = None
+
+    async def run(self):
+        kinds = [kind for kind, weight in self.mix.items() if weight > 0]
+        weights = [self.mix[kind] for kind in kinds]
+        tasks = set()
+        self.started = time.perf_counter()
+        deadline = self.started + self.duration
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(random.expovariate(self.rate))
+            task = asyncio.create_task(self.flows[random.choices(kinds, weights)[0]]())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        self.finished = time.perf_counter()
+        # Give flows that are mid-way (and late acks) time to play out.
+        if tasks:
+            await asyncio.wait(tasks, timeout=ACK_DEADLINE * 3 + self.think_time * 10)
+        for task in tasks:
+            task.cancel()
+
+    def pick(self):
+        guild = random.choice(self.mock.world["guilds"])
+        return guild, random.choice(guild["members"][1:])
+
+    async def step(self, kind: str, payload: dict):
+        """Sends one interaction and waits for the bot's callback (None if it never came in time)."""
+        record = await self.mock.send_interaction(kind, payload)
+        try:
+            return await asyncio.wait_for(asyncio.shield(record["callback"]), ACK_DEADLINE + 1)
+        except asyncio.TimeoutError:
+            return None
+
+    def component(self, guild: dict, member: dict, select: dict, values: list, message_id: int, body: dict) -> dict:
+        message = self.mock.message_payload(message_id, guild["channels"]["general"], body.get("data") or {})
+        data = {"custom_id": select["custom_id"], "component_type": 3, "values": values}
+        return self.mock.interaction_payload(guild, member, 3, data, message)
+
+    async def roles_flow(self):
+        guild, member = self.pick()
+        result = await self.step("roles", self.mock.command(guild, member, "roles"))
+        if result is None:
+            return
+        body, message_id = result
+        select = find_select((body.get("data") or {}).get("components", []))
+        if select is None:
+            return
+
+        await asyncio.sleep(self.think_time)
+        category = random.choice(select["options"])["value"]
+        result = await self.step("roles.category", self.component(guild, member, select, [category], message_id, body))
+        if result is None:
+            return
+        body, _ = result  # an update keeps the original message
+        select = find_select((body.get("data") or {}).get("components", []))
+        if select is None:
+            return
+
+        await asyncio.sleep(self.think_time)
+        options = [option["value"] for option in select["options"]]
+        values = random.sample(options, min(len(options), random.randint(1, 3)))
+        await self.step("roles.select", self.component(guild, member, select, values, message_id, body))
+
+    async def warn_flow(self):
+        guild, _ = self.pick()
+        moderator = guild["members"][1]  # holds the Moderator role
+        target = random.choice(guild["members"][2:] or guild["members"][1:])
+        options = [
+            {"name": "user", "type": 6, "value": str(target["id"])},
+            {"name": "reason", "type": 3, "value": "Load test warning"},
+        ]
+        resolved = {
+            "users": {str(target["id"]): user_payload(target)},
+            "members": {str(target["id"]): member_payload(target, with_user=False)},
+        }
+        await self.step("warn", self.mock.command(guild, moderator, "warn", options, resolved))
+
+    async def bulk_warn_flow(self):
+        guild, _ = self.pick()
+        moderator = guild["members"][1]
+        targets = random.sample(guild["members"][2:], min(len(guild["members"]) - 2, 100))
+        options = [
+            {"name": "reason", "type": 3, "value": "Load test raid"},
+            {"name": "users", "type": 3, "value": " ".join(f"<@{target['id']}>" for target in targets)},
+        ]
+        await self.step("bulk_warn", self.mock.command(guild, moderator, "bulk_warn", options))
+
+    async def confess_flow(self):
+        guild, member = self.pick()
+        result = await self.step("confess", self.mock.command(guild, member, "confess"))
+        if result is None:
+            return
+        body, _ = result
+        modal = body.get("data") or {}
+        if body.get("type") != 9 or "custom_id" not in modal:
+            return
+
+        await asyncio.sleep(self.think_time * 5)  # typing takes a while
+        data = {"custom_id": modal["custom_id"], "components": fill_modal(modal.get("components", []))}
+        await self.step("confess.modal", self.mock.interaction_payload(guild, member, 5, data))
+
+    async def fun_flow(self):
+        guild, member = self.pick()
+        name = random.choice(["truth", "dare", "coinflip", "gif"])
+        if name == "gif":
+            payload = self.mock.command(guild, member, "gif", [{"name": "search_term", "type": 3, "value": random.choice(GIF_SEARCHES)}])
+        else:
+            # The rest are subcommands of the /fun group
+            payload = self.mock.command(guild, member, "fun", [{"name": name, "type": 1, "options": []}])
+        await self.step(f"fun.{name}", payload)
+
+    def report(self) -> dict:
+        kinds = {}
+        for record in self.mock.interactions.values():
+            stats = kinds.setdefault(record["kind"], {"sent": 0, "acked": 0, "late": 0, "missing": 0, "ack": [], "e2e": []})
+            stats["sent"] += 1
+            if record["acked"] is not None:
+                stats["acked"] += 1
+                stats["ack"].append(record["acked"] - record["sent"])
+                if record["done"] is not None:
+                    stats["e2e"].append(record["done"] - record["sent"])
+            elif record["late"]:
+                stats["late"] += 1
+            else:
+                stats["missing"] += 1
+
+        for stats in kinds.values():
+            ack, e2e = stats.pop("ack"), stats.pop("e2e")
+            stats.update({
+                "ack_p50": percentile(ack, 0.5), "ack_p99": percentile(ack, 0.99),
+                "e2e_p50": percentile(e2e, 0.5), "e2e_p99": percentile(e2e, 0.99),
+            })
+        return {
+            "kinds": kinds,
+            "elapsed": (self.finished or time.perf_counter()) - (self.started or time.perf_counter()),
+            "requests": sum(self.mock.requests.values()),
+            "rate_limited": self.mock.rate_limited,
+            "unknown_routes": self.mock.unknown_routes,
+        }
+
+
+def run_mock_process(world: dict, options: dict, conn):
+    asyncio.run(_mock_main(world, options, conn))
+
+
+async def _mock_main(world: dict, options: dict, conn):
+    mock = MockDiscord(world, options["latency"] / 1000, options["jitter"] / 1000, options["rate_limit"], options["bucket_limit"])
+    conn.send(await mock.start())
+    loop = asyncio.get_running_loop()
+
+    if await loop.run_in_executor(None, conn.recv) == "go":
+        generator = TrafficGenerator(mock, options["rate"], options["duration"], options["mix"], options["think_time"])
+        await generator.run()
+        conn.send(generator.report())
+        await loop.run_in_executor(None, conn.recv)  # keep serving until the bot has shut down
+    await mock.close()
+
+
+# --- Bot side ---
+
+def seed_guild_configs(world: dict):
+    """Gives every mock guild role categories plus log and confession channels."""
+    conn = sqlite3.connect("database.db")
+    with conn:
+        for guild in world["guilds"]:
+            settings = {"log_channel": guild["channels"]["logs"], "confession_channel": guild["channels"]["confessions"]}
+            conn.execute("INSERT INTO guild_settings (guild_id, settings) VALUES (?, ?)", (guild["id"], json.dumps(settings)))
+            conn.executemany(
+                "INSERT INTO role_categories (guild_id, name, position, role_ids) VALUES (?, ?, ?, ?)",
+                ((guild["id"], name, position, json.dumps(role_ids)) for position, (name, role_ids) in enumerate(guild["categories"].items()))
+            )
+    conn.close()
+
+
+async def monitor_loop_lag(samples: list, interval: float = 0.05):
+    """Records how late each short sleep wakes up; anything above zero is time the loop was busy."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - started - interval))
+
+
+async def run_bot(base_url: str, conn) -> dict:
+    import yarl
+    import discord
+    from discord.gateway import DiscordWebSocket
+    discord.http.Route.BASE = base_url + "/api/v10"
+    DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(base_url.replace("http", "ws", 1) + "/")
+
+    import role_bot
+    from utils.metrics import metrics
+    bot = role_bot.MyBot()
+    ready = asyncio.Event()
+
+    async def signal_ready():
+        ready.set()
+    bot.add_listener(signal_ready, "on_ready")
+
+    started = time.perf_counter()
+    runner = asyncio.create_task(bot.start("loadtest-token"))
+    waiter = asyncio.create_task(ready.wait())
+    await asyncio.wait({runner, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    if runner.done():
+        waiter.cancel()
+        runner.result()  # startup failed; surface the error
+        raise RuntimeError("The bot stopped before it became ready.")
+    startup_seconds = time.perf_counter() - started
+
+    lag_samples = []
+    monitor = asyncio.create_task(monitor_loop_lag(lag_samples))
+    loop = asyncio.get_running_loop()
+    conn.send("go")
+    report = await loop.run_in_executor(None, conn.recv)
+    monitor.cancel()
+
+    report["startup"] = startup_seconds
+    report["loop_lag"] = {"p50": percentile(lag_samples, 0.5), "p99": percentile(lag_samples, 0.99), "max": max(lag_samples, default=0.0)}
+    report["handler_errors"] = sum(
+        value for (name, _), value in metrics.counters.items()
+        if name in ("discord_command_errors_total", "discord_component_errors_total")
+    )
+
+    await bot.close()
+    with contextlib.suppress(Exception):
+        await runner
+    conn.send("stop")
+    return report
+
+
+def print_report(report: dict, args):
+    print(f"--- Load test: {args.rate:g} flows/s for {args.duration:g}s across {args.guilds} guilds "
+          f"({args.latency:g}ms API latency, {args.rate_limit:.0%} rate-limited) ---")
+    print(f"Bot ready after {report['startup']:.2f}s; traffic ran for {report['elapsed']:.1f}s.")
+    print(f"{'interaction':<16} {'sent':>7} {'acked':>7} {'late':>6} {'missing':>8} {'ack p50':>9} {'ack p99':>9} {'e2e p50':>9} {'e2e p99':>9}")
+    totals = {"sent": 0, "acked": 0, "late": 0, "missing": 0}
+    for kind, stats in sorted(report["kinds"].items()):
+        for key in totals:
+            totals[key] += stats[key]
+        print(f"{kind:<16} {stats['sent']:>7} {stats['acked']:>7} {stats['late']:>6} {stats['missing']:>8} "
+              f"{stats['ack_p50'] * 1000:>7.0f}ms {stats['ack_p99'] * 1000:>7.0f}ms "
+              f"{stats['e2e_p50'] * 1000:>7.0f}ms {stats['e2e_p99'] * 1000:>7.0f}ms")
+    print(f"{'total':<16} {totals['sent']:>7} {totals['acked']:>7} {totals['late']:>6} {totals['missing']:>8}")
+
+    lag = report["loop_lag"]
+    print(f"Event loop lag: p50 {lag['p50'] * 1000:.1f}ms, p99 {lag['p99'] * 1000:.1f}ms, max {lag['max'] * 1000:.1f}ms")
+    print(f"REST requests: {report['requests']} ({report['rate_limited']} answered with 429)")
+    print(f"Handler errors: {report['handler_errors']}")
+    for route, count in sorted(report["unknown_routes"].items()):
+        print(f"  unhandled route {route}: {count}")
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("roles", "warn", "confess", "fun", "bulk"):
+            raise argparse.ArgumentTypeError(f"unknown traffic type '{name}'")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test MyBot against a local mock Discord.")
+    parser.add_argument("--rate", type=float, default=100, help="new user flows started per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of traffic")
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--members", type=int, default=200, help="members per guild")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"traffic weights (default {DEFAULT_MIX})")
+    parser.add_argument("--latency", type=float, default=50, help="mock API latency in ms")
+    parser.add_argument("--jitter", type=float, default=20, help="+/- latency jitter in ms")
+    parser.add_argument("--bucket-limit", type=int, default=50, help="requests per rate limit bucket per second")
+    parser.add_argument("--rate-limit", type=float, default=0.01, help="extra share of REST calls answered with 429")
+    parser.add_argument("--think-time", type=float, default=0.5, help="seconds a user takes between menu steps")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's own output and discord.py warnings")
+    args = parser.parse_args()
+
+    world = build_world(args.guilds, args.members)
+    options = {
+        "latency": args.latency, "jitter": args.jitter, "rate_limit": args.rate_limit, "bucket_limit": args.bucket_limit,
+        "rate": args.rate, "duration": args.duration, "mix": args.mix, "think_time": args.think_time,
+    }
+    context = multiprocessing.get_context("spawn")
+    conn, child_conn = context.Pipe()
+    mock_process = context.Process(target=run_mock_process, args=(world, options, child_conn), daemon=True)
+    mock_process.start()
+    base_url = conn.recv()
+
+    # Point the bot's config at the mock before role_bot reads the environment.
+    os.environ.update({
+        "TRUTH_OR_DARE_API_URL": base_url + "/fun", "TENOR_API_URL": base_url + "/tenor", "TENOR_API_KEY": "loadtest",
+        "DEV_GUILD_ID": "", "METRICS_PORT": "",
+    })
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    else:
+        logging.getLogger("discord").setLevel(logging.CRITICAL)
+
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # database, command hash file and legacy imports all stay in here
+        try:
+            from utils.database import initialize_database, close_database
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+                initialize_database()
+                seed_guild_configs(world)
+                close_database()
+                report = asyncio.run(run_bot(base_url, conn))
+        finally:
+            os.chdir(original_dir)
+    mock_process.join(timeout=10)
+    print_report(report, args)
+
+
+if __name__ == "__main__":
+    main()
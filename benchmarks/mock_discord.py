@@ -0,0 +1,413 @@
+"""A local stand-in for the Discord REST API and gateway, for load testing.
+
+It speaks just enough of both for discord.py to log in, receive guilds and
+interactions, and answer them. Every interaction callback, followup and edit
+is timestamped, so the traffic generator can tell how fast the bot acked and
+finished each one. Like the real API, a callback that arrives more than three
+seconds after the interaction was dispatched is rejected with "Unknown
+interaction", and every other route has a per-bucket rate limit advertised in
+X-RateLimit headers, answered with 429 once it is used up.
+"""
+import re
+import json
+import time
+import random
+import asyncio
+import itertools
+from aiohttp import web
+
+API_PREFIX = "/api/v10"
+ACK_DEADLINE = 3.0
+BUCKET_WINDOW = 1.0
+DEFERRED_TYPES = (5, 6)  # deferred channel message / deferred message update
+# What Discord reports for a member whose roles grant administrator
+ALL_PERMISSIONS = str((1 << 53) - 1)
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+_ids = itertools.count(1_100_000_000_000_000_000)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+def json_response(data, status: int = 200, headers: dict = None) -> web.Response:
+    # discord.py only decodes bodies whose content type is exactly "application/json".
+    return web.Response(body=json.dumps(data).encode(), status=status, headers={"Content-Type": "application/json", **(headers or {})})
+
+
+# --- The fake world: guilds, roles, channels and members ---
+
+def build_world(guild_count: int, members_per_guild: int, categories: int = 3, roles_per_category: int = 10) -> dict:
+    """Plain dicts describing every guild, shared by the mock server and the DB seeding."""
+    bot_id = next_id()
+    guilds = []
+    for g in range(guild_count):
+        guild_id = next_id()
+        bot_role_id = next_id()
+        moderator_role_id = next_id()
+        roles = [
+            {"id": guild_id, "name": "@everyone", "position": 0, "permissions": "0"},
+            {"id": bot_role_id, "name": "JinuBot", "position": 1000, "permissions": "8"},
+            {"id": moderator_role_id, "name": "Moderator", "position": 999, "permissions": "8"},
+        ]
+        role_categories = {}
+        for c in range(categories):
+            category_roles = []
+            for r in range(roles_per_category):
+                role_id = next_id()
+                roles.append({"id": role_id, "name": f"Role {c}-{r}", "position": len(roles), "permissions": "0"})
+                category_roles.append(str(role_id))
+            role_categories[f"Category {c}"] = category_roles
+
+        members = [{"id": bot_id, "name": "JinuBot", "roles": [bot_role_id], "bot": True}]
+        for m in range(members_per_guild):
+            roles_held = [moderator_role_id] if m == 0 else []
+            members.append({"id": next_id(), "name": f"user{g}-{m}", "roles": roles_held, "bot": False})
+
+        guilds.append({
+            "id": guild_id,
+            "name": f"Load Test Guild {g}",
+            "roles": roles,
+            "members": members,
+            "categories": role_categories,
+            "channels": {"general": next_id(), "logs": next_id(), "confessions": next_id()},
+        })
+    return {"bot_id": bot_id, "guilds": guilds}
+
+
+def user_payload(member: dict) -> dict:
+    return {
+        "id": str(member["id"]), "username": member["name"], "discriminator": "0",
+        "global_name": None, "avatar": member.get("avatar"), "bot": member["bot"],
+    }
+
+
+def member_payload(member: dict, with_user: bool = True) -> dict:
+    payload = {
+        "roles": [str(role_id) for role_id in member["roles"]],
+        "joined_at": TIMESTAMP, "deaf": False, "mute": False, "flags": 0, "nick": None, "pending": False,
+    }
+    if with_user:
+        payload["user"] = user_payload(member)
+    return payload
+
+
+def role_payload(role: dict) -> dict:
+    return {
+        "id": str(role["id"]), "name": role["name"], "position": role["position"], "permissions": role["permissions"],
+        "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0,
+    }
+
+
+def channel_payload(guild: dict, name: str) -> dict:
+    return {
+        "id": str(guild["channels"][name]), "type": 0, "name": name, "guild_id": str(guild["id"]),
+        "position": list(guild["channels"]).index(name), "permission_overwrites": [], "nsfw": False, "parent_id": None,
+    }
+
+
+def guild_payload(guild: dict) -> dict:
+    return {
+        "id": str(guild["id"]), "name": guild["name"], "owner_id": str(guild["members"][1]["id"]),
+        "roles": [role_payload(role) for role in guild["roles"]],
+        "channels": [channel_payload(guild, name) for name in guild["channels"]],
+        "members": [member_payload(member) for member in guild["members"]],
+        "member_count": len(guild["members"]), "large": False, "unavailable": False, "joined_at": TIMESTAMP,
+        "features": [], "emojis": [], "stickers": [], "threads": [], "voice_states": [], "presences": [],
+        "stage_instances": [], "guild_scheduled_events": [], "premium_tier": 0, "verification_level": 0,
+        "default_message_notifications": 0, "explicit_content_filter": 0, "mfa_level": 0, "nsfw_level": 0,
+        "preferred_locale": "en-US", "system_channel_flags": 0, "afk_timeout": 300,
+    }
+
+
+# --- The server ---
+
+class MockDiscord:
+    def __init__(self, world: dict, latency: float = 0.05, jitter: float = 0.02, rate_limit_ratio: float = 0.0,
+                 bucket_limit: int = 50):
+        self.world = world
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio  # share of requests that get a spurious 429 on top
+        self.bucket_limit = bucket_limit  # requests per bucket per BUCKET_WINDOW
+        self.buckets = {}  # bucket key -> [window start, requests used]
+        self.bot = {"id": world["bot_id"], "name": "JinuBot", "bot": True, "avatar": "0" * 32}
+        self.guilds = {guild["id"]: guild for guild in world["guilds"]}
+        self.members = {
+            (guild["id"], member["id"]): member for guild in world["guilds"] for member in guild["members"]
+        }
+        self.base_url = None
+        self.runner = None
+        self.ws = None
+        self.sequence = 0
+        self.connected = asyncio.Event()
+        self.commands = {}      # command name -> id, filled in by the bot's sync
+        self.interactions = {}  # token -> record of what the bot did with it
+        self.requests = {}      # route name -> count
+        self.rate_limited = 0
+        self.unknown_routes = {}
+        self.routes = [
+            ("GET", r"users/@me", self.get_me),
+            ("GET", r"oauth2/applications/@me", self.get_application),
+            ("GET", r"gateway/bot", self.get_gateway),
+            ("PUT", r"applications/\d+(?:/guilds/\d+)?/commands", self.put_commands),
+            ("POST", r"interactions/(?P<id>\d+)/(?P<token>[^/]+)/callback", self.interaction_callback),
+            ("POST", r"webhooks/\d+/(?P<token>[^/]+)", self.followup),
+            ("PATCH", r"webhooks/\d+/(?P<token>[^/]+)/messages/[^/]+", self.followup),
+            ("GET", r"webhooks/\d+/(?P<token>[^/]+)/messages/[^/]+", self.followup),
+            ("DELETE", r"webhooks/\d+/(?P<token>[^/]+)/messages/[^/]+", self.no_content),
+            ("POST", r"channels/(?P<channel>\d+)/messages", self.create_message),
+            ("PATCH", r"guilds/(?P<guild>\d+)/members/(?P<user>\d+)", self.edit_member),
+            ("PUT", r"guilds/\d+/members/\d+/roles/\d+", self.no_content),
+            ("DELETE", r"guilds/\d+/members/\d+/roles/\d+", self.no_content),
+            ("POST", r"users/@me/channels", self.create_dm),
+        ]
+        self.routes = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in self.routes]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_route("GET", "/", self.gateway)
+        app.router.add_route("GET", "/fun/{kind}", self.fun_question)
+        app.router.add_route("GET", "/tenor/search", self.tenor_search)
+        app.router.add_route("*", API_PREFIX + "/{path:.*}", self.rest)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    # --- Gateway ---
+
+    async def gateway(self, request: web.Request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        await ws.send_json({"op": 10, "d": {"heartbeat_interval": 41250}, "s": None, "t": None})
+        async for message in ws:
+            payload = json.loads(message.data)
+            if payload["op"] == 1:
+                await ws.send_json({"op": 11, "d": None, "s": None, "t": None})
+            elif payload["op"] == 2:
+                self.ws = ws
+                await self.identify()
+        self.ws = None
+        return ws
+
+    async def identify(self):
+        await self.dispatch("READY", {
+            "v": 10,
+            "user": user_payload(self.bot),
+            "guilds": [{"id": str(guild_id), "unavailable": True} for guild_id in self.guilds],
+            "session_id": "loadtest",
+            "resume_gateway_url": self.base_url.replace("http", "ws", 1) + "/",
+            "application": {"id": str(self.bot["id"]), "flags": 0},
+            "shard": [0, 1],
+        })
+        for guild in self.guilds.values():
+            await self.dispatch("GUILD_CREATE", guild_payload(guild))
+        self.connected.set()
+
+    async def dispatch(self, event: str, data: dict):
+        self.sequence += 1
+        await self.ws.send_str(json.dumps({"op": 0, "t": event, "s": self.sequence, "d": data}))
+
+    async def send_interaction(self, kind: str, payload: dict) -> dict:
+        """Dispatches an INTERACTION_CREATE and starts tracking what the bot does with it."""
+        record = {
+            "kind": kind, "sent": time.perf_counter(), "acked": None, "ack_type": None, "done": None,
+            "late": False, "callback": asyncio.get_running_loop().create_future(),
+        }
+        self.interactions[payload["token"]] = record
+        await self.dispatch("INTERACTION_CREATE", payload)
+        return record
+
+    # --- REST ---
+
+    async def rest(self, request: web.Request):
+        arrived = time.perf_counter()
+        path = request.match_info["path"]
+        for method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match and method == request.method:
+                break
+        else:
+            key = f"{request.method} {path}"
+            self.unknown_routes[key] = self.unknown_routes.get(key, 0) + 1
+            return json_response({"message": "404: Not Found", "code": 0}, status=404)
+
+        name = f"{method} {pattern.pattern[:-1]}"
+        self.requests[name] = self.requests.get(name, 0) + 1
+        try:
+            body = await request.json() if request.can_read_body and request.content_type == "application/json" else None
+        except ConnectionResetError:
+            return web.Response(status=499)  # the bot hung up, e.g. while shutting down
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        # Interaction callbacks aren't subject to the bot's rate limits on the real API either.
+        if handler == self.interaction_callback:
+            return await handler(request, match, body, arrived)
+
+        # Buckets are per route and per major parameter (channel, guild or webhook).
+        major = next((value for value in match.groupdict().values() if value), "")
+        remaining, reset_after = self.take_from_bucket(f"{name}:{major}")
+        if remaining is None or random.random() < self.rate_limit_ratio:
+            self.rate_limited += 1
+            retry_after = round(reset_after if remaining is None else random.uniform(0.05, 0.5), 3)
+            return json_response(
+                {"message": "You are being rate limited.", "retry_after": retry_after, "global": False},
+                status=429,
+                # discord.py treats a 429 without a Via header as a Cloudflare ban
+                headers={"Retry-After": str(retry_after), "X-RateLimit-Scope": "user", "Via": "1.1 google"}
+            )
+        response = await handler(request, match, body, arrived)
+        response.headers.update({
+            "X-RateLimit-Bucket": format(hash(name) & 0xFFFFFFFF, "x"),
+            "X-RateLimit-Limit": str(self.bucket_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+        })
+        return response
+
+    def take_from_bucket(self, key: str):
+        """Counts a request against a fixed-window bucket; remaining is None once it is used up."""
+        now = time.monotonic()
+        window = self.buckets.get(key)
+        if window is None or now - window[0] >= BUCKET_WINDOW:
+            window = self.buckets[key] = [now, 0]
+        reset_after = BUCKET_WINDOW - (now - window[0])
+        if window[1] >= self.bucket_limit:
+            return None, reset_after
+        window[1] += 1
+        return self.bucket_limit - window[1], reset_after
+
+    async def get_me(self, request, match, body, arrived):
+        return json_response(user_payload(self.bot))
+
+    async def get_application(self, request, match, body, arrived):
+        return json_response({
+            "id": str(self.bot["id"]), "name": "JinuBot", "description": "", "icon": None,
+            "bot_public": True, "bot_require_code_grant": False, "verify_key": "0" * 64, "flags": 0,
+            "owner": user_payload(self.world["guilds"][0]["members"][1]) if self.world["guilds"] else user_payload(self.bot),
+        })
+
+    async def get_gateway(self, request, match, body, arrived):
+        return json_response({
+            "url": self.base_url.replace("http", "ws", 1),
+            "shards": 1,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+        })
+
+    async def put_commands(self, request, match, body, arrived):
+        synced = []
+        for command in body or []:
+            command_id = self.commands.setdefault(command["name"], next_id())
+            synced.append({
+                "type": 1, "description": "", "options": [], "default_member_permissions": None,
+                **command, "id": str(command_id), "application_id": str(self.bot["id"]), "version": "1",
+            })
+        return json_response(synced)
+
+    async def interaction_callback(self, request, match, body, arrived):
+        record = self.interactions.get(match["token"])
+        if record is None or arrived - record["sent"] > ACK_DEADLINE:
+            if record is not None:
+                record["late"] = True
+            return json_response({"message": "Unknown interaction", "code": 10062}, status=404)
+        if record["acked"] is not None:
+            return json_response({"message": "Interaction has already been acknowledged.", "code": 40060}, status=400)
+
+        record["acked"] = arrived
+        record["ack_type"] = body["type"]
+        if body["type"] not in DEFERRED_TYPES:
+            record["done"] = arrived
+        message_id = next_id()
+        record["callback"].set_result((body, message_id))
+
+        data = body.get("data") or {}
+        response = {"interaction": {
+            "id": match["id"], "type": body["type"], "response_message_id": str(message_id),
+            "response_message_loading": body["type"] == 5,
+            "response_message_ephemeral": bool(data.get("flags", 0) & 64),
+        }}
+        if body["type"] == 4:
+            response["resource"] = {"type": 4, "message": self.message_payload(message_id, None, data)}
+        return json_response(response)
+
+    async def followup(self, request, match, body, arrived):
+        record = self.interactions.get(match["token"])
+        if record is not None and record["acked"] is not None and record["done"] is None:
+            record["done"] = arrived
+        return json_response(self.message_payload(next_id(), None, body or {}))
+
+    async def create_message(self, request, match, body, arrived):
+        return json_response(self.message_payload(next_id(), int(match["channel"]), body or {}))
+
+    async def edit_member(self, request, match, body, arrived):
+        member = self.members.get((int(match["guild"]), int(match["user"])))
+        if member is None:
+            return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+        if body and "roles" in body:
+            member["roles"] = [int(role_id) for role_id in body["roles"]]
+        return json_response(member_payload(member))
+
+    async def create_dm(self, request, match, body, arrived):
+        recipient = {"id": int(body["recipient_id"]), "name": "recipient", "bot": False}
+        return json_response({"id": str(next_id()), "type": 1, "recipients": [user_payload(recipient)]})
+
+    async def no_content(self, request, match, body, arrived):
+        return web.Response(status=204)
+
+    def message_payload(self, message_id: int, channel_id: int, data: dict) -> dict:
+        return {
+            "id": str(message_id), "channel_id": str(channel_id or 0), "type": 0, "author": user_payload(self.bot),
+            "content": data.get("content") or "", "timestamp": TIMESTAMP, "edited_timestamp": None,
+            "embeds": data.get("embeds") or [], "components": data.get("components") or [],
+            "flags": data.get("flags", 0), "attachments": [], "mentions": [], "mention_roles": [],
+            "pinned": False, "tts": False, "mention_everyone": False,
+        }
+
+    # --- Third-party APIs the fun cog calls ---
+
+    async def fun_question(self, request: web.Request):
+        await asyncio.sleep(self.latency)
+        kind = request.match_info["kind"]
+        return json_response({"question": f"Load test {kind} #{random.randrange(10 ** 6)}?"})
+
+    async def tenor_search(self, request: web.Request):
+        await asyncio.sleep(self.latency)
+        query = request.query.get("q", "")
+        return json_response({"results": [
+            {"media_formats": {"gif": {"url": f"https://media.example.invalid/{query}/{i}.gif"}}} for i in range(8)
+        ]})
+
+    # --- Interaction payloads ---
+
+    def interaction_payload(self, guild: dict, member: dict, interaction_type: int, data: dict, message: dict = None) -> dict:
+        interaction_id = next_id()
+        payload = {
+            "id": str(interaction_id), "application_id": str(self.bot["id"]), "type": interaction_type,
+            "token": f"token-{interaction_id}", "version": 1, "data": data,
+            "guild_id": str(guild["id"]), "channel_id": str(guild["channels"]["general"]),
+            "channel": channel_payload(guild, "general"),
+            "member": {**member_payload(member), "permissions": ALL_PERMISSIONS if member["roles"] else "0"},
+            "app_permissions": "8", "attachment_size_limit": 10 * 1024 * 1024, "entitlements": [],
+            "authorizing_integration_owners": {"0": str(guild["id"])}, "context": 0,
+            "locale": "en-US", "guild_locale": "en-US",
+        }
+        if message is not None:
+            payload["message"] = message
+        return payload
+
+    def command(self, guild: dict, member: dict, name: str, options=(), resolved: dict = None) -> dict:
+        data = {"id": str(self.commands.get(name, 0)), "name": name, "type": 1, "options": list(options)}
+        if resolved:
+            data["resolved"] = resolved
+        return self.interaction_payload(guild, member, 2, data)
@@ -0,0 +1,405 @@
+"""Offline micro-benchmarks for the command handlers.
+
+Drives the real cog handlers with the fakes in benchmarks/fakes.py against a
+throwaway SQLite database, so no token or network is needed.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --warnings 1000,100000,1000000 --guilds 10000
+    python -m benchmarks.run --only warn,warnings --iterations 2000
+    python -m benchmarks.run --save-baseline
+
+Each result is compared with benchmarks/baselines.json; anything slower than
+the baseline by more than --tolerance is reported and the exit status is 1.
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import database, data_manager, question_bank, role_menu_cache, autocomplete  # noqa: E402
+from utils.confession_queue import close_confession_pipeline  # noqa: E402
+from utils.dm_queue import close_dm_queue  # noqa: E402
+from utils.log_manager import close_log_dispatcher  # noqa: E402
+from benchmarks.fakes import FakeClient, FakeGuild, FakeInteraction, next_id  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+# --- Seeding helpers (plain sqlite3, outside the timed section) ---
+
+def seed_guilds(count: int, categories: dict) -> list:
+    guild_ids = [next_id() for _ in range(count)]
+    conn = sqlite3.connect(database.DATABASE_FILE)
+    with conn:
+        conn.executemany(
+            "INSERT INTO guild_settings (guild_id, settings) VALUES (?, ?)",
+            ((guild_id, json.dumps({"log_channel": None})) for guild_id in guild_ids)
+        )
+        conn.executemany(
+            "INSERT INTO role_categories (guild_id, name, position, role_ids) VALUES (?, ?, ?, ?)",
+            (
+                (guild_id, name, position, json.dumps(role_ids))
+                for guild_id in guild_ids
+                for position, (name, role_ids) in enumerate(categories.items())
+            )
+        )
+    conn.close()
+    return guild_ids
+
+
+def seed_warnings(guild_id: int, user_ids: list, count: int, reasons: list = None):
+    conn = sqlite3.connect(database.DATABASE_FILE)
+    with conn:
+        conn.executemany(
+            "INSERT INTO warnings (warning_id, short_id, guild_id, user_id, moderator_id, reason, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (f"seed-{guild_id}-{i}", f"{i:08x}", guild_id, user_ids[i % len(user_ids)], 1,
+                 random.choice(reasons) if reasons else f"Seeded warning {i}",
+                 time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1_600_000_000 + i)))
+                for i in range(count)
+            )
+        )
+    conn.close()
+
+
+def seed_confessions(guild_id: int, count: int, texts: list, unposted_every: int = 0):
+    conn = sqlite3.connect(database.DATABASE_FILE)
+    with conn:
+        conn.executemany(
+            "INSERT INTO confessions (confession_id, short_id, guild_id, user_id, content, posted, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (f"seed-{guild_id}-{i}", f"{i:08x}", guild_id, 1, random.choice(texts),
+                 0 if unposted_every and i % unposted_every == 0 else 1,
+                 time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1_600_000_000 + i)))
+                for i in range(count)
+            )
+        )
+    conn.close()
+
+# --- Benchmarks ---
+# Each one sets up its data, then returns an async `op` to be timed repeatedly.
+
+async def bench_add_role(client: FakeClient, size: int):
+    from cogs.admin_commands import AdminCommands
+    cog = AdminCommands(client)
+    guild_ids = seed_guilds(size, {"Games": []})
+
+    async def op():
+        guild = FakeGuild(random.choice(guild_ids))
+        interaction = FakeInteraction(client, guild, guild.add_member("admin"))
+        await cog.add_role.callback(cog, interaction, "Games", guild.add_role("New Role"))
+    return op
+
+
+async def bench_warn(client: FakeClient, size: int):
+    from cogs.moderation_commands import ModerationCommands
+    cog = ModerationCommands(client)
+    guild = FakeGuild()
+    members = [guild.add_member(f"user{i}") for i in range(100)]
+    seed_warnings(guild.id, [member.id for member in members], size)
+    moderator = guild.add_member("moderator")
+
+    async def op():
+        interaction = FakeInteraction(client, guild, moderator)
+        await cog.warn.callback(cog, interaction, random.choice(members), "Benchmark warning")
+    return op
+
+
+async def bench_bulk_warn(client: FakeClient, size: int):
+    from cogs.moderation_commands import ModerationCommands
+    cog = ModerationCommands(client)
+    guild = FakeGuild()
+    raiders = guild.add_role("Raiders")
+    for i in range(size):
+        guild.add_member(f"raider{i}").roles.append(raiders)
+    moderator = guild.add_member("moderator")
+
+    async def op():
+        interaction = FakeInteraction(client, guild, moderator)
+        await cog.bulk_warn.callback(cog, interaction, "Benchmark raid", role=raiders)
+    return op
+
+
+async def bench_warnings(client: FakeClient, size: int):
+    from cogs.moderation_commands import ModerationCommands
+    cog = ModerationCommands(client)
+    guild = FakeGuild()
+    offender = guild.add_member("repeat offender")
+    # Half the guild's warnings belong to the user we page through.
+    seed_warnings(guild.id, [offender.id, next_id()], size)
+    moderator = guild.add_member("moderator")
+
+    async def op():
+        interaction = FakeInteraction(client, guild, moderator)
+        await cog.warnings.callback(cog, interaction, offender)
+    return op
+
+
+SEARCH_WORDS = ["spam", "links", "raid", "toxic", "caps", "flood", "ping", "scam", "invite", "alt", "slurs", "evasion"]
+
+
+async def bench_search_warnings(client: FakeClient, size: int):
+    from cogs.moderation_commands import ModerationCommands
+    cog = ModerationCommands(client)
+    guild = FakeGuild()
+    reasons = [" ".join(random.sample(SEARCH_WORDS, 4)) for _ in range(500)]
+    seed_warnings(guild.id, [next_id() for _ in range(100)], size, reasons)
+    # Another guild's warnings share the index but must never show up
+    seed_warnings(next_id(), [next_id()], size // 10, reasons)
+    moderator = guild.add_member("moderator")
+    queries = ["spam links", '"ban evasion"', "scam*", "raid", "nothing here"]
+
+    async def op():
+        interaction = FakeInteraction(client, guild, moderator)
+        await cog.search_warnings.callback(cog, interaction, random.choice(queries))
+    return op
+
+
+async def bench_search_confessions(client: FakeClient, size: int):
+    from cogs.confessions import Confessions
+    cog = Confessions(client)
+    guild = FakeGuild()
+    texts = [" ".join(random.sample(SEARCH_WORDS, 4)) for _ in range(500)]
+    # A few confessions are still waiting to be posted and must stay hidden
+    seed_confessions(guild.id, size, texts, unposted_every=100)
+    moderator = guild.add_member("moderator")
+    queries = ["spam links", '"ban evasion"', "scam*", "raid", "nothing here"]
+
+    async def op():
+        interaction = FakeInteraction(client, guild, moderator)
+        await cog.search_confessions.callback(cog, interaction, random.choice(queries))
+    return op
+
+
+async def bench_role_select(client: FakeClient, size: int):
+    from cogs.user_commands import PagedSelectView, RoleSelectMenu
+    guild = FakeGuild()
+    roles = [guild.add_role(f"Role {i}") for i in range(25)]
+    seed_guilds(0, {})
+    guild_data = await data_manager.get_guild_data(guild.id)
+    guild_data["roles"]["Games"] = [str(role.id) for role in roles]
+    member = guild.add_member()
+    pages = await role_menu_cache.get_role_pages(guild, "Games")
+
+    async def op():
+        view = PagedSelectView(pages, lambda options: RoleSelectMenu(category="Games", options=options))
+        menu = view.children[0]
+        menu._values = [str(role.id) for role in random.sample(roles, 5)]
+        await menu.callback(FakeInteraction(client, guild, member))
+    return op
+
+
+async def bench_confession(client: FakeClient, size: int):
+    from cogs.confessions import ConfessionModal
+    guild = FakeGuild()
+    guild_data = await data_manager.get_guild_data(guild.id)
+    guild_data["settings"]["confession_channel"] = client.add_channel().id
+    member = guild.add_member()
+
+    async def op():
+        modal = ConfessionModal()
+        modal.confession_text._value = "I benchmark on production."
+        await modal.on_submit(FakeInteraction(client, guild, member))
+    return op
+
+
+async def bench_category_autocomplete(client: FakeClient, size: int):
+    from cogs.admin_commands import category_autocomplete
+    guild = FakeGuild()
+    guild_data = await data_manager.get_guild_data(guild.id)
+    words = ["Game", "Color", "Pronoun", "Region", "Ping", "Hobby", "Language", "Age"]
+    for i in range(size):
+        guild_data["roles"][f"{random.choice(words)} Roles {i}"] = []
+    member = guild.add_member()
+    queries = ["", "g", "ga", "col", "roles 1", "xyz", "pron", "age roles"]
+
+    async def op():
+        await category_autocomplete(FakeInteraction(client, guild, member), random.choice(queries))
+    return op
+
+
+async def bench_add_question(client: FakeClient, size: int):
+    from cogs.fun_commands import add_question_to_library
+    bank = question_bank.get_question_bank()
+    for i in range(size):
+        bank.add("truths", random.choice(question_bank.RATINGS), f"Seeded question {i}?")
+    bank.pending.clear()
+    counter = iter(range(10 ** 9))
+
+    async def op():
+        # Half new questions, half duplicates of known ones.
+        if random.random() < 0.5:
+            question = f"Fresh question {next(counter)}?"
+        else:
+            question = f"Seeded question {random.randrange(max(size, 1))}?"
+        add_question_to_library("truths", "pg", question)
+    return op
+
+async def bench_top_warned(client: FakeClient, size: int):
+    from cogs.moderation_commands import ModerationCommands
+    cog = ModerationCommands(client)
+    guild = FakeGuild()
+    # Many users with a few warnings each, the shape a leaderboard has to rank
+    seed_warnings(guild.id, [next_id() for _ in range(max(1, size // 5))], size)
+    moderator = guild.add_member("moderator")
+
+    async def op():
+        interaction = FakeInteraction(client, guild, moderator)
+        await cog.top_warned.callback(cog, interaction, 10)
+    return op
+
+
+# name -> (setup function, size axis)
+BENCHMARKS = {
+    "add_role": (bench_add_role, "guilds"),
+    "warn": (bench_warn, "warnings"),
+    "bulk_warn": (bench_bulk_warn, "targets"),
+    "warnings": (bench_warnings, "warnings"),
+    "search_warnings": (bench_search_warnings, "warnings"),
+    "top_warned": (bench_top_warned, "warnings"),
+    "search_confessions": (bench_search_confessions, "confessions"),
+    "role_select": (bench_role_select, None),
+    "confession": (bench_confession, None),
+    "category_autocomplete": (bench_category_autocomplete, "categories"),
+    "add_question": (bench_add_question, "questions"),
+}
+
+
+# --- Runner ---
+
+def reset_state(workdir: str):
+    os.chdir(workdir)
+    database.close_database()
+    database.DATABASE_FILE = os.path.join(workdir, "bench.db")
+    database.initialize_database()
+    data_manager.load_data()
+    data_manager._flush_lock = None  # bound to the previous benchmark's event loop
+    question_bank._bank = None
+    role_menu_cache._menus.clear()
+    autocomplete._category_indexes.clear()
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run_one(name: str, size: int, iterations: int, warmup: int) -> dict:
+    setup, _ = BENCHMARKS[name]
+    client = FakeClient()
+    op = await setup(client, size)
+    for _ in range(warmup):
+        await op()
+
+    durations = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        op_started = time.perf_counter()
+        await op()
+        durations.append(time.perf_counter() - op_started)
+    total = time.perf_counter() - started
+
+    # Let write-behind flushes and queued writes settle before the next benchmark.
+    await data_manager.flush_pending()
+    await close_log_dispatcher()
+    await close_confession_pipeline()
+    await close_dm_queue()
+    durations.sort()
+    return {
+        "ops_per_sec": iterations / total,
+        "p50_ms": percentile(durations, 0.50) * 1000,
+        "p99_ms": percentile(durations, 0.99) * 1000,
+    }
+
+
+def load_baselines() -> dict:
+    try:
+        with open(BASELINE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def parse_sizes(text: str) -> list:
+    return [int(size) for size in text.split(",") if size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks for JinuBot's command handlers.")
+    parser.add_argument("--only", help="comma-separated benchmark names (default: all)")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--warnings", default="1000,100000", help="warning table sizes, e.g. 1000,1000000")
+    parser.add_argument("--targets", default="100,500", help="members hit by each bulk warning")
+    parser.add_argument("--guilds", default="10000", help="configured guild counts")
+    parser.add_argument("--categories", default="100,1000", help="categories in the autocomplete guild")
+    parser.add_argument("--confessions", default="1000,100000", help="confessions in the searched guild")
+    parser.add_argument("--questions", default="1000,100000", help="questions already in the bank")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    sizes = {
+        "warnings": parse_sizes(args.warnings),
+        "targets": parse_sizes(args.targets),
+        "guilds": parse_sizes(args.guilds),
+        "categories": parse_sizes(args.categories),
+        "questions": parse_sizes(args.questions),
+        "confessions": parse_sizes(args.confessions),
+        None: [0],
+    }
+    baselines = load_baselines()
+    results = {}
+    regressions = []
+    original_dir = os.getcwd()
+
+    print(f"{'benchmark':<40} {'ops/sec':>10} {'p50':>9} {'p99':>9}  vs baseline")
+    for name in names:
+        axis = BENCHMARKS[name][1]
+        for size in sizes[axis]:
+            key = f"{name}[{axis}={size}]" if axis else name
+            with tempfile.TemporaryDirectory() as workdir:
+                # The handlers' own progress prints would swamp the results table.
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    reset_state(workdir)
+                    result = asyncio.run(run_one(name, size, args.iterations, args.warmup))
+                    database.close_database()
+                os.chdir(original_dir)
+            results[key] = result
+
+            note = ""
+            baseline = baselines.get(key)
+            if baseline:
+                change = result["p50_ms"] / baseline["p50_ms"] - 1 if baseline["p50_ms"] else 0.0
+                note = f"{change:+.0%} p50"
+                if change > args.tolerance:
+                    note += "  <-- REGRESSION"
+                    regressions.append(key)
+            print(f"{key:<40} {result['ops_per_sec']:>10.0f} {result['p50_ms']:>7.3f}ms {result['p99_ms']:>7.3f}ms  {note}")
+
+    if args.save_baseline:
+        baselines.update(results)
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(baselines, f, indent=4, sort_keys=True)
+        print(f"Saved {len(results)} baseline(s) to {BASELINE_FILE}.")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
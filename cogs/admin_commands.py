@@ -1,17 +1,44 @@
+import os
+import asyncio
+import tempfile
 import discord
 from discord.ext import commands
 from discord import app_commands
+from datetime import datetime
 from utils.data_manager import get_guild_data, save_data
+from utils.log_manager import send_log
+from utils.role_manager import bulk_add_role, can_manage
+from utils import role_menu_cache
+from utils.autocomplete import get_category_index, category_added, category_removed
+from utils.metrics import metrics
+from utils.maintenance import RETENTION_SETTINGS
+from utils.escalation import TIMEOUT_AT_SETTING, TIMEOUT_MINUTES_SETTING, KICK_AT_SETTING, DEFAULT_TIMEOUT_MINUTES, MAX_TIMEOUT_MINUTES
+from utils.data_transfer import EXPORT_COLUMNS, export_guild
+from utils.database import run_write, rebuild_search_indexes
+
+MAX_BULK_ASSIGN_MEMBERS = 1000  # members updated per /bulk_assign_role run
 
 # --- Autocomplete Function ---
 # This helper function provides suggestions for the 'category' parameter in commands.
 async def category_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
-    guild_data = get_guild_data(interaction.guild_id)
-    # Return a list of choices where the category name includes the user's current input
-    return [
-        app_commands.Choice(name=category, value=category)
-        for category in guild_data.get("roles", {}) if current.lower() in category.lower()
-    ]
+    # Names are indexed per guild, so each keystroke is a bounded lookup
+    index = await get_category_index(interaction.guild_id)
+    return [app_commands.Choice(name=category, value=category) for category in index.search(current)]
+
+# --- Helpers for /stats ---
+def latency_lines(metric: str, label: str, errors_metric: str, limit: int = 10) -> str:
+    """One line per label value: calls, p50/p99 latency and errors, busiest first."""
+    series = sorted(metrics.series(metric).items(), key=lambda item: item[1].count, reverse=True)
+    lines = []
+    for labels, histogram in series[:limit]:
+        name = dict(labels).get(label, "?")
+        errors = metrics.counter_value(errors_metric, **{label: name})
+        lines.append(
+            f"`{name}` {histogram.count}× • p50 {histogram.quantile(0.5) * 1000:.0f}ms"
+            f" • p99 {histogram.quantile(0.99) * 1000:.0f}ms • {errors:.0f} err"
+        )
+    return "\n".join(lines)[:1024] or "No data yet."
+
 
 # --- The Main Cog Class for Admin Commands ---
 
@@ -23,22 +50,68 @@ class AdminCommands(commands.Cog):
     @app_commands.describe(channel="The channel to send logs to.")
     @app_commands.checks.has_permissions(manage_guild=True)
     async def set_log_channel(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        guild_data = get_guild_data(interaction.guild_id)
+        guild_data = await get_guild_data(interaction.guild_id)
         guild_data["settings"]["log_channel"] = channel.id
-        save_data()
+        save_data(interaction.guild_id)
         await interaction.response.send_message(f"Log channel has been set to {channel.mention}.", ephemeral=True)
 
+    @app_commands.command(name="set_retention", description="Sets how long warnings or confessions are kept before being archived.")
+    @app_commands.describe(kind="What the retention period applies to", days="Days to keep them (0 keeps them forever)")
+    @app_commands.choices(kind=[
+        app_commands.Choice(name="Warnings", value="warnings"),
+        app_commands.Choice(name="Confessions", value="confessions"),
+    ])
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def set_retention(self, interaction: discord.Interaction, kind: app_commands.Choice[str], days: app_commands.Range[int, 0, 3650]):
+        guild_data = await get_guild_data(interaction.guild_id)
+        guild_data["settings"][RETENTION_SETTINGS[kind.value]] = days or None
+        save_data(interaction.guild_id)
+        if days:
+            message = f"{kind.name} older than {days} day(s) will be moved to the archive during the daily maintenance."
+        else:
+            message = f"{kind.name} will be kept forever."
+        await interaction.response.send_message(message, ephemeral=True)
+
+    @app_commands.command(name="set_escalation", description="Sets how many warnings get a user timed out or kicked automatically.")
+    @app_commands.describe(
+        timeout_at="Warnings that lead to a timeout (0 turns timeouts off)",
+        kick_at="Warnings that lead to a kick (0 turns kicks off)",
+        timeout_minutes=f"How long the timeout lasts (default {DEFAULT_TIMEOUT_MINUTES})"
+    )
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def set_escalation(self, interaction: discord.Interaction, timeout_at: app_commands.Range[int, 0, 100], kick_at: app_commands.Range[int, 0, 100],
+                             timeout_minutes: app_commands.Range[int, 1, MAX_TIMEOUT_MINUTES] = DEFAULT_TIMEOUT_MINUTES):
+        if timeout_at and kick_at and kick_at <= timeout_at:
+            await interaction.response.send_message("The kick threshold has to be higher than the timeout threshold.", ephemeral=True)
+            return
+        guild_data = await get_guild_data(interaction.guild_id)
+        settings = guild_data["settings"]
+        settings[TIMEOUT_AT_SETTING] = timeout_at or None
+        settings[TIMEOUT_MINUTES_SETTING] = timeout_minutes if timeout_at else None
+        settings[KICK_AT_SETTING] = kick_at or None
+        save_data(interaction.guild_id)
+
+        steps = []
+        if timeout_at:
+            steps.append(f"a {timeout_minutes} minute timeout from warning {timeout_at}")
+        if kick_at:
+            steps.append(f"a kick from warning {kick_at}")
+        message = f"Warned users now get {' and '.join(steps)}." if steps else "Automatic timeouts and kicks are off."
+        await interaction.response.send_message(message, ephemeral=True)
+
     @app_commands.command(name="add_category", description="Creates a new category for assignable roles.")
     @app_commands.describe(category_name="The name for the new category (e.g., Game Roles)")
     @app_commands.checks.has_permissions(manage_roles=True)
     async def add_category(self, interaction: discord.Interaction, category_name: str):
-        guild_data = get_guild_data(interaction.guild_id)
+        guild_data = await get_guild_data(interaction.guild_id)
         roles_data = guild_data.setdefault("roles", {})
         if category_name in roles_data:
             await interaction.response.send_message(f"A category named '{category_name}' already exists.", ephemeral=True)
         else:
             roles_data[category_name] = []
-            save_data()
+            save_data(interaction.guild_id)
+            category_added(interaction.guild_id, category_name)
+            role_menu_cache.invalidate(interaction.guild_id)
             await interaction.response.send_message(f"Category '{category_name}' has been created.", ephemeral=True)
 
     @app_commands.command(name="remove_category", description="Deletes a role category and all roles within it.")
@@ -46,13 +119,15 @@ class AdminCommands(commands.Cog):
     @app_commands.autocomplete(category_name=category_autocomplete)
     @app_commands.checks.has_permissions(manage_roles=True)
     async def remove_category(self, interaction: discord.Interaction, category_name: str):
-        guild_data = get_guild_data(interaction.guild_id)
+        guild_data = await get_guild_data(interaction.guild_id)
         roles_data = guild_data.get("roles", {})
         if category_name not in roles_data:
             await interaction.response.send_message(f"No category named '{category_name}' found.", ephemeral=True)
         else:
             del roles_data[category_name]
-            save_data()
+            save_data(interaction.guild_id)
+            category_removed(interaction.guild_id, category_name)
+            role_menu_cache.invalidate(interaction.guild_id)
             await interaction.response.send_message(f"Category '{category_name}' and all its roles have been removed.", ephemeral=True)
 
     @app_commands.command(name="add_role", description="Adds a role to a specific category.")
@@ -60,7 +135,7 @@ class AdminCommands(commands.Cog):
     @app_commands.autocomplete(category=category_autocomplete)
     @app_commands.checks.has_permissions(manage_roles=True)
     async def add_role(self, interaction: discord.Interaction, category: str, role: discord.Role):
-        guild_data = get_guild_data(interaction.guild_id)
+        guild_data = await get_guild_data(interaction.guild_id)
         roles_data = guild_data.get("roles", {})
         if category not in roles_data:
             await interaction.response.send_message(f"The category '{category}' does not exist. Please create it first.", ephemeral=True)
@@ -71,7 +146,8 @@ class AdminCommands(commands.Cog):
             await interaction.response.send_message(f"The role **{role.name}** is already in the '{category}' category.", ephemeral=True)
         else:
             roles_data[category].append(role_id_str)
-            save_data()
+            save_data(interaction.guild_id)
+            role_menu_cache.invalidate(interaction.guild_id)
             await interaction.response.send_message(f"Successfully added **{role.name}** to the '{category}' category.", ephemeral=True)
 
     @app_commands.command(name="remove_role", description="Removes a role from a specific category.")
@@ -79,7 +155,7 @@ class AdminCommands(commands.Cog):
     @app_commands.autocomplete(category=category_autocomplete)
     @app_commands.checks.has_permissions(manage_roles=True)
     async def remove_role(self, interaction: discord.Interaction, category: str, role: discord.Role):
-        guild_data = get_guild_data(interaction.guild_id)
+        guild_data = await get_guild_data(interaction.guild_id)
         roles_data = guild_data.get("roles", {})
         if category not in roles_data:
             await interaction.response.send_message(f"The category '{category}' does not exist.", ephemeral=True)
@@ -90,9 +166,129 @@ class AdminCommands(commands.Cog):
             await interaction.response.send_message(f"The role **{role.name}** is not in the '{category}' category.", ephemeral=True)
         else:
             roles_data[category].remove(role_id_str)
-            save_data()
+            save_data(interaction.guild_id)
+            role_menu_cache.invalidate(interaction.guild_id)
             await interaction.response.send_message(f"Successfully removed **{role.name}** from the '{category}' category.", ephemeral=True)
     
+    @app_commands.command(name="bulk_assign_role", description="Gives a category role to every member who has another role.")
+    @app_commands.describe(
+        category="The category the role belongs to",
+        role="The role to hand out",
+        members_with="Give it to everyone with this role (use @everyone for all members)"
+    )
+    @app_commands.autocomplete(category=category_autocomplete)
+    @app_commands.checks.has_permissions(manage_roles=True)
+    async def bulk_assign_role(self, interaction: discord.Interaction, category: str, role: discord.Role, members_with: discord.Role):
+        guild_data = await get_guild_data(interaction.guild_id)
+        if str(role.id) not in guild_data.get("roles", {}).get(category, []):
+            await interaction.response.send_message(f"The role **{role.name}** is not in the '{category}' category.", ephemeral=True)
+            return
+        if not can_manage(role):
+            await interaction.response.send_message(f"I can't assign **{role.name}**. Make sure my role is above it.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        # Member edits are rate limited, so one run is capped to finish well within
+        # the 15 minutes the interaction can still be answered in.
+        members = [member for member in members_with.members if role not in member.roles]
+        remaining = max(0, len(members) - MAX_BULK_ASSIGN_MEMBERS)
+        changed, failed = await bulk_add_role(members[:MAX_BULK_ASSIGN_MEMBERS], role, reason=f"Bulk assigned by {interaction.user}")
+
+        message = f"Gave **{role.name}** to {changed} member(s)."
+        if failed:
+            message += f" {failed} member(s) could not be updated."
+        if remaining:
+            message += f" {remaining} member(s) are left; run the command again to continue."
+        await interaction.followup.send(message, ephemeral=True)
+
+        log_embed = discord.Embed(
+            title="Role Update Log: Bulk Assign",
+            color=discord.Color.blue(),
+            timestamp=datetime.now()
+        )
+        log_embed.add_field(name="Role", value=role.mention, inline=True)
+        log_embed.add_field(name="Members With", value=members_with.mention, inline=True)
+        log_embed.add_field(name="Updated", value=str(changed), inline=True)
+        log_embed.add_field(name="Action By", value=interaction.user.mention, inline=False)
+        await send_log(interaction, log_embed)
+
+    @app_commands.command(name="export_data", description="Admin only: downloads this server's warnings or confessions.")
+    @app_commands.describe(kind="What to export", file_format="JSON Lines or CSV, gzip-compressed", archived="Include rows already moved to the archive")
+    @app_commands.choices(
+        kind=[
+            app_commands.Choice(name="Warnings", value="warnings"),
+            app_commands.Choice(name="Confessions", value="confessions"),
+        ],
+        file_format=[
+            app_commands.Choice(name="JSON Lines", value="jsonl"),
+            app_commands.Choice(name="CSV", value="csv"),
+        ]
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def export_data(self, interaction: discord.Interaction, kind: app_commands.Choice[str], file_format: app_commands.Choice[str] = None, archived: bool = False):
+        await interaction.response.defer(ephemeral=True)
+        columns = EXPORT_COLUMNS[kind.value]
+        if kind.value == "confessions":
+            # Confessions stay anonymous, even to the server's admins.
+            columns = tuple(column for column in columns if column != "user_id")
+        filename = f"{kind.value}-{interaction.guild_id}-{datetime.now():%Y%m%d}.{file_format.value if file_format else 'jsonl'}.gz"
+
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, filename)
+            # Streams from its own connection in a thread, so the bot keeps answering meanwhile
+            count = await asyncio.to_thread(export_guild, path, kind.value, interaction.guild_id, archived, columns)
+            if not count:
+                await interaction.followup.send(f"There are no {kind.name.lower()} to export.", ephemeral=True)
+                return
+            size = os.path.getsize(path)
+            if size > interaction.guild.filesize_limit:
+                await interaction.followup.send(
+                    f"The export ({count} rows, {size / 1024 / 1024:.1f} MB compressed) is too large to upload here. "
+                    "Ask the bot's operator to run it with `python -m utils.data_transfer export`.",
+                    ephemeral=True
+                )
+                return
+            await interaction.followup.send(f"Exported {count} {kind.name.lower()}.", file=discord.File(path, filename=filename), ephemeral=True)
+
+    @app_commands.command(name="rebuild_search_index", description="Bot owner only: rebuilds the warning and confession search indexes.")
+    async def rebuild_search_index(self, interaction: discord.Interaction):
+        # The indexes span every server, so only the bot's owner may rebuild them
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("Only the bot's owner can rebuild the search indexes.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True)
+        started = datetime.now()
+        await run_write(rebuild_search_indexes)
+        await interaction.followup.send(f"Search indexes rebuilt in {(datetime.now() - started).total_seconds():.1f}s.", ephemeral=True)
+
+    @app_commands.command(name="stats", description="Admin only: shows command latency and bot health metrics.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def stats(self, interaction: discord.Interaction):
+        embed = discord.Embed(title="Bot Stats", color=discord.Color.blurple(), timestamp=datetime.now())
+        embed.add_field(name="Commands", value=latency_lines("discord_command_seconds", "command", "discord_command_errors_total"), inline=False)
+        embed.add_field(name="Components", value=latency_lines("discord_component_seconds", "component", "discord_component_errors_total", limit=5), inline=False)
+        embed.add_field(name="Database", value=latency_lines("db_query_seconds", "op", "db_query_errors_total"), inline=False)
+        embed.add_field(name="Outbound HTTP", value=latency_lines("http_request_seconds", "host", "http_request_errors_total", limit=5), inline=False)
+
+        gauges = {}
+        for name, read in metrics.gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception:
+                continue
+        embed.add_field(
+            name="Log Queue",
+            value=f"{gauges.get('log_queue_depth', 0)} queued • {gauges.get('log_embeds_dropped', 0)} dropped • {gauges.get('log_embeds_overflow', 0)} overflowed",
+            inline=False
+        )
+        embed.add_field(
+            name="Maintenance",
+            value=f"{gauges.get('maintenance_runs', 0)} run(s) • {gauges.get('maintenance_rows_archived', 0)} rows archived • {gauges.get('maintenance_backups', 0)} backup(s)",
+            inline=False
+        )
+        embed.set_footer(text=f"Gateway latency: {self.bot.latency * 1000:.0f}ms")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.command(name="setup_roles", description="Posts an instructional message for the /roles command.")
     @app_commands.describe(channel="The channel where the instructional message will be sent.")
     @app_commands.checks.has_permissions(manage_guild=True)
@@ -2,8 +2,10 @@ import discord
 from discord.ext import commands
 from discord import app_commands, ui, Interaction, TextStyle
 from utils.data_manager import get_guild_data, save_data
-from utils.database import get_db_connection
-import uuid
+from utils.metrics import metrics
+from utils.database import execute, normalize_short_id
+from utils.confession_queue import get_confession_pipeline
+from utils.search import send_search_results
 
 # --- The Modal (Pop-up Form) ---
 class ConfessionModal(ui.Modal, title="Submit an Anonymous Confession"):
@@ -15,9 +17,10 @@ class ConfessionModal(ui.Modal, title="Submit an Anonymous Confession"):
         max_length=1000,
     )
 
+    @metrics.timed("discord_component_seconds", component="confess.modal")
     async def on_submit(self, interaction: Interaction):
         """This runs when the user hits the 'Submit' button."""
-        guild_data = get_guild_data(interaction.guild_id)
+        guild_data = await get_guild_data(interaction.guild_id)
         confession_channel_id = guild_data["settings"].get("confession_channel")
 
         if not confession_channel_id:
@@ -29,29 +32,12 @@ class ConfessionModal(ui.Modal, title="Submit an Anonymous Confession"):
             await interaction.response.send_message("I can't find the configured confession channel.", ephemeral=True)
             return
 
-        confession_id = str(uuid.uuid4())
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO confessions (confession_id, guild_id, user_id, content) VALUES (?, ?, ?, ?)",
-            (confession_id, interaction.guild_id, interaction.user.id, self.confession_text.value)
-        )
-        conn.commit()
-        conn.close()
-
-        embed = discord.Embed(
-            title="New Anonymous Confession",
-            description=self.confession_text.value,
-            color=discord.Color.from_rgb(47, 49, 54)
+        # Storing and posting happen in the background (batched, in order, with
+        # retries), so the user gets an answer straight away.
+        get_confession_pipeline(interaction.client).submit(
+            interaction.guild_id, interaction.user.id, confession_channel_id, self.confession_text.value
         )
-        embed.set_footer(text=f"Confession ID: {confession_id[:8]}")
-        
-        try:
-            await confession_channel.send(embed=embed)
-            await interaction.response.send_message("Your confession has been posted anonymously! ✅", ephemeral=True)
-        except discord.Forbidden:
-            await interaction.response.send_message("I can't post in the confessions channel.", ephemeral=True)
+        await interaction.response.send_message("Your confession has been submitted and will be posted anonymously! ✅", ephemeral=True)
 
 
 # --- The Main Cog Class ---
@@ -59,34 +45,46 @@ class Confessions(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        # Pick up confessions that were stored but not posted before the last shutdown
+        # (only our own guilds' when other worker processes serve the rest)
+        await get_confession_pipeline(self.bot).resume(self.bot.owns_guild)
+
     @app_commands.command(name="set_confession_channel", description="Sets the channel where anonymous confessions will be posted.")
     @app_commands.describe(channel="The channel for confessions.")
     @app_commands.checks.has_permissions(manage_guild=True)
     async def set_confession_channel(self, interaction: Interaction, channel: discord.TextChannel):
-        guild_data = get_guild_data(interaction.guild_id)
+        guild_data = await get_guild_data(interaction.guild_id)
         guild_data["settings"]["confession_channel"] = channel.id
-        save_data()
+        save_data(interaction.guild_id)
         await interaction.response.send_message(f"Confession channel has been set to {channel.mention}.", ephemeral=True)
 
     @app_commands.command(name="delete_confession", description="Admin only: Deletes a confession by its ID.")
-    @app_commands.describe(confession_id="The first 8 characters of the confession ID")
+    @app_commands.describe(confession_id="The confession ID shown in the confession's footer")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def delete_confession(self, interaction: discord.Interaction, confession_id: str):
         await interaction.response.defer(ephemeral=True)
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # --- THIS IS THE FIX ---
-        # Use LIKE to match the start of the UUID.
-        cursor.execute("DELETE FROM confessions WHERE confession_id LIKE ? AND guild_id = ?", (f"{confession_id}%", interaction.guild_id))
-        rows_deleted = cursor.rowcount
-        conn.commit()
-        conn.close()
+        confession_id = normalize_short_id(confession_id)
+        # Make sure it isn't posted after all if it's still waiting in the queue
+        get_confession_pipeline(self.bot).cancel(interaction.guild_id, confession_id)
+        # Exact match on the (guild_id, short_id) index, so at most one row goes.
+        rows_deleted = await execute("DELETE FROM confessions WHERE guild_id = ? AND short_id = ?", (interaction.guild_id, confession_id))
 
         if rows_deleted > 0:
-            await interaction.followup.send(f"Confession starting with ID `{confession_id}` has been successfully deleted.", ephemeral=True)
+            await interaction.followup.send(f"Confession `{confession_id}` has been successfully deleted.", ephemeral=True)
         else:
-            await interaction.followup.send(f"Could not find a confession with an ID starting with `{confession_id}`.", ephemeral=True)
+            await interaction.followup.send(f"Could not find a confession with ID `{confession_id}`.", ephemeral=True)
+
+    @app_commands.command(name="search_confessions", description="Admin only: Searches this server's confessions.")
+    @app_commands.describe(query='Words to look for; use "quotes" for an exact phrase and * for any ending')
+    @app_commands.checks.has_permissions(manage_messages=True)
+    async def search_confessions(self, interaction: discord.Interaction, query: str):
+        await interaction.response.defer(ephemeral=True)
+        # Results never show who wrote a confession
+        await send_search_results(
+            interaction, "confessions", query,
+            lambda row: (f"ID: {row['short_id']} on {row['timestamp'][:10]}", row['snippet'])
+        )
 
     @app_commands.command(name="confess", description="Submit a confession anonymously.")
     async def confess(self, interaction: Interaction):
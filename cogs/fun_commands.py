@@ -2,39 +2,87 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from discord.app_commands import Choice
-import aiohttp
-import json
+import asyncio
 import random
 import os
+from utils.cache import TTLCache
+from utils.http_client import HttpClient
+from utils.metrics import metrics
+from utils.question_bank import get_question_bank
+
+# Upstream APIs; override these to point the cog at a local stand-in server.
+TRUTH_OR_DARE_API_URL = os.getenv("TRUTH_OR_DARE_API_URL", "https://api.truthordarebot.xyz/v1")
+TENOR_API_URL = os.getenv("TENOR_API_URL", "https://tenor.googleapis.com/v2")
+
+# Search term -> GIF URLs, so repeated searches don't hit Tenor every time.
+GIF_CACHE_SIZE = int(os.getenv("GIF_CACHE_SIZE", "512"))
+GIF_CACHE_TTL = float(os.getenv("GIF_CACHE_TTL", "3600"))
 
 # --- HELPER FUNCTION TO SAVE QUESTIONS ---
-QUESTIONS_FILE = "questions.json"
 
 def add_question_to_library(question_type: str, rating: str, question: str):
-    """Adds a new question to the local JSON file if it doesn't already exist."""
-    if not os.path.exists(QUESTIONS_FILE):
-        with open(QUESTIONS_FILE, 'w') as f:
-            json.dump({"truths": {"pg": [], "pg13": [], "r": []}, "dares": {"pg": [], "pg13": [], "r": []}}, f, indent=4)
-
-    with open(QUESTIONS_FILE, 'r+') as f:
-        try:
-            data = json.load(f)
-            if question_type not in data: data[question_type] = {}
-            if rating not in data[question_type]: data[question_type][rating] = []
-            
-            if question not in data[question_type]:
-                data[question_type][rating].append(question)
-                f.seek(0)
-                json.dump(data, f, indent=4)
-                f.truncate()
-                print(f"Added new {question_type} to local library.")
-        except (json.JSONDecodeError, KeyError):
-            print("Error reading or updating questions.json.")
+    """Adds a new question to the in-memory library; it is written to the database in batches."""
+    if get_question_bank().add(question_type, rating, question):
+        print(f"Added new {question_type} to local library.")
 
 
 class FunCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.http = HttpClient()
+        self.bank = get_question_bank()
+        self.refill_task = None
+        self.gif_cache = TTLCache(maxsize=GIF_CACHE_SIZE, ttl=GIF_CACHE_TTL)
+        metrics.gauge("gif_cache_entries", lambda: len(self.gif_cache))
+        metrics.gauge("gif_cache_hits", lambda: self.gif_cache.hits)
+        metrics.gauge("gif_cache_misses", lambda: self.gif_cache.misses)
+
+    async def cog_load(self):
+        await self.http.start()
+        # Loading the bank isn't needed to come online; until it is ready the
+        # commands simply fall back to the API.
+        self.refill_task = asyncio.create_task(self.warm_up())
+
+    async def warm_up(self):
+        if not self.bank.loaded:
+            try:
+                await self.bank.load()
+            except Exception as e:
+                print(f"ERROR: Could not load the question bank: {e}")
+        # Keep a few fresh questions per rating ready so commands never wait on the API
+        await self.bank.refill_forever(self.fetch_question)
+
+    async def cog_unload(self):
+        if self.refill_task:
+            self.refill_task.cancel()
+        await self.bank.persist_pending()
+        await self.http.close()
+
+    async def fetch_question(self, question_type: str, rating: str):
+        """Fetches one question from the upstream API ('truths' -> /truth, 'dares' -> /dare)."""
+        data = await self.http.get_json(f"{TRUTH_OR_DARE_API_URL}/{question_type[:-1]}", params={"rating": rating})
+        return data.get("question")
+
+    async def pick_question(self, interaction: discord.Interaction, question_type: str, rating: str):
+        """Answers from the local bank; only goes to the API if the bank has nothing at all."""
+        question = self.bank.next_question(question_type, rating)
+        if question:
+            return question
+        await interaction.response.defer()
+        try:
+            question = await self.fetch_question(question_type, rating)
+            if question:
+                # Add the fetched question to our local library
+                add_question_to_library(question_type, rating, question)
+        except Exception as e:
+            print(f"An error occurred during API request: {e}")
+        return question
+
+    async def send_embed(self, interaction: discord.Interaction, embed: discord.Embed):
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed)
+        else:
+            await interaction.response.send_message(embed=embed)
 
     # Create a group named 'fun'
     fun = app_commands.Group(name="fun", description="A group of fun commands.")
@@ -47,21 +95,8 @@ class FunCommands(commands.Cog):
         Choice(name="R", value="r"),
     ])
     async def truth(self, interaction: discord.Interaction, rating: Choice[str] = None):
-        await interaction.response.defer()
         rating_value = rating.value if rating else random.choice(["pg", "pg13", "r"])
-        api_url = f"https://api.truthordarebot.xyz/v1/truth?rating={rating_value}" # Corrected endpoint
-        question_text = "Sorry, I couldn't fetch a question right now."
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        question_text = data.get("question", question_text)
-                        # Add the fetched question to our local library
-                        add_question_to_library("truths", rating_value, question_text)
-        except Exception as e:
-            print(f"An error occurred during API request: {e}")
+        question_text = await self.pick_question(interaction, "truths", rating_value) or "Sorry, I couldn't fetch a question right now."
 
         color_map = {"pg": discord.Color.green(), "pg13": discord.Color.blue(), "r": discord.Color.red()}
         embed = discord.Embed(
@@ -70,7 +105,7 @@ class FunCommands(commands.Cog):
             color=color_map.get(rating_value, discord.Color.purple())
         )
         embed.set_footer(text=f"Question for {interaction.user.display_name}", icon_url=self.bot.user.avatar.url)
-        await interaction.followup.send(embed=embed)
+        await self.send_embed(interaction, embed)
 
     @fun.command(name="dare", description="Gives a random dare from an API.")
     @app_commands.describe(rating="Choose the rating of the dare (defaults to random).")
@@ -80,21 +115,8 @@ class FunCommands(commands.Cog):
         Choice(name="R", value="r"),
     ])
     async def dare(self, interaction: discord.Interaction, rating: Choice[str] = None):
-        await interaction.response.defer()
         rating_value = rating.value if rating else random.choice(["pg", "pg13", "r"])
-        api_url = f"https://api.truthordarebot.xyz/v1/dare?rating={rating_value}" # Corrected endpoint
-        dare_text = "Sorry, I couldn't fetch a dare right now."
-
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        dare_text = data.get("question", dare_text)
-                        # Add the fetched dare to our local library
-                        add_question_to_library("dares", rating_value, dare_text)
-        except Exception as e:
-            print(f"An error occurred during API request: {e}")
+        dare_text = await self.pick_question(interaction, "dares", rating_value) or "Sorry, I couldn't fetch a dare right now."
 
         color_map = {"pg": 0x3498db, "pg13": 0xf1c40f, "r": 0x992d22}
         embed = discord.Embed(
@@ -103,7 +125,7 @@ class FunCommands(commands.Cog):
             color=color_map.get(rating_value, 0x2ecc71)
         )
         embed.set_footer(text=f"Dare for {interaction.user.display_name}", icon_url=self.bot.user.avatar.url)
-        await interaction.followup.send(embed=embed)
+        await self.send_embed(interaction, embed)
 
     @fun.command(name="coinflip", description="Flips a coin.")
     async def coinflip(self, interaction: discord.Interaction):
@@ -125,15 +147,18 @@ class FunCommands(commands.Cog):
             await interaction.followup.send("GIF command is not configured.")
             return
 
-        url = f"https://tenor.googleapis.com/v2/search?q={search_term}&key={tenor_api_key}&limit=8"
+        # Popular terms are served from the cache; concurrent misses share one request.
+        query = " ".join(search_term.lower().split())
+
+        async def search():
+            data = await self.http.get_json(f"{TENOR_API_URL}/search", params={"q": query, "key": tenor_api_key, "limit": 8})
+            return [result["media_formats"]["gif"]["url"] for result in data.get("results", [])]
+
         gif_url = None
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("results"):
-                            gif_url = random.choice(data["results"])["media_formats"]["gif"]["url"]
+            gif_urls = await self.gif_cache.get_or_fetch(query, search)
+            if gif_urls:
+                gif_url = random.choice(gif_urls)
         except Exception as e:
             print(f"Error fetching GIF: {e}")
         
@@ -141,6 +166,19 @@ class FunCommands(commands.Cog):
             await interaction.followup.send(gif_url)
         else:
             await interaction.followup.send(f"Sorry, I couldn't find any GIFs for '{search_term}'.")
+
+    @app_commands.command(name="gif_stats", description="Shows how well the GIF search cache is doing.")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def gif_stats(self, interaction: discord.Interaction):
+        stats = self.gif_cache.stats()
+        embed = discord.Embed(title="GIF Cache", color=discord.Color.blurple())
+        embed.add_field(name="Entries", value=f"{stats['size']} / {stats['maxsize']}", inline=True)
+        embed.add_field(name="Hit Rate", value=f"{stats['hit_rate']:.1%}", inline=True)
+        embed.add_field(name="TTL", value=f"{stats['ttl']:.0f}s", inline=True)
+        embed.add_field(name="Hits / Misses", value=f"{stats['hits']} / {stats['misses']}", inline=True)
+        embed.add_field(name="Evicted / Expired", value=f"{stats['evictions']} / {stats['expirations']}", inline=True)
+        embed.add_field(name="Collapsed Requests", value=str(stats['joined']), inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
         
 async def setup(bot: commands.Bot):
     await bot.add_cog(FunCommands(bot))
\ No newline at end of file
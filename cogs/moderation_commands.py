@@ -1,14 +1,198 @@
+import re
+import asyncio
+import aiohttp
 import discord
 from discord.ext import commands
 from discord import app_commands
-from datetime import datetime
-from utils.database import get_db_connection
+from discord.ui import View
+from datetime import datetime, timedelta, timezone
+from utils.database import fetch_all, run_read, run_write, insert_with_short_id, insert_many_with_short_ids, normalize_short_id
 from utils.log_manager import send_log
-import uuid # <-- Import the UUID library
+from utils.dm_queue import get_dm_queue, DM_SENT, DM_CLOSED, DM_FAILED
+from utils.autocomplete import AutocompleteIndex
+from utils.cache import TTLCache
+from utils.metrics import metrics
+from utils.search import send_search_results
+from utils.data_manager import get_guild_data
+from utils.escalation import warning_count, warning_counts, top_warned_users, escalation_for, describe, escalate
+
+WARNINGS_PER_PAGE = 10  # well under Discord's 25 fields per embed
+MAX_BULK_WARN_TARGETS = 500
+MAX_TOP_WARNED = 25
+
+DM_STATUS_FOOTERS = {
+    DM_SENT: "The user was notified by DM.",
+    DM_CLOSED: "Note: Could not send a DM to the user.",
+    DM_FAILED: "Note: The DM to the user failed to send.",
+}
+
+
+# --- Warning history paging ---
+# Pages are read with keyset pagination on (timestamp, rowid), which walks the
+# (guild_id, user_id, timestamp) index, so every page is one bounded query.
+
+_WARNING_PAGE_COLUMNS = "SELECT rowid, short_id, moderator_id, reason, timestamp FROM warnings WHERE guild_id = ? AND user_id = ?"
+
+
+def _warning_page(conn, guild_id: int, user_id: int, cursor=None, older: bool = True):
+    """Returns (rows, has_more) for the page before/after the (timestamp, rowid) cursor."""
+    if cursor is None:
+        rows = conn.execute(
+            f"{_WARNING_PAGE_COLUMNS} ORDER BY timestamp DESC, rowid DESC LIMIT ?",
+            (guild_id, user_id, WARNINGS_PER_PAGE + 1)
+        ).fetchall()
+    elif older:
+        rows = conn.execute(
+            f"{_WARNING_PAGE_COLUMNS} AND (timestamp, rowid) < (?, ?) ORDER BY timestamp DESC, rowid DESC LIMIT ?",
+            (guild_id, user_id, *cursor, WARNINGS_PER_PAGE + 1)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            f"{_WARNING_PAGE_COLUMNS} AND (timestamp, rowid) > (?, ?) ORDER BY timestamp, rowid LIMIT ?",
+            (guild_id, user_id, *cursor, WARNINGS_PER_PAGE + 1)
+        ).fetchall()
+    has_more = len(rows) > WARNINGS_PER_PAGE
+    rows = rows[:WARNINGS_PER_PAGE]
+    if cursor is not None and not older:
+        rows.reverse()  # newest first, like every other page
+    return rows, has_more
+
+
+def _first_warning_page(conn, guild_id: int, user_id: int):
+    total = warning_count(conn, guild_id, user_id)
+    rows, has_older = _warning_page(conn, guild_id, user_id) if total else ([], False)
+    return total, rows, has_older
+
+
+# --- Storing warnings ---
+# The triggers on `warnings` keep warning_counts current inside the same
+# transaction, so the count read back here already includes the new warning(s).
+
+def _insert_warning(conn, values: dict):
+    _, short_id = insert_with_short_id(conn, "warnings", "warning_id", values)
+    return short_id, warning_count(conn, values["guild_id"], values["user_id"])
+
+
+def _insert_bulk_warnings(conn, guild_id: int, rows: list):
+    ids = insert_many_with_short_ids(conn, "warnings", "warning_id", guild_id, rows)
+    return ids, warning_counts(conn, guild_id, [row["user_id"] for row in rows])
+
+
+def _dm_embed(guild: discord.Guild, reason: str, escalation=None) -> discord.Embed:
+    embed = discord.Embed(title=f"You have received a warning in {guild.name}", description=f"**Reason:** {reason}", color=discord.Color.orange())
+    if escalation:
+        # Sent before the action is applied, which may still fail
+        embed.add_field(name="Next Step", value=f"Because of your repeated warnings, you will be {describe(escalation)}.", inline=False)
+    return embed
+
+
+def _join_lines(lines: list, limit: int) -> str:
+    """Joins lines up to `limit` characters, summarising whatever doesn't fit."""
+    text = ""
+    for shown, line in enumerate(lines):
+        if len(text) + len(line) + 30 > limit:
+            return f"{text}...and {len(lines) - shown} more"
+        text += line + "\n"
+    return text
+
+
+# --- Warning ID autocomplete ---
+# Each guild's recent short IDs are indexed for a few minutes and kept up to date
+# by /warn and /remove_warning in between.
+MAX_INDEXED_WARNING_IDS = 5000
+_warning_id_indexes = TTLCache(maxsize=500, ttl=300.0)
+
+
+async def warning_id_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+    # Autocomplete runs before the command's permission check, so check here too.
+    if not interaction.permissions.moderate_members:
+        return []
+
+    async def build_index():
+        rows = await fetch_all(
+            "SELECT short_id FROM warnings WHERE guild_id = ? ORDER BY rowid DESC LIMIT ?",
+            (interaction.guild_id, MAX_INDEXED_WARNING_IDS)
+        )
+        return AutocompleteIndex(row['short_id'] for row in rows)
+
+    index = await _warning_id_indexes.get_or_fetch(interaction.guild_id, build_index)
+    return [app_commands.Choice(name=short_id, value=short_id) for short_id in index.search(normalize_short_id(current))]
+
+
+class WarningsPaginator(View):
+    def __init__(self, bot: commands.Bot, interaction: discord.Interaction, user: discord.Member, total: int, rows, has_older: bool):
+        super().__init__(timeout=180.0)
+        self.bot = bot
+        self.guild_id = interaction.guild_id
+        self.moderator_id = interaction.user.id
+        self.user = user
+        self.total = total
+        self.rows = rows
+        self.page = 0
+        self.has_older = has_older
+        self.update_buttons()
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.total // WARNINGS_PER_PAGE))
+
+    def update_buttons(self):
+        self.newer_button.disabled = self.page == 0
+        self.older_button.disabled = not self.has_older
+
+    def build_embed(self) -> discord.Embed:
+        embed = discord.Embed(title=f"Warning History for {self.user.display_name}", color=discord.Color.yellow())
+        embed.set_thumbnail(url=self.user.display_avatar.url)
+
+        for warning in self.rows:
+            mod = self.bot.get_user(warning['moderator_id']) or f"ID: {warning['moderator_id']}"
+            mod_name = mod.name if isinstance(mod, discord.User) else mod
+            warn_time = warning['timestamp'][:10]  # stored as 'YYYY-MM-DD HH:MM:SS'
+            embed.add_field(
+                name=f"ID: `{warning['short_id']}` on {warn_time}",
+                value=f"**Reason:** {warning['reason']}\n**Moderator:** {mod_name}"[:1024],
+                inline=False
+            )
+        embed.set_footer(text=f"{self.total} warning(s) total • Page {self.page + 1} of {self.page_count}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.moderator_id:
+            await interaction.response.send_message("Only the moderator who ran this command can page through it.", ephemeral=True)
+            return False
+        return True
+
+    @metrics.timed("discord_component_seconds", component="warnings.page")
+    async def turn_page(self, interaction: discord.Interaction, older: bool):
+        edge = self.rows[-1] if older else self.rows[0]
+        rows, has_more = await run_read(_warning_page, self.guild_id, self.user.id, (edge['timestamp'], edge['rowid']), older)
+        if not rows:
+            # Warnings were removed underneath us; start over from the newest.
+            rows, has_more = await run_read(_warning_page, self.guild_id, self.user.id)
+            self.page, older = 0, True
+        else:
+            self.page += 1 if older else -1
+            if not older and not has_more:
+                self.page = 0
+        self.rows = rows
+        # Paging back towards newer warnings always leaves older ones behind us.
+        self.has_older = has_more if older else True
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="◀ Newer", style=discord.ButtonStyle.secondary)
+    async def newer_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn_page(interaction, older=False)
+
+    @discord.ui.button(label="Older ▶", style=discord.ButtonStyle.secondary)
+    async def older_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn_page(interaction, older=True)
+
 
 class ModerationCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.background_tasks = set()  # DM status updates still waiting on delivery
 
     @app_commands.command(name="warn", description="Warns a user and records the incident.")
     @app_commands.describe(user="The user to warn", reason="The reason for the warning")
@@ -16,26 +200,29 @@ class ModerationCommands(commands.Cog):
     async def warn(self, interaction: discord.Interaction, user: discord.Member, reason: str):
         await interaction.response.defer(ephemeral=True)
 
-        # Generate a UUID for the warning
-        warning_id = str(uuid.uuid4())
+        # Store the warning under a UUID plus a short ID that is unique in this guild
+        short_id, count = await run_write(_insert_warning, {
+            "guild_id": interaction.guild_id,
+            "user_id": user.id,
+            "moderator_id": interaction.user.id,
+            "reason": reason,
+        })
+        guild_data = await get_guild_data(interaction.guild_id)
+        escalation = escalation_for(guild_data["settings"], count)
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO warnings (warning_id, guild_id, user_id, moderator_id, reason) VALUES (?, ?, ?, ?, ?)",
-            (warning_id, interaction.guild_id, user.id, interaction.user.id, reason)
-        )
-        conn.commit()
-        conn.close()
+        index = _warning_id_indexes.get(interaction.guild_id)
+        if index is not None:
+            index.add(short_id)
 
-        # Create the confirmation embed using the shortened UUID
+        # Create the confirmation embed using the short ID
         mod_embed = discord.Embed(
             title="✅ User Warned",
-            description=f"**Warning ID:** `{warning_id[:8]}`",
+            description=f"**Warning ID:** `{short_id}`",
             color=discord.Color.orange()
         )
         mod_embed.add_field(name="User", value=user.mention, inline=True)
         mod_embed.add_field(name="Moderator", value=interaction.user.mention, inline=True)
+        mod_embed.add_field(name="Total Warnings", value=str(count), inline=True)
         mod_embed.add_field(name="Reason", value=reason, inline=False)
         mod_embed.set_thumbnail(url=user.display_avatar.url)
 
@@ -48,74 +235,244 @@ class ModerationCommands(commands.Cog):
         log_embed.add_field(name="Warned User", value=f"{user.mention} (`{user.id}`)", inline=False)
         log_embed.add_field(name="Moderator", value=f"{interaction.user.mention} (`{interaction.user.id}`)", inline=False)
         log_embed.add_field(name="Reason", value=reason, inline=False)
-        log_embed.set_footer(text=f"Warning ID: {warning_id[:8]}")
+        log_embed.set_footer(text=f"Warning ID: {short_id} • Warning #{count} for this user")
+
+        # The DM goes out in the background: the moderator hears back as soon as
+        # the warning is stored, and the reply is updated once the DM is delivered.
+        delivery = get_dm_queue().deliver(user, _dm_embed(interaction.guild, reason, escalation))
+
+        # Crossing a threshold times the user out or kicks them. That happens in the
+        # background too (a kick waits for the DM), so it never delays the reply.
+        if escalation:
+            mod_embed.add_field(name="Escalation", value=f"Warning #{count}: the user will be {describe(escalation)}.", inline=False)
+            log_embed.add_field(name="Escalation", value=f"Warning #{count}: the user will be {describe(escalation)}.", inline=False)
         await send_log(interaction, log_embed)
-        
+
+        if delivery.done() and not escalation:
+            mod_embed.set_footer(text=DM_STATUS_FOOTERS[delivery.result()])
+            await interaction.followup.send(embed=mod_embed)
+            return
+
+        mod_embed.set_footer(text="Sending a DM to the user...")
+        message = await interaction.followup.send(embed=mod_embed, wait=True)
+        if escalation:
+            self.start_background_task(self.report_escalation(interaction, message, mod_embed, delivery, user, escalation, count, reason))
+        else:
+            self.start_background_task(self.report_dm_status(message, mod_embed, delivery))
+
+    def start_background_task(self, coro):
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def report_escalation(self, interaction: discord.Interaction, message: discord.WebhookMessage, embed: discord.Embed,
+                                delivery: asyncio.Future, member: discord.Member, escalation, count: int, reason: str):
+        _, outcome = await escalate(member, escalation, count, reason, delivery)
+        embed.set_field_at(len(embed.fields) - 1, name="Escalation", value=outcome, inline=False)
+
+        log_embed = discord.Embed(title="Moderation Log: Warning Escalated", description=outcome, color=discord.Color.red(), timestamp=datetime.now())
+        log_embed.add_field(name="Moderator", value=f"{interaction.user.mention} (`{interaction.user.id}`)", inline=False)
+        await send_log(interaction, log_embed)
+        # One edit with both the outcome and the DM status
+        await self.report_dm_status(message, embed, delivery)
+
+    async def report_dm_status(self, message: discord.WebhookMessage, embed: discord.Embed, delivery: asyncio.Future):
+        embed.set_footer(text=DM_STATUS_FOOTERS[await delivery])
         try:
-            dm_embed = discord.Embed(title=f"You have received a warning in {interaction.guild.name}", description=f"**Reason:** {reason}", color=discord.Color.orange())
-            await user.send(embed=dm_embed)
-        except discord.Forbidden:
-            mod_embed.set_footer(text="Note: Could not send a DM to the user.")
+            await message.edit(embed=embed)
+        except (discord.HTTPException, aiohttp.ClientError):
+            pass  # dismissed by the moderator, or the interaction token expired
+
+    @app_commands.command(name="bulk_warn", description="Warns many users at once with one shared reason.")
+    @app_commands.describe(
+        reason="The reason for the warnings",
+        users="Mentions or user IDs, separated by spaces",
+        role="Warn every member with this role",
+        joined_within="Warn every member who joined in the last N minutes"
+    )
+    @app_commands.checks.has_permissions(moderate_members=True)
+    async def bulk_warn(self, interaction: discord.Interaction, reason: str, users: str = None, role: discord.Role = None,
+                        joined_within: app_commands.Range[int, 1, 1440] = None):
+        await interaction.response.defer(ephemeral=True)
+        if not (users or role or joined_within):
+            await interaction.followup.send("Pick at least one of `users`, `role` or `joined_within`.", ephemeral=True)
+            return
+
+        # --- Collect the targets (from the member cache, no API calls) ---
+        guild = interaction.guild
+        targets = {}
+        not_found = 0
+        if users:
+            for user_id in dict.fromkeys(int(match) for match in re.findall(r"\d{15,20}", users)):
+                member = guild.get_member(user_id)
+                if member:
+                    targets[member.id] = member
+                else:
+                    not_found += 1
+        if role:
+            targets.update((member.id, member) for member in role.members)
+        if joined_within:
+            since = datetime.now(timezone.utc) - timedelta(minutes=joined_within)
+            targets.update((member.id, member) for member in guild.members if member.joined_at and member.joined_at >= since)
+        # Never warn bots or the moderator running the command.
+        targets = [member for member in targets.values() if not member.bot and member.id != interaction.user.id]
+
+        if not targets:
+            await interaction.followup.send("No members matched, nobody was warned.", ephemeral=True)
+            return
+        if len(targets) > MAX_BULK_WARN_TARGETS:
+            await interaction.followup.send(f"That matches {len(targets)} members; bulk warnings are limited to {MAX_BULK_WARN_TARGETS} at a time.", ephemeral=True)
+            return
 
-        await interaction.followup.send(embed=mod_embed)
+        # --- One transaction for every warning ---
+        ids, counts = await run_write(_insert_bulk_warnings, interaction.guild_id, [
+            {"user_id": member.id, "moderator_id": interaction.user.id, "reason": reason}
+            for member in targets
+        ])
+        settings = (await get_guild_data(interaction.guild_id))["settings"]
+        escalations = {member.id: escalation_for(settings, counts[member.id]) for member in targets}
+        escalated = [member for member in targets if escalations[member.id]]
+
+        index = _warning_id_indexes.get(interaction.guild_id)
+        if index is not None:
+            for _, short_id in ids:
+                index.add(short_id)
+
+        # --- One log entry for the whole batch ---
+        lines = [f"{member.mention} (`{member.id}`) • `{short_id}`" for member, (_, short_id) in zip(targets, ids)]
+        log_embed = discord.Embed(
+            title=f"Moderation Log: {len(targets)} Users Warned",
+            description=_join_lines(lines, 4000),
+            color=discord.Color.dark_orange(),
+            timestamp=datetime.now()
+        )
+        log_embed.add_field(name="Moderator", value=f"{interaction.user.mention} (`{interaction.user.id}`)", inline=False)
+        log_embed.add_field(name="Reason", value=reason[:1024], inline=False)
+        if escalated:
+            log_embed.add_field(name="Escalation", value=f"{len(escalated)} member(s) crossed a timeout/kick threshold.", inline=False)
+        await send_log(interaction, log_embed)
+
+        # --- Reply now, DMs go out through the shared delivery queue ---
+        dm_embeds = {}  # one embed per distinct escalation, shared by everyone it applies to
+        dm_queue = get_dm_queue()
+        deliveries = {}
+        for member in targets:
+            escalation = escalations[member.id]
+            if escalation not in dm_embeds:
+                dm_embeds[escalation] = _dm_embed(guild, reason, escalation)
+            deliveries[member.id] = dm_queue.deliver(member, dm_embeds[escalation])
+
+        mod_embed = discord.Embed(
+            title=f"✅ {len(targets)} Users Warned",
+            description=_join_lines(lines, 4000),
+            color=discord.Color.orange()
+        )
+        mod_embed.add_field(name="Reason", value=reason[:1024], inline=False)
+        if not_found:
+            mod_embed.add_field(name="Skipped", value=f"{not_found} ID(s) are not members of this server.", inline=False)
+        if escalated:
+            mod_embed.add_field(name="Escalation", value=f"{len(escalated)} member(s) will be timed out or kicked once their DMs are sent.", inline=False)
+        mod_embed.set_footer(text=f"Sending DMs to {len(targets)} users...")
+        message = await interaction.followup.send(embed=mod_embed, wait=True)
+        self.start_background_task(self.report_bulk_dm_status(message, mod_embed, deliveries, [
+            (member, escalations[member.id], counts[member.id]) for member in escalated
+        ], reason))
+
+    async def report_bulk_dm_status(self, message: discord.WebhookMessage, embed: discord.Embed, deliveries: dict,
+                                    escalated: list, reason: str):
+        results = await asyncio.gather(*deliveries.values())
+        embed.set_footer(text=f"DMs: {results.count(DM_SENT)} sent, {results.count(DM_CLOSED)} closed, {results.count(DM_FAILED)} failed.")
+        if escalated:
+            # The DMs are all out, so kicked members will have read theirs first.
+            outcomes = await asyncio.gather(*(escalate(member, escalation, count, reason) for member, escalation, count in escalated))
+            actions = [escalation[0] for (_, escalation, _), (succeeded, _) in zip(escalated, outcomes) if succeeded]
+            summary = f"{actions.count('timeout')} timed out, {actions.count('kick')} kicked"
+            failures = [text for succeeded, text in outcomes if not succeeded]
+            if failures:
+                summary += f", {len(failures)} failed:\n" + _join_lines(failures, 900)
+            embed.set_field_at(len(embed.fields) - 1, name="Escalation", value=summary, inline=False)
+        try:
+            await message.edit(embed=embed)
+        except (discord.HTTPException, aiohttp.ClientError):
+            pass
 
     @app_commands.command(name="warnings", description="Checks the warning history of a user.")
     @app_commands.describe(user="The user whose warnings you want to see")
     @app_commands.checks.has_permissions(moderate_members=True)
     async def warnings(self, interaction: discord.Interaction, user: discord.Member):
         await interaction.response.defer(ephemeral=True)
-        conn = get_db_connection()
-        user_warnings = conn.execute(
-            "SELECT warning_id, moderator_id, reason, timestamp FROM warnings WHERE guild_id = ? AND user_id = ? ORDER BY timestamp DESC",
-            (interaction.guild_id, user.id)
-        ).fetchall()
-        conn.close()
+        total, rows, has_older = await run_read(_first_warning_page, interaction.guild_id, user.id)
 
-        if not user_warnings:
+        if not total:
             await interaction.followup.send(f"{user.display_name} has a clean record.", ephemeral=True)
             return
 
-        embed = discord.Embed(title=f"Warning History for {user.display_name}", color=discord.Color.yellow())
-        embed.set_thumbnail(url=user.display_avatar.url)
+        view = WarningsPaginator(self.bot, interaction, user, total, rows, has_older)
+        await interaction.followup.send(embed=view.build_embed(), view=view if total > WARNINGS_PER_PAGE else discord.utils.MISSING)
 
-        for warning in user_warnings:
-            mod = self.bot.get_user(warning['moderator_id']) or f"ID: {warning['moderator_id']}"
-            mod_name = mod.name if isinstance(mod, discord.User) else mod
-            warn_time = datetime.strptime(warning['timestamp'], '%Y-%m-%d %H:%M:%S').strftime('%Y-%m-%d')
-            # Display the shortened UUID
-            embed.add_field(
-                name=f"ID: `{warning['warning_id'][:8]}` on {warn_time}",
-                value=f"**Reason:** {warning['reason']}\n**Moderator:** {mod_name}",
-                inline=False
+    @app_commands.command(name="top_warned", description="Lists the members with the most warnings.")
+    @app_commands.describe(limit="How many members to list (default 10)")
+    @app_commands.checks.has_permissions(moderate_members=True)
+    async def top_warned(self, interaction: discord.Interaction, limit: app_commands.Range[int, 1, MAX_TOP_WARNED] = 10):
+        await interaction.response.defer(ephemeral=True)
+        rows = await run_read(top_warned_users, interaction.guild_id, limit)
+        if not rows:
+            await interaction.followup.send("Nobody in this server has been warned.", ephemeral=True)
+            return
+
+        lines = [
+            f"**{rank}.** <@{row['user_id']}> • {row['warning_count']} warning(s), last on {(row['last_warning_at'] or '')[:10]}"
+            for rank, row in enumerate(rows, start=1)
+        ]
+        embed = discord.Embed(title="Most Warned Members", description=_join_lines(lines, 4000), color=discord.Color.yellow())
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="search_warnings", description="Searches this server's warning reasons.")
+    @app_commands.describe(query='Words to look for; use "quotes" for an exact phrase and * for any ending')
+    @app_commands.checks.has_permissions(moderate_members=True)
+    async def search_warnings(self, interaction: discord.Interaction, query: str):
+        await interaction.response.defer(ephemeral=True)
+
+        def format_row(row):
+            return (
+                f"ID: {row['short_id']} on {row['timestamp'][:10]}",
+                f"**User:** <@{row['user_id']}> • **Moderator:** <@{row['moderator_id']}>\n{row['snippet']}"
             )
-        await interaction.followup.send(embed=embed)
+        await send_search_results(interaction, "warnings", query, format_row)
 
     # ...
     
-    @app_commands.command(name="remove_warning", description="Removes a warning by the start of its ID.")
-    @app_commands.describe(warning_id="The first 8 characters of the warning ID")
+    @app_commands.command(name="remove_warning", description="Removes a warning by its ID.")
+    @app_commands.describe(warning_id="The warning ID shown when the warning was issued")
+    @app_commands.autocomplete(warning_id=warning_id_autocomplete)
     @app_commands.checks.has_permissions(moderate_members=True)
     async def remove_warning(self, interaction: discord.Interaction, warning_id: str):
         await interaction.response.defer(ephemeral=True)
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        warning_id = normalize_short_id(warning_id)
+
+        def find_and_delete(conn):
+            # Step 1: Find the warning details *before* deleting it (exact match on the short ID index)
+            row = conn.execute(
+                "SELECT warning_id, user_id, reason FROM warnings WHERE guild_id = ? AND short_id = ?",
+                (interaction.guild_id, warning_id)
+            ).fetchone()
+            # Step 2: Now that we have the details, delete exactly that warning
+            if row:
+                conn.execute("DELETE FROM warnings WHERE warning_id = ?", (row['warning_id'],))
+            return row
 
-        # Step 1: Find the warning details *before* deleting it
-        cursor.execute("SELECT user_id, reason FROM warnings WHERE warning_id LIKE ? AND guild_id = ?", (f"{warning_id}%", interaction.guild_id))
-        warning_to_delete = cursor.fetchone()
+        warning_to_delete = await run_write(find_and_delete)
 
         if not warning_to_delete:
-            await interaction.followup.send(f"Could not find a warning with an ID starting with `{warning_id}`.", ephemeral=True)
-            conn.close()
+            await interaction.followup.send(f"Could not find a warning with ID `{warning_id}`.", ephemeral=True)
             return
 
-        # Step 2: Now that we have the details, delete the warning
-        cursor.execute("DELETE FROM warnings WHERE warning_id LIKE ? AND guild_id = ?", (f"{warning_id}%", interaction.guild_id))
-        conn.commit()
-        conn.close()
+        index = _warning_id_indexes.get(interaction.guild_id)
+        if index is not None:
+            index.remove(warning_id)
 
         # Step 3: Send a confirmation to the moderator
-        await interaction.followup.send(f"Warning starting with ID `{warning_id}` has been deleted.", ephemeral=True)
+        await interaction.followup.send(f"Warning `{warning_id}` has been deleted.", ephemeral=True)
 
         # Step 4: Log the action
         warned_user = self.bot.get_user(warning_to_delete['user_id']) or f"ID: {warning_to_delete['user_id']}"
@@ -126,7 +483,7 @@ class ModerationCommands(commands.Cog):
             color=discord.Color.green(),
             timestamp=datetime.now()
         )
-        log_embed.add_field(name="Removed Warning Starting With ID", value=f"`{warning_id}`", inline=False)
+        log_embed.add_field(name="Removed Warning ID", value=f"`{warning_id}`", inline=False)
         log_embed.add_field(name="Original User", value=warned_user_mention, inline=False)
         log_embed.add_field(name="Original Reason", value=warning_to_delete['reason'], inline=False)
         log_embed.add_field(name="Action By", value=interaction.user.mention, inline=False)
@@ -1,57 +1,91 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from discord.ui import Select, View
+from discord.ui import Button, Select, View
 from datetime import datetime
 from utils.data_manager import get_guild_data
 from utils.log_manager import send_log # <-- Import the new log function
+from utils.role_manager import apply_role_changes, can_manage
+from utils import role_menu_cache
+from utils.role_menu_cache import get_category_pages, get_role_pages
+from utils.metrics import metrics
 
 # --- UI Select Menus ---
 
 
+class PagedSelectView(View):
+    """Shows one select menu per page of options, with buttons to flip between pages."""
+
+    def __init__(self, pages: list, make_select, timeout: float = 180.0):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.make_select = make_select
+        self.page = 0
+        self.render()
+
+    def render(self):
+        self.clear_items()
+        self.add_item(self.make_select(list(self.pages[self.page]) if self.pages else []))
+        if len(self.pages) > 1:
+            previous_button = Button(label="◀ Previous", style=discord.ButtonStyle.secondary, disabled=self.page == 0, row=1)
+            previous_button.callback = self.previous_page
+            page_label = Button(label=f"Page {self.page + 1}/{len(self.pages)}", disabled=True, row=1)
+            next_button = Button(label="Next ▶", style=discord.ButtonStyle.secondary, disabled=self.page == len(self.pages) - 1, row=1)
+            next_button.callback = self.next_page
+            self.add_item(previous_button)
+            self.add_item(page_label)
+            self.add_item(next_button)
+
+    @metrics.timed("discord_component_seconds", component="roles.page")
+    async def previous_page(self, interaction: discord.Interaction):
+        self.page = max(0, self.page - 1)
+        self.render()
+        await interaction.response.edit_message(view=self)
+
+    @metrics.timed("discord_component_seconds", component="roles.page")
+    async def next_page(self, interaction: discord.Interaction):
+        self.page = min(len(self.pages) - 1, self.page + 1)
+        self.render()
+        await interaction.response.edit_message(view=self)
+
+
 class RoleSelectMenu(Select):
-    def __init__(self, category: str, interaction: discord.Interaction):
-        guild = interaction.guild
-        user_roles = interaction.user.roles
-        options = []
-        
-        guild_data = get_guild_data(guild.id)
-        role_ids = guild_data["roles"].get(category, [])
-        for role_id in role_ids:
-            role = guild.get_role(int(role_id))
-            if role:
-                options.append(discord.SelectOption(
-                    label=role.name,
-                    value=str(role.id),
-                    description="Select to add or remove this role."
-                ))
-        
+    def __init__(self, category: str, options: list):
         super().__init__(
             placeholder=f"Select one or more roles from '{category}'...",
             min_values=1,
             max_values=len(options) if options else 1,
-            options=options,
+            options=options or [discord.SelectOption(label="No roles found", value="disabled")],
             disabled=not options
         )
 
+    @metrics.timed("discord_component_seconds", component="roles.role_select")
     async def callback(self, interaction: discord.Interaction):
         member = interaction.user
         added_roles = []
         removed_roles = []
 
-        # Loop through each selected role and sort it into an added/removed list
+        # Sort each selected role into an added/removed list
         for role_id in self.values:
+            if role_id == "disabled":
+                continue
             role = interaction.guild.get_role(int(role_id))
-            if not role:
+            if not role or not can_manage(role):
                 continue
 
             if role in member.roles:
-                await member.remove_roles(role)
                 removed_roles.append(role)
             else:
-                await member.add_roles(role)
                 added_roles.append(role)
-        
+
+        # Apply the whole change as one member edit instead of one request per role
+        try:
+            await apply_role_changes(member, add=added_roles, remove=removed_roles, reason="Self-assigned via /roles")
+        except discord.Forbidden:
+            await interaction.response.send_message("I don't have permission to update your roles.", ephemeral=True)
+            self.view.stop()
+            return
+
         # --- THIS IS THE CORRECTED LOGIC ---
 
         # 1. Create the confirmation message for the user
@@ -87,22 +121,22 @@ class RoleSelectMenu(Select):
 
 
 class CategorySelectMenu(Select):
-    def __init__(self, interaction: discord.Interaction):
-        guild_data = get_guild_data(interaction.guild_id)
-        options = [discord.SelectOption(label=category) for category in guild_data.get("roles", {})]
+    def __init__(self, options: list):
         if not options:
-            options.append(discord.SelectOption(label="No categories found", value="disabled"))
+            options = [discord.SelectOption(label="No categories found", value="disabled")]
         
-        super().__init__(placeholder="Choose a role category...", options=options, disabled=not options)
+        super().__init__(placeholder="Choose a role category...", options=options)
 
+    @metrics.timed("discord_component_seconds", component="roles.category_select")
     async def callback(self, interaction: discord.Interaction):
         chosen_category = self.values[0]
         if chosen_category == "disabled":
             await interaction.response.defer()
             return
             
-        view = View(timeout=180.0)
-        view.add_item(RoleSelectMenu(category=chosen_category, interaction=interaction))
+        # Options are prebuilt per category and split into pages of 25
+        pages = await get_role_pages(interaction.guild, chosen_category)
+        view = PagedSelectView(pages, lambda options: RoleSelectMenu(category=chosen_category, options=options))
         
         await interaction.response.edit_message(
             content=f"Now, select a role from the **{chosen_category}** category:", 
@@ -117,14 +151,14 @@ class UserCommands(commands.Cog):
 
     @app_commands.command(name="roles", description="Choose a role from a categorized menu!")
     async def roles(self, interaction: discord.Interaction):
-        guild_data = get_guild_data(interaction.guild_id)
+        guild_data = await get_guild_data(interaction.guild_id)
         if not guild_data.get("roles"):
             await interaction.response.send_message("No role categories have been configured for this server.", ephemeral=True)
             return
         
         # Create the initial view with the category selector
-        view = View(timeout=180.0) 
-        view.add_item(CategorySelectMenu(interaction=interaction))
+        pages = await get_category_pages(interaction.guild_id)
+        view = PagedSelectView(pages, CategorySelectMenu)
         
         await interaction.response.send_message(
             "Please select a category:", 
@@ -132,6 +166,17 @@ class UserCommands(commands.Cog):
             ephemeral=True
         )
 
+    # --- Keep the prebuilt role menus in sync with the guild's roles ---
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name:
+            role_menu_cache.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        role_menu_cache.invalidate(role.guild.id)
+
 # Required setup function to load the cog
 async def setup(bot: commands.Bot):
     await bot.add_cog(UserCommands(bot))
@@ -0,0 +1,173 @@
+"""Runs the bot as several worker processes, each serving its own range of shards.
+
+    python launcher.py --processes 4              # shard count as recommended by Discord
+    python launcher.py --processes 4 --shards 16
+
+Every worker is a full MyBot (an AutoShardedBot) that only connects the shards
+it was given. They share the SQLite database; guild config changes made in one
+worker reach the others through utils/config_sync.py. The first worker syncs
+the command tree and runs database maintenance. A worker that crashes is
+restarted after a growing delay; Ctrl+C or SIGTERM shuts every worker down cleanly.
+"""
+import os
+import sys
+import time
+import signal
+import asyncio
+import argparse
+import multiprocessing
+import discord
+from dotenv import load_dotenv
+
+load_dotenv()
+
+IDENTIFY_WINDOW = 5.0      # Discord allows max_concurrency IDENTIFYs per 5 seconds
+SHUTDOWN_TIMEOUT = 30.0    # seconds workers get to flush and disconnect before being killed
+RESTART_DELAY = 5.0        # first restart delay after a crash, doubled for each quick crash after that
+MAX_RESTART_DELAY = 300.0
+STABLE_AFTER = 600.0       # a worker that ran this long before crashing starts over at RESTART_DELAY
+
+
+def split_shards(shard_count: int, processes: int) -> list:
+    """Splits shard IDs 0..shard_count-1 into `processes` contiguous, near-equal ranges."""
+    processes = min(processes, shard_count)
+    size, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for index in range(processes):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+async def fetch_gateway_info(token: str) -> tuple:
+    """Asks Discord for the recommended shard count and how many shards may identify at once."""
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _, session_start_limit = await http.get_bot_gateway()
+    finally:
+        await http.close()
+    return shards, session_start_limit.get("max_concurrency", 1)
+
+
+def run_worker(index: int, shard_ids: list, shard_count: int, token: str):
+    """Entry point of a worker process."""
+    if hasattr(os, "setpgrp"):
+        # Signals come from the launcher only, so Ctrl+C in the terminal isn't delivered twice.
+        os.setpgrp()
+    from role_bot import MyBot
+
+    print(f"Worker {index}: starting shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}.")
+    MyBot(shard_ids=shard_ids, shard_count=shard_count, worker_index=index).run(token)
+
+
+class Launcher:
+    """Starts the workers, restarts the ones that crash and stops them all on shutdown."""
+
+    def __init__(self, token: str, shard_ranges: list, shard_count: int, max_concurrency: int):
+        self.token = token
+        self.shard_ranges = shard_ranges
+        self.shard_count = shard_count
+        self.max_concurrency = max(1, max_concurrency)
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = {}  # index -> (process, started_at)
+        self.restart_delays = {}
+        self.restart_at = {}
+        self.stopping = False
+
+    def identify_time(self, shard_ids: list) -> float:
+        """Roughly how long a worker needs to get all of its shards through IDENTIFY."""
+        return -(-len(shard_ids) // self.max_concurrency) * IDENTIFY_WINDOW
+
+    def start_worker(self, index: int):
+        shard_ids = self.shard_ranges[index]
+        process = self.context.Process(
+            target=run_worker, args=(index, shard_ids, self.shard_count, self.token), name=f"worker-{index}"
+        )
+        process.start()
+        self.workers[index] = (process, time.monotonic())
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGTERM, self.request_stop)
+
+        # Start the workers one after another, so their shards don't all identify at once.
+        for index, shard_ids in enumerate(self.shard_ranges):
+            if self.stopping:
+                break
+            self.start_worker(index)
+            if index + 1 < len(self.shard_ranges):
+                self.sleep(self.identify_time(shard_ids))
+
+        while not self.stopping:
+            self.check_workers()
+            self.sleep(1.0)
+        self.stop_workers()
+
+    def sleep(self, seconds: float):
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            time.sleep(min(0.2, deadline - time.monotonic()))
+
+    def check_workers(self):
+        now = time.monotonic()
+        for index, (process, started_at) in list(self.workers.items()):
+            if process.is_alive():
+                continue
+            if index not in self.restart_at:
+                delay = RESTART_DELAY if now - started_at > STABLE_AFTER else self.restart_delays.get(index, RESTART_DELAY)
+                self.restart_delays[index] = min(delay * 2, MAX_RESTART_DELAY)
+                self.restart_at[index] = now + delay
+                print(f"ERROR: Worker {index} exited with code {process.exitcode}, restarting in {delay:.0f}s.")
+            elif now >= self.restart_at[index]:
+                del self.restart_at[index]
+                self.start_worker(index)
+
+    def request_stop(self, signum, frame):
+        if not self.stopping:
+            print("Shutting down workers...")
+        self.stopping = True
+
+    def stop_workers(self):
+        processes = [process for process, _ in self.workers.values() if process.is_alive()]
+        for process in processes:
+            # SIGINT is what makes discord.py close the bot (and flush our queues)
+            os.kill(process.pid, signal.SIGINT)
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"ERROR: Worker {process.name} did not stop in time, killing it.")
+                process.kill()
+                process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot as several sharded worker processes.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="worker processes to start")
+    parser.add_argument("--shards", type=int, help="total shard count (default: Discord's recommendation)")
+    args = parser.parse_args()
+
+    token = os.getenv("DISCORD_BOT_TOKEN")
+    if not token:
+        print("Error: DISCORD_BOT_TOKEN not found in .env file.")
+        sys.exit(1)
+
+    # Migrations and the JSON import run here, once, before any worker opens the database.
+    from utils.database import initialize_database, close_database
+    from utils.data_manager import load_data
+    initialize_database()
+    load_data()
+    close_database()
+
+    shard_count, max_concurrency = asyncio.run(fetch_gateway_info(token))
+    if args.shards:
+        shard_count = args.shards
+    shard_ranges = split_shards(shard_count, max(1, args.processes))
+    print(f"Running {shard_count} shard(s) in {len(shard_ranges)} worker process(es).")
+    Launcher(token, shard_ranges, shard_count, max_concurrency).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
+from utils.startup import StartupReport, PROCESS_STARTED # First, so import time is counted too
 import discord
 import os
+import sys
+import time
+import json
+import asyncio
+import hashlib
+from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
-from utils.data_manager import load_data
-from utils.database import initialize_database # Make sure this import is at the top
+from utils.data_manager import load_data, flush_pending
+from utils.database import initialize_database, close_database # Make sure this import is at the top
+from utils.log_manager import close_log_dispatcher
+from utils.confession_queue import close_confession_pipeline
+from utils.dm_queue import close_dm_queue
+from utils.maintenance import get_maintenance, close_maintenance
+from utils.config_sync import get_config_sync, close_config_sync
+from utils.metrics import metrics, start_metrics_server
 
 # Load environment variables
 load_dotenv()
@@ -12,40 +25,172 @@ load_dotenv()
 intents = discord.Intents.default()
 intents.members = True
 
-# Subclass commands.Bot
-class MyBot(commands.Bot):
-    def __init__(self):
-        super().__init__(command_prefix="!#$%", intents=intents)
+# --- Command sync settings ---
+# The tree is only synced when its hash differs from the one stored after the last sync.
+COMMAND_HASH_FILE = ".command_tree_hash.json"
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC") == "1" or "--force-sync" in sys.argv
+DEV_GUILD_ID = os.getenv("DEV_GUILD_ID")  # sync to this guild only (instant updates while developing)
+
+
+def load_command_hashes() -> dict:
+    try:
+        with open(COMMAND_HASH_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_command_hashes(hashes: dict):
+    with open(COMMAND_HASH_FILE, 'w') as f:
+        json.dump(hashes, f, indent=4)
+
+
+# Cogs are found next to this file, so the bot can be started from any directory
+COGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cogs")
+
+# Serve Prometheus metrics on this local port when set (e.g. METRICS_PORT=9108)
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+
+# --- Per-command timing ---
+class InstrumentedTree(app_commands.CommandTree):
+    """Stamps every app command with a start time so its latency can be recorded."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras["started_at"] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        command_name = interaction.command.qualified_name if interaction.command else "unknown"
+        record_command(interaction, command_name, failed=True)
+        await super().on_error(interaction, error)
+
+
+def record_command(interaction: discord.Interaction, command_name: str, failed: bool = False):
+    started_at = interaction.extras.get("started_at")
+    if started_at is not None:
+        metrics.observe("discord_command_seconds", time.perf_counter() - started_at, command=command_name)
+    if failed:
+        metrics.inc("discord_command_errors_total", command=command_name)
+
+
+# Subclass commands.AutoShardedBot; on its own it runs every shard Discord recommends,
+# under launcher.py each worker process runs its own range of shards.
+class MyBot(commands.AutoShardedBot):
+    def __init__(self, shard_ids: list = None, shard_count: int = None, worker_index: int = 0):
+        super().__init__(command_prefix="!#$%", intents=intents, tree_cls=InstrumentedTree, shard_ids=shard_ids, shard_count=shard_count)
+        self.metrics_server = None
+        self.worker_index = worker_index
+        # Command sync and database maintenance happen once, in the first worker
+        self.is_primary = worker_index == 0
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether this process's shards serve the guild (always true when running unsharded)."""
+        if self.shard_ids is None:
+            return True
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
 
     async def setup_hook(self):
         """This is called once when the bot logs in to load cogs and sync commands."""
-        
-        # --- ADD THESE TWO LINES HERE ---
-        load_data()
-        initialize_database()
-        
-        print("Loading cogs...")
-        for filename in os.listdir('./cogs'):
-            if filename.endswith('.py'):
-                try:
-                    await self.load_extension(f'cogs.{filename[:-3]}')
-                    print(f"-> Loaded cog: {filename}")
-                except Exception as e:
-                    print(f"-> Failed to load cog {filename}: {e}")
-        
-        await self.tree.sync() 
-        print("Commands synced.")
+        report = StartupReport()
+
+        # Blocking file/DB work runs in a thread so the gateway connection isn't held up
+        with report.phase("database init"):
+            await asyncio.to_thread(initialize_database)
+        with report.phase("config load"):
+            await asyncio.to_thread(load_data)
+
+        # Cogs don't depend on each other, so load them all at once
+        cog_names = sorted(filename[:-3] for filename in os.listdir(COGS_DIR) if filename.endswith('.py'))
+        with report.phase("cogs (all)"):
+            await asyncio.gather(*(self.load_cog(name, report) for name in cog_names))
+
+        if self.is_primary:
+            with report.phase("command sync"):
+                await self.sync_commands()
+
+        if METRICS_PORT:
+            # One port per worker: 9108, 9109, ...
+            self.metrics_server = await start_metrics_server(port=int(METRICS_PORT) + self.worker_index)
+
+        # Pick up guild config changes made by other worker processes
+        await get_config_sync().start()
+        if self.is_primary:
+            # Retention, compaction and backups, once a day in the background
+            get_maintenance().start()
+
+        print(report.render())
+
+    async def load_cog(self, name: str, report: StartupReport):
+        started = time.perf_counter()
+        try:
+            await self.load_extension(f'cogs.{name}')
+            report.record(f"  cog {name}", time.perf_counter() - started)
+        except Exception as e:
+            report.record(f"  cog {name}", time.perf_counter() - started, f"failed: {e}")
+
+    def command_tree_hash(self, guild: discord.abc.Snowflake = None) -> str:
+        """A stable hash of the command payloads Discord would receive from a sync."""
+        payload = [command.to_dict(self.tree) for command in self.tree.get_commands(guild=guild)]
+        payload.sort(key=lambda command: (command.get("type", 1), command["name"]))
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    async def sync_commands(self):
+        """Syncs the command tree, skipping the slow REST call when nothing changed."""
+        if DEV_GUILD_ID:
+            guild = discord.Object(id=int(DEV_GUILD_ID))
+            self.tree.copy_global_to(guild=guild)
+            scope = f"{self.application_id}:guild:{DEV_GUILD_ID}"
+        else:
+            guild = None
+            scope = f"{self.application_id}:global"
+
+        hashes = load_command_hashes()
+        digest = self.command_tree_hash(guild)
+        if not FORCE_COMMAND_SYNC and hashes.get(scope) == digest:
+            print(f"Commands unchanged ({scope}), skipping sync.")
+            return
+
+        await self.tree.sync(guild=guild)
+        hashes[scope] = digest
+        save_command_hashes(hashes)
+        print(f"Commands synced ({scope}).")
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        record_command(interaction, command.qualified_name)
+
+    async def close(self):
+        if self.metrics_server:
+            self.metrics_server.close()
+        # Post queued log embeds while the connection is still up
+        await close_log_dispatcher()
+        # Store queued confessions; any not posted yet are resumed on the next start
+        await close_confession_pipeline()
+        # Give queued warning DMs a few seconds to go out
+        await close_dm_queue()
+        # Stop a maintenance pass between batches (and abort a running backup)
+        await close_maintenance()
+        await close_config_sync()
+        await super().close()
+        # Write out any config changes still waiting on the debounce timer
+        await flush_pending()
+        # Let queued queries finish before the pooled connections go away
+        close_database()
 
     async def on_ready(self):
         # on_ready is now just for confirming the login
         print(f'Logged in as {self.user} (ID: {self.user.id})')
-        print("Bot is ready and online.")
+        print(f"Bot is ready and online ({time.perf_counter() - PROCESS_STARTED:.2f}s after start).")
 
 
 # Run the bot
-bot = MyBot()
-TOKEN = os.getenv("DISCORD_BOT_TOKEN")
-if TOKEN:
-    bot.run(TOKEN)
-else:
-    print("Error: DISCORD_BOT_TOKEN not found in .env file.")
\ No newline at end of file
+def main():
+    token = os.getenv("DISCORD_BOT_TOKEN")
+    if token:
+        MyBot().run(token)
+    else:
+        print("Error: DISCORD_BOT_TOKEN not found in .env file.")
+
+
+if __name__ == "__main__":
+    main()
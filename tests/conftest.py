@@ -0,0 +1,34 @@
+import os
+import sys
+import pytest
+
+# Tests import the bot's packages the same way the bot does, from the repo root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import database, data_manager  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A freshly migrated database in a temporary directory; yields a connection to it."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DATABASE_FILE", str(tmp_path / "test.db"))
+    database.initialize_database()
+    data_manager._cache.clear()
+    data_manager._flush_lock = None  # bound to the previous test's event loop
+    conn = database.get_db_connection()
+    yield conn
+    conn.close()
+    database.close_database()
+
+
+def add_warnings(conn, guild_id: int, user_id: int, count: int, reason: str = "Test warning", timestamp: str = None, start: int = 0):
+    """Inserts warnings directly, bypassing the bot; returns their warning IDs."""
+    ids = [f"w-{guild_id}-{user_id}-{start + i}" for i in range(count)]
+    with conn:
+        conn.executemany(
+            "INSERT INTO warnings (warning_id, short_id, guild_id, user_id, moderator_id, reason, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+            ((warning_id, f"{user_id % 10000:04x}{start + i:04x}", guild_id, user_id, 1, reason, timestamp) for i, warning_id in enumerate(ids))
+        )
+    return ids
@@ -0,0 +1,114 @@
+import asyncio
+import sqlite3
+from utils import confession_queue
+from utils.confession_queue import ConfessionPipeline
+from benchmarks.fakes import FakeClient
+
+
+def _run(coro):
+    """Runs a scenario and fails on any exception a background task raised."""
+    errors = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        result = await coro
+        # Let anything left running finish, then collect what it raised
+        others = asyncio.all_tasks() - {asyncio.current_task()}
+        errors.extend(error for error in await asyncio.gather(*others, return_exceptions=True) if isinstance(error, Exception))
+        return result
+
+    result = asyncio.run(main())
+    assert not errors
+    return result
+
+
+def _stored(conn) -> dict:
+    return {row["content"]: row["posted"] for row in conn.execute("SELECT content, posted FROM confessions")}
+
+
+def test_close_keeps_unposted_confessions_for_the_next_start(db):
+    client = FakeClient()
+    channel = client.add_channel()
+
+    async def first_run():
+        pipeline = ConfessionPipeline(client)
+        pipeline.submit(1, 2, channel.id, "first")
+        await pipeline.flush()  # stored, and a worker starts for guild 1
+        pipeline.submit(1, 2, channel.id, "second")
+        pipeline.submit(3, 2, channel.id, "third")
+        await pipeline.close()  # flushes the rest without starting new workers
+        assert not pipeline.workers and not pipeline.queues
+
+    _run(first_run())
+    stored = _stored(db)
+    assert set(stored) == {"first", "second", "third"}
+    assert stored["second"] == stored["third"] == 0
+
+    async def second_run():
+        pipeline = ConfessionPipeline(client)
+        await pipeline.resume()
+        while pipeline.queue_depth():
+            await asyncio.sleep(0.01)
+        await pipeline.close()
+
+    _run(second_run())
+    assert set(_stored(db).values()) == {1}
+    assert channel.sent == 3
+
+
+def test_idle_worker_exits_and_a_later_confession_still_posts(db, monkeypatch):
+    monkeypatch.setattr(confession_queue, "IDLE_TIMEOUT", 0.05)
+    client = FakeClient()
+    channel = client.add_channel()
+
+    async def scenario():
+        pipeline = ConfessionPipeline(client)
+        pipeline.submit(1, 2, channel.id, "before")
+        await pipeline.flush()
+        await asyncio.sleep(0.2)
+        assert not pipeline.workers  # idled out
+
+        pipeline.submit(1, 2, channel.id, "after")
+        await pipeline.flush()
+        while pipeline.queue_depth():
+            await asyncio.sleep(0.01)
+        await pipeline.close()
+
+    _run(scenario())
+    assert channel.sent == 2
+    assert _stored(db) == {"before": 1, "after": 1}
+
+
+def test_worker_survives_failed_bookkeeping(db, monkeypatch):
+    def locked(conn, confession_id, attempts):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(confession_queue, "_record_failure", locked)
+    monkeypatch.setattr(confession_queue, "RETRY_DELAYS", (0.01,))
+    client = FakeClient()
+    channel = client.add_channel()
+    failures = [ConnectionResetError("flaky")]
+    send = channel.send
+
+    async def flaky_send(content=None, **kwargs):
+        if failures:
+            raise failures.pop()
+        await send(content, **kwargs)
+    channel.send = flaky_send
+
+    async def scenario():
+        pipeline = ConfessionPipeline(client)
+        pipeline.submit(1, 2, channel.id, "retried")
+        pipeline.submit(1, 2, channel.id, "next")
+        await pipeline.flush()
+
+        async def drained():
+            while pipeline.queue_depth():
+                await asyncio.sleep(0.01)
+        # A dead worker would leave the second confession queued forever
+        await asyncio.wait_for(drained(), timeout=5)
+        assert pipeline.stats["retried"] == 1
+        await pipeline.close()
+
+    _run(scenario())
+    assert channel.sent == 2
+    assert _stored(db) == {"retried": 1, "next": 1}
@@ -0,0 +1,49 @@
+from utils.data_transfer import export_guild, import_file
+from conftest import add_warnings
+
+
+def _warnings(conn, guild_id: int) -> list:
+    return [dict(row) for row in conn.execute(
+        "SELECT warning_id, short_id, user_id, moderator_id, reason, timestamp FROM warnings WHERE guild_id = ? ORDER BY warning_id",
+        (guild_id,)
+    )]
+
+
+def _clear(conn, guild_id: int):
+    with conn:
+        conn.execute("DELETE FROM warnings WHERE guild_id = ?", (guild_id,))
+
+
+def test_round_trip(db, tmp_path):
+    add_warnings(db, 1, 10, 1500, reason="exported, reason with a comma")
+    original = _warnings(db, 1)
+    for name in ("warnings.jsonl.gz", "warnings.csv"):
+        path = str(tmp_path / name)
+        assert export_guild(path, "warnings", 1) == 1500
+        _clear(db, 1)
+
+        # Chunks of 1000 and 500, every row inserted as is
+        assert import_file(path, "warnings") == {"inserted": 1500, "skipped": 0, "renumbered": 0}
+        assert _warnings(db, 1) == original
+        # Importing the same file again changes nothing
+        assert import_file(path, "warnings") == {"inserted": 0, "skipped": 1500, "renumbered": 0}
+
+
+def test_short_id_clash_draws_a_new_short_id(db, tmp_path):
+    add_warnings(db, 1, 10, 2500)
+    clashing = _warnings(db, 1)[0]["short_id"]
+    path = str(tmp_path / "warnings.jsonl")
+    export_guild(path, "warnings", 1)
+    _clear(db, 1)
+    # Meanwhile another warning took one of the exported short IDs
+    with db:
+        db.execute(
+            "INSERT INTO warnings (warning_id, short_id, guild_id, user_id, moderator_id, reason) VALUES ('local', ?, 1, 5, 5, 'x')",
+            (clashing,)
+        )
+
+    # The counts leave out rows written by the search index and counter triggers
+    assert import_file(path, "warnings") == {"inserted": 2499, "skipped": 0, "renumbered": 1}
+    assert import_file(path, "warnings") == {"inserted": 0, "skipped": 2500, "renumbered": 0}
+    assert db.execute("SELECT COUNT(*) FROM warnings WHERE guild_id = 1").fetchone()[0] == 2501
+    assert db.execute("SELECT warning_count FROM warning_counts WHERE guild_id = 1 AND user_id = 10").fetchone()[0] == 2500
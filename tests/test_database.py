@@ -0,0 +1,94 @@
+from utils import database
+from conftest import add_warnings
+
+
+def test_new_database_is_fully_migrated(db):
+    assert db.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # Set before WAL mode writes the header, so no full VACUUM is ever needed
+    assert db.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def test_initialize_again_is_a_no_op(db, capsys):
+    database.initialize_database()
+    output = capsys.readouterr().out
+    assert "Applied database migration" not in output
+    assert "full VACUUM" not in output
+
+
+def test_upgrade_from_unmigrated_database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DATABASE_FILE", str(tmp_path / "old.db"))
+    # The tables as they were before any migration existed
+    monkeypatch.setattr(database, "MIGRATIONS", [])
+    database.initialize_database()
+    conn = database.get_db_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO warnings (warning_id, guild_id, user_id, moderator_id, reason) VALUES (?, 1, ?, 9, ?)",
+            [("AAAA1111-x", 5, "spamming links"), ("BBBB2222-y", 5, "raid"), ("CCCC3333-z", 6, "caps")]
+        )
+        conn.execute("INSERT INTO confessions (confession_id, guild_id, user_id, content) VALUES ('DDDD4444-c', 1, 2, 'hello there')")
+    conn.close()
+    monkeypatch.undo()
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DATABASE_FILE", str(tmp_path / "old.db"))
+    database.initialize_database()
+    try:
+        conn = database.get_db_connection()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+        # Short IDs were backfilled from the full IDs
+        assert {row[0] for row in conn.execute("SELECT short_id FROM warnings")} == {"aaaa1111", "bbbb2222", "cccc3333"}
+        assert conn.execute("SELECT short_id FROM confessions").fetchone()[0] == "dddd4444"
+        # Existing confessions count as posted
+        assert conn.execute("SELECT posted FROM confessions").fetchone()[0] == 1
+        # Counters and the search index cover the old rows
+        assert dict(conn.execute("SELECT user_id, warning_count FROM warning_counts").fetchall()) == {5: 2, 6: 1}
+        assert conn.execute("SELECT rowid FROM warnings_fts WHERE warnings_fts MATCH 'link'").fetchall()
+        conn.close()
+    finally:
+        database.close_database()
+
+
+def _counts(conn, guild_id: int) -> dict:
+    return {row[0]: tuple(row[1:]) for row in conn.execute(
+        "SELECT user_id, warning_count, last_warning_at FROM warning_counts WHERE guild_id = ?", (guild_id,)
+    )}
+
+
+def test_warning_counts_follow_inserts_deletes_and_moves(db):
+    add_warnings(db, 1, 10, 2, timestamp="2026-01-01 00:00:00")
+    newest = add_warnings(db, 1, 10, 1, timestamp="2026-02-01 00:00:00", start=2)
+    add_warnings(db, 1, 20, 1, timestamp="2026-01-15 00:00:00")
+    assert _counts(db, 1) == {10: (3, "2026-02-01 00:00:00"), 20: (1, "2026-01-15 00:00:00")}
+
+    with db:
+        db.execute("DELETE FROM warnings WHERE warning_id = ?", (newest[0],))
+    assert _counts(db, 1)[10] == (2, "2026-01-01 00:00:00")
+
+    # Moving a warning to another user moves it between the counters
+    with db:
+        db.execute("UPDATE warnings SET user_id = 20 WHERE user_id = 10 AND warning_id LIKE '%-0'")
+    assert _counts(db, 1) == {10: (1, "2026-01-01 00:00:00"), 20: (2, "2026-01-15 00:00:00")}
+
+    # A user with no warnings left has no row
+    with db:
+        db.execute("DELETE FROM warnings WHERE user_id = 10")
+    assert 10 not in _counts(db, 1)
+
+    before = _counts(db, 1)
+    with db:
+        database.rebuild_warning_counts(db)
+    assert _counts(db, 1) == before
+
+
+def test_insert_many_with_short_ids_avoids_taken_ones(db):
+    add_warnings(db, 1, 10, 50)
+    rows = [{"user_id": 10 + i, "moderator_id": 1, "reason": "bulk"} for i in range(200)]
+    with db:
+        ids = database.insert_many_with_short_ids(db, "warnings", "warning_id", 1, rows)
+    assert len({short_id for _, short_id in ids}) == 200
+    assert db.execute("SELECT COUNT(*) FROM warnings WHERE guild_id = 1").fetchone()[0] == 250
+    with db:
+        assert database.insert_many_with_short_ids(db, "warnings", "warning_id", 1, []) == []
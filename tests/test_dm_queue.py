@@ -0,0 +1,85 @@
+import asyncio
+import types
+import aiohttp
+import discord
+from utils import dm_queue
+from utils.dm_queue import DMDeliveryQueue, DM_SENT, DM_CLOSED, DM_FAILED
+from benchmarks.fakes import FakeUser
+
+
+def _forbidden() -> discord.Forbidden:
+    return discord.Forbidden(types.SimpleNamespace(status=403, reason="Forbidden"), "Cannot send messages to this user")
+
+
+def _failing(user: FakeUser, *errors):
+    """Makes the user's DMs raise `errors` in turn, then go through."""
+    errors = list(errors)
+    send = user.send
+
+    async def flaky_send(content=None, **kwargs):
+        if errors:
+            raise errors.pop(0)
+        await send(content, **kwargs)
+    user.send = flaky_send
+    return user
+
+
+def test_outcomes_and_closed_dm_cache(monkeypatch):
+    monkeypatch.setattr(dm_queue, "RETRY_DELAYS", (0.01,))
+    open_user = FakeUser("open")
+    closed_user = _failing(FakeUser("closed"), _forbidden())
+    flaky_user = _failing(FakeUser("flaky"), aiohttp.ClientConnectionError("reset"))
+    down_user = _failing(FakeUser("down"), aiohttp.ClientConnectionError("reset"), aiohttp.ClientConnectionError("reset"))
+
+    async def scenario():
+        queue = DMDeliveryQueue(concurrency=2)
+        embed = discord.Embed()
+        results = await asyncio.gather(*(queue.deliver(user, embed) for user in (open_user, closed_user, flaky_user, down_user)))
+        # Known closed DMs are answered without another request
+        again = await queue.deliver(closed_user, embed)
+        await queue.close()
+        return results, again, queue.stats
+
+    results, again, stats = asyncio.run(scenario())
+    assert results == [DM_SENT, DM_CLOSED, DM_SENT, DM_FAILED]
+    assert again == DM_CLOSED
+    assert (open_user.dms, flaky_user.dms, down_user.dms) == (1, 1, 0)
+    assert stats == {"queued": 4, "sent": 2, "closed": 1, "skipped": 1, "retried": 2, "failed": 1}
+
+
+def test_unexpected_error_fails_the_dm_not_the_worker():
+    broken = _failing(FakeUser("broken"), AttributeError("'NoneType' object has no attribute 'id'"))
+    fine = FakeUser("fine")
+
+    async def scenario():
+        # One worker, so the second DM only goes out if it survived the first
+        queue = DMDeliveryQueue(concurrency=1)
+        first = queue.deliver(broken, discord.Embed())
+        second = queue.deliver(fine, discord.Embed())
+        results = await asyncio.wait_for(asyncio.gather(first, second), timeout=5)
+        await queue.close()
+        return results, queue.stats
+
+    results, stats = asyncio.run(scenario())
+    assert results == [DM_FAILED, DM_SENT]
+    assert stats["failed"] == 1 and stats["sent"] == 1
+
+
+def test_close_fails_what_could_not_be_sent(monkeypatch):
+    monkeypatch.setattr(dm_queue, "CLOSE_TIMEOUT", 0.05)
+
+    async def hang(content=None, **kwargs):
+        await asyncio.sleep(60)
+
+    async def scenario():
+        queue = DMDeliveryQueue(concurrency=1)
+        users = [FakeUser(f"user {i}") for i in range(3)]
+        for user in users:
+            user.send = hang
+        futures = [queue.deliver(user, discord.Embed()) for user in users]
+        await asyncio.sleep(0)
+        await queue.close()
+        return [future.result() for future in futures]
+
+    # The one being sent and the two still queued
+    assert asyncio.run(scenario()) == [DM_FAILED] * 3
@@ -0,0 +1,73 @@
+import asyncio
+import types
+import discord
+from utils.escalation import escalation_for, escalate, warning_counts, top_warned_users
+from benchmarks.fakes import FakeGuild
+from conftest import add_warnings
+
+SETTINGS = {"timeout_at_warnings": 3, "timeout_minutes": 30, "kick_at_warnings": 5}
+
+
+def test_thresholds():
+    assert escalation_for({}, 10) is None
+    assert escalation_for(SETTINGS, 2) is None
+    assert escalation_for(SETTINGS, 3) == ("timeout", 30)
+    assert escalation_for(SETTINGS, 4) == ("timeout", 30)
+    assert escalation_for(SETTINGS, 5) == ("kick", None)
+    assert escalation_for(SETTINGS, 9) == ("kick", None)
+    # Timeouts without a length use the default, and kicks work on their own
+    assert escalation_for({"timeout_at_warnings": 1}, 1) == ("timeout", 60)
+    assert escalation_for({"kick_at_warnings": 2}, 1) is None
+    assert escalation_for({"kick_at_warnings": 2}, 2) == ("kick", None)
+
+
+def test_kick_waits_for_the_dm():
+    member = FakeGuild().add_member("offender")
+    order = []
+
+    async def kick(reason=None):
+        order.append("kick")
+    member.kick = kick
+
+    async def scenario():
+        delivery = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(escalate(member, ("kick", None), 5, "spam", delivery))
+        await asyncio.sleep(0.01)
+        order.append("dm")
+        delivery.set_result("sent")
+        return await task
+
+    succeeded, text = asyncio.run(scenario())
+    assert succeeded and "kicked" in text
+    assert order == ["dm", "kick"]
+
+
+def test_failed_action_is_reported():
+    member = FakeGuild().add_member("moderator's friend")
+
+    async def timeout(until, reason=None):
+        raise discord.Forbidden(types.SimpleNamespace(status=403, reason="Forbidden"), "Missing Permissions")
+    member.timeout = timeout
+
+    succeeded, text = asyncio.run(escalate(member, ("timeout", 30), 3, "spam"))
+    assert not succeeded
+    assert text.startswith("Could not timeout")
+
+
+def test_counts_and_leaderboard_read_the_counters(db):
+    add_warnings(db, 1, 10, 4, timestamp="2026-01-01 00:00:00")
+    add_warnings(db, 1, 20, 4, timestamp="2026-02-01 00:00:00")
+    add_warnings(db, 1, 30, 1)
+    add_warnings(db, 2, 40, 9)  # another guild's
+
+    assert warning_counts(db, 1, [10, 30, 99]) == {10: 4, 30: 1, 99: 0}
+    # Most warnings first, the most recently warned first on a tie
+    assert [row["user_id"] for row in top_warned_users(db, 1, 10)] == [20, 10, 30]
+    assert [row["user_id"] for row in top_warned_users(db, 1, 1)] == [20]
+
+
+def test_dm_announces_the_action_without_claiming_it_happened():
+    from cogs.moderation_commands import _dm_embed
+    embed = _dm_embed(FakeGuild(), "spam", ("kick", None))
+    assert "will be kicked" in embed.fields[0].value
+    assert not _dm_embed(FakeGuild(), "spam").fields
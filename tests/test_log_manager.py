@@ -0,0 +1,31 @@
+import asyncio
+import discord
+from utils import log_manager
+from utils.log_manager import LogDispatcher, MAX_EMBEDS_PER_MESSAGE
+from benchmarks.fakes import FakeClient
+
+
+def test_close_finishes_the_batch_being_sent(monkeypatch):
+    monkeypatch.setattr(log_manager, "FLUSH_INTERVAL", 0)
+    client = FakeClient()
+    channel = client.add_channel()
+    posted = []
+
+    async def slow_send(content=None, embeds=None, **kwargs):
+        await asyncio.sleep(0.05)
+        posted.append([embed.title for embed in embeds])
+    channel.send = slow_send
+
+    async def scenario():
+        dispatcher = LogDispatcher(client)
+        for i in range(MAX_EMBEDS_PER_MESSAGE + 3):
+            dispatcher.enqueue(1, channel.id, discord.Embed(title=str(i)))
+        # Shut down while the worker is posting its first batch
+        await asyncio.sleep(0.01)
+        await dispatcher.close()
+        return dispatcher.stats
+
+    stats = asyncio.run(scenario())
+    titles = [str(i) for i in range(MAX_EMBEDS_PER_MESSAGE + 3)]
+    assert posted == [titles[:MAX_EMBEDS_PER_MESSAGE], titles[MAX_EMBEDS_PER_MESSAGE:]]
+    assert stats["sent"] == MAX_EMBEDS_PER_MESSAGE + 3 and stats["dropped"] == 0
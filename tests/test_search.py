@@ -0,0 +1,57 @@
+from utils.search import build_match_query, _search, RESULTS_PER_PAGE
+from conftest import add_warnings
+
+
+def _add_confession(conn, guild_id: int, number: int, content: str, posted: int = 1):
+    with conn:
+        conn.execute(
+            "INSERT INTO confessions (confession_id, short_id, guild_id, user_id, content, posted) VALUES (?, ?, ?, 1, ?, ?)",
+            (f"c-{guild_id}-{number}", f"{number:08x}", guild_id, content, posted)
+        )
+
+
+def _search_all(conn, table: str, guild_id: int, text: str, column: str):
+    return _search(conn, table, build_match_query(guild_id, text, column), 0)
+
+
+def test_match_query_is_scoped_and_quoted():
+    assert build_match_query(7, 'spam "ban evasion" scam* x"y', "reason") == (
+        'guild_id : "7" AND reason : ("spam" AND "ban evasion" AND "scam"* AND "x""y")'
+    )
+    assert build_match_query(7, '  "" * ', "reason") is None
+
+
+def test_confession_search_hides_unposted_and_other_guilds(db):
+    _add_confession(db, 1, 1, "I broke the vase")
+    _add_confession(db, 1, 2, "I broke the window", posted=0)  # still waiting to be posted
+    _add_confession(db, 1, 3, "I fixed the vase")
+    _add_confession(db, 2, 4, "I broke the vase too")          # another guild
+
+    total, rows = _search_all(db, "confessions", 1, "broke", "content")
+    assert total == 1
+    assert [row["short_id"] for row in rows] == [f"{1:08x}"]
+    assert "**broke**" in rows[0]["snippet"]
+
+    total, rows = _search_all(db, "confessions", 1, "vase", "content")
+    assert total == 2
+    assert {row["short_id"] for row in rows} == {f"{1:08x}", f"{3:08x}"}
+
+    # Once posted it shows up
+    with db:
+        db.execute("UPDATE confessions SET posted = 1 WHERE confession_id = 'c-1-2'")
+    assert _search_all(db, "confessions", 1, "broke", "content")[0] == 2
+
+
+def test_warning_search_pages_and_stems(db):
+    add_warnings(db, 1, 10, RESULTS_PER_PAGE + 2, reason="posting links")
+    add_warnings(db, 1, 20, 3, reason="spam", start=50)
+    add_warnings(db, 2, 10, 4, reason="posting links")
+
+    total, first = _search_all(db, "warnings", 1, "link", "reason")  # stemmed: link matches links
+    assert total == RESULTS_PER_PAGE + 2
+    assert len(first) == RESULTS_PER_PAGE
+    _, second = _search(db, "warnings", build_match_query(1, "link", "reason"), RESULTS_PER_PAGE)
+    assert len(second) == 2
+    assert not {row["short_id"] for row in first} & {row["short_id"] for row in second}
+
+    assert _search_all(db, "warnings", 1, "nothing", "reason") == (0, [])
@@ -0,0 +1,27 @@
+import asyncio
+import types
+import discord
+from cogs import moderation_commands
+from cogs.moderation_commands import warning_id_autocomplete
+from conftest import add_warnings
+
+
+def _interaction(guild_id: int, moderator: bool):
+    permissions = discord.Permissions(moderate_members=moderator)
+    return types.SimpleNamespace(guild_id=guild_id, permissions=permissions)
+
+
+def test_only_moderators_see_warning_ids(db):
+    add_warnings(db, 1, 10, 3)
+    moderation_commands._warning_id_indexes.invalidate(1)
+
+    async def scenario():
+        # Nothing for non-moderators, before or after a moderator built the index
+        hidden = await warning_id_autocomplete(_interaction(1, False), "")
+        shown = await warning_id_autocomplete(_interaction(1, True), "000a")
+        again = await warning_id_autocomplete(_interaction(1, False), "000a")
+        return hidden, shown, again
+
+    hidden, shown, again = asyncio.run(scenario())
+    assert hidden == [] and again == []
+    assert sorted(choice.value for choice in shown) == ["000a0000", "000a0001", "000a0002"]
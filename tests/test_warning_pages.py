@@ -0,0 +1,48 @@
+from cogs.moderation_commands import _warning_page, _first_warning_page, WARNINGS_PER_PAGE
+from conftest import add_warnings
+
+
+def _walk_older(conn, guild_id: int, user_id: int) -> list:
+    pages = []
+    rows, has_more = _warning_page(conn, guild_id, user_id)
+    pages.append(rows)
+    while has_more:
+        rows, has_more = _warning_page(conn, guild_id, user_id, (rows[-1]["timestamp"], rows[-1]["rowid"]))
+        pages.append(rows)
+    return pages
+
+
+def test_pages_cover_every_warning_once_newest_first(db):
+    # Identical timestamps, so only the rowid tie-breaker keeps pages apart
+    add_warnings(db, 1, 10, 2 * WARNINGS_PER_PAGE + 3, timestamp="2026-03-01 12:00:00")
+    add_warnings(db, 1, 10, 4, timestamp="2026-03-02 12:00:00", start=100)
+    add_warnings(db, 1, 20, 5)  # someone else's
+    add_warnings(db, 2, 10, 5)  # another guild's
+
+    pages = _walk_older(db, 1, 10)
+    assert [len(page) for page in pages] == [WARNINGS_PER_PAGE, WARNINGS_PER_PAGE, 7]
+    keys = [(row["timestamp"], row["rowid"]) for page in pages for row in page]
+    assert keys == sorted(keys, reverse=True)
+    expected = db.execute(
+        "SELECT rowid FROM warnings WHERE guild_id = 1 AND user_id = 10 ORDER BY timestamp DESC, rowid DESC"
+    ).fetchall()
+    assert [key[1] for key in keys] == [row[0] for row in expected]
+
+
+def test_paging_back_returns_the_same_pages(db):
+    add_warnings(db, 1, 10, 3 * WARNINGS_PER_PAGE, timestamp="2026-03-01 12:00:00")
+    pages = _walk_older(db, 1, 10)
+
+    # From the last page back towards the newest
+    rows = pages[-1]
+    for expected in reversed(pages[:-1]):
+        rows, has_more = _warning_page(db, 1, 10, (rows[0]["timestamp"], rows[0]["rowid"]), older=False)
+        assert [row["rowid"] for row in rows] == [row["rowid"] for row in expected]
+    assert not has_more
+
+
+def test_first_page_total_comes_from_the_counters(db):
+    assert _first_warning_page(db, 1, 10) == (0, [], False)
+    add_warnings(db, 1, 10, WARNINGS_PER_PAGE + 1)
+    total, rows, has_older = _first_warning_page(db, 1, 10)
+    assert (total, len(rows), has_older) == (WARNINGS_PER_PAGE + 1, WARNINGS_PER_PAGE, True)
@@ -0,0 +1,86 @@
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from .data_manager import get_guild_data
+
+# Discord rejects autocomplete responses with more than 25 choices.
+MAX_CHOICES = 25
+MAX_CACHED_GUILDS = 1000
+
+
+class AutocompleteIndex:
+    """Sorted, pre-lowercased values: prefix matches first, then substring matches."""
+
+    def __init__(self, values=()):
+        self.entries = sorted((value.lower(), value) for value in values)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, value: str):
+        entry = (value.lower(), value)
+        position = bisect_left(self.entries, entry)
+        if position == len(self.entries) or self.entries[position] != entry:
+            insort(self.entries, entry)
+
+    def remove(self, value: str):
+        entry = (value.lower(), value)
+        position = bisect_left(self.entries, entry)
+        if position < len(self.entries) and self.entries[position] == entry:
+            del self.entries[position]
+
+    def search(self, current: str, limit: int = MAX_CHOICES) -> list:
+        query = current.lower()
+        if not query:
+            return [value for _, value in self.entries[:limit]]
+
+        # Prefix matches sit next to each other in sorted order.
+        results = []
+        position = bisect_left(self.entries, (query, ""))
+        while position < len(self.entries) and len(results) < limit:
+            key, value = self.entries[position]
+            if not key.startswith(query):
+                break
+            results.append(value)
+            position += 1
+
+        # Then anything that merely contains the text, until we have enough.
+        if len(results) < limit:
+            for key, value in self.entries:
+                if query in key and not key.startswith(query):
+                    results.append(value)
+                    if len(results) >= limit:
+                        break
+        return results
+
+
+# --- Per-guild category indexes ---
+
+_category_indexes = OrderedDict()  # guild_id -> AutocompleteIndex of category names
+
+
+async def get_category_index(guild_id: int) -> AutocompleteIndex:
+    index = _category_indexes.get(guild_id)
+    if index is None:
+        guild_data = await get_guild_data(guild_id)
+        index = _category_indexes[guild_id] = AutocompleteIndex(guild_data.get("roles", {}))
+        while len(_category_indexes) > MAX_CACHED_GUILDS:
+            _category_indexes.popitem(last=False)
+    _category_indexes.move_to_end(guild_id)
+    return index
+
+
+def category_added(guild_id: int, category: str):
+    index = _category_indexes.get(guild_id)
+    if index is not None:
+        index.add(category)
+
+
+def category_removed(guild_id: int, category: str):
+    index = _category_indexes.get(guild_id)
+    if index is not None:
+        index.remove(category)
+
+
+def invalidate(guild_id: int):
+    """Forgets a guild's category index; it is rebuilt on the next keystroke."""
+    _category_indexes.pop(guild_id, None)
@@ -0,0 +1,92 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def retrieve_exception(task: asyncio.Task):
+    """Marks a shared fetch's error as seen, for when every caller stopped waiting."""
+    if not task.cancelled():
+        task.exception()
+
+
+class TTLCache:
+    """A bounded LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}         # key -> Task for fetches already running
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.joined = 0             # callers that waited on someone else's fetch
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    async def get_or_fetch(self, key, fetch):
+        """Returns the cached value, or awaits fetch() once no matter how many callers ask."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._fetch(key, fetch))
+            task.add_done_callback(retrieve_exception)
+        else:
+            self.joined += 1
+        # The fetch runs in its own task, so a caller that gets cancelled only
+        # stops waiting; everyone else still gets the value.
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, fetch):
+        try:
+            value = await fetch()
+            self.set(key, value)  # errors are shared with the waiters but never cached
+            return value
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "joined": self.joined,
+        }
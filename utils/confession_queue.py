@@ -0,0 +1,253 @@
+import asyncio
+import discord
+from collections import deque
+from .database import run_read, run_write, insert_with_short_id
+from .metrics import metrics
+
+BATCH_DELAY = 0.05           # submissions arriving within this window share one insert transaction
+MAX_BATCH_SIZE = 100
+MAX_ATTEMPTS = 5             # posting attempts before a confession is given up on
+RETRY_DELAYS = (2, 5, 15, 60)  # seconds to wait before each retry
+IDLE_TIMEOUT = 300.0         # a guild's worker exits after this long without confessions
+
+
+def confession_embed(short_id: str, content: str) -> discord.Embed:
+    embed = discord.Embed(
+        title="New Anonymous Confession",
+        description=content,
+        color=discord.Color.from_rgb(47, 49, 54)
+    )
+    embed.set_footer(text=f"Confession ID: {short_id}")
+    return embed
+
+
+# --- Database jobs (run on the writer/reader threads) ---
+
+def _write_batch(conn, submissions: list, posted_ids: list) -> list:
+    """Inserts new confessions as unposted and marks delivered ones, in one transaction."""
+    conn.executemany("UPDATE confessions SET posted = 1 WHERE confession_id = ?", ((confession_id,) for confession_id in posted_ids))
+    inserted = []
+    for guild_id, user_id, channel_id, content in submissions:
+        inserted.append(insert_with_short_id(conn, "confessions", "confession_id", {
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "channel_id": channel_id,
+            "content": content,
+            "posted": 0,
+        }))
+    return inserted
+
+
+def _record_failure(conn, confession_id: str, attempts: int):
+    conn.execute("UPDATE confessions SET attempts = ? WHERE confession_id = ?", (attempts, confession_id))
+
+
+def _load_unposted(conn) -> list:
+    return conn.execute(
+        "SELECT confession_id, short_id, guild_id, channel_id, content, attempts FROM confessions "
+        "WHERE posted = 0 AND attempts < ? ORDER BY rowid",
+        (MAX_ATTEMPTS,)
+    ).fetchall()
+
+
+class ConfessionPipeline:
+    """Stores confessions in batches, then posts them from one ordered worker per guild.
+
+    A confession is written (unposted) before anything is sent, and only marked
+    posted once the message went out, so a crash or restart never loses one; at
+    worst it is posted twice.
+    """
+
+    def __init__(self, client: discord.Client):
+        self.client = client
+        self.submissions = []  # (guild_id, user_id, channel_id, content) waiting to be inserted
+        self.posted_ids = []   # confession IDs delivered but not yet marked in the database
+        self.flush_task = None
+        self.flush_lock = asyncio.Lock()
+        self.queues = {}   # guild_id -> deque of confessions waiting to be posted, oldest first
+        self.wakeups = {}  # guild_id -> Event set when the queue gets something
+        self.workers = {}  # guild_id -> worker task
+        self.closing = False
+        self.stats = {"submitted": 0, "posted": 0, "retried": 0, "failed": 0}
+
+    def queue_depth(self) -> int:
+        return len(self.submissions) + sum(len(queue) for queue in self.queues.values())
+
+    async def resume(self, owns_guild=None):
+        """Queues every confession a previous run stored but never managed to post.
+
+        `owns_guild` limits this to the guilds served by this process.
+        """
+        rows = await run_read(_load_unposted)
+        if owns_guild is not None:
+            rows = [row for row in rows if owns_guild(row["guild_id"])]
+        for row in rows:
+            self._enqueue(row["guild_id"], dict(row))
+        if rows:
+            print(f"Resuming delivery of {len(rows)} unposted confession(s).")
+
+    def submit(self, guild_id: int, user_id: int, channel_id: int, content: str):
+        self.submissions.append((guild_id, user_id, channel_id, content))
+        self.stats["submitted"] += 1
+        self._schedule_flush()
+
+    def cancel(self, guild_id: int, short_id: str) -> bool:
+        """Drops a confession that is still waiting to be posted (the one being sent can't be stopped)."""
+        queue = self.queues.get(guild_id)
+        if not queue:
+            return False
+        for confession in list(queue)[1:]:
+            if confession["short_id"] == short_id:
+                queue.remove(confession)
+                return True
+        return False
+
+    # --- Batched writes ---
+
+    def _schedule_flush(self):
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(BATCH_DELAY)
+        self.flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Writes pending submissions and delivery marks; new confessions then go to their guild's queue."""
+        async with self.flush_lock:
+            while self.submissions or self.posted_ids:
+                submissions, self.submissions = self.submissions[:MAX_BATCH_SIZE], self.submissions[MAX_BATCH_SIZE:]
+                posted_ids, self.posted_ids = self.posted_ids, []
+                try:
+                    inserted = await run_write(_write_batch, submissions, posted_ids)
+                except Exception as e:
+                    print(f"ERROR: Could not store confessions: {e}")
+                    # Keep everything pending and try again shortly.
+                    self.submissions = submissions + self.submissions
+                    self.posted_ids = posted_ids + self.posted_ids
+                    await asyncio.sleep(RETRY_DELAYS[0])
+                    continue
+
+                for (guild_id, _, channel_id, content), (confession_id, short_id) in zip(submissions, inserted):
+                    self._enqueue(guild_id, {
+                        "confession_id": confession_id,
+                        "short_id": short_id,
+                        "channel_id": channel_id,
+                        "content": content,
+                        "attempts": 0,
+                    })
+
+    # --- Per-guild posting ---
+
+    def _enqueue(self, guild_id: int, confession: dict):
+        if self.closing:
+            return  # already stored as unposted, the next start resumes it
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            queue = self.queues[guild_id] = deque()
+            self.wakeups[guild_id] = asyncio.Event()
+            self.workers[guild_id] = asyncio.create_task(self._worker(guild_id))
+        queue.append(confession)
+        self.wakeups[guild_id].set()
+
+    async def _worker(self, guild_id: int):
+        try:
+            await self._run_worker(guild_id)
+        except Exception as e:
+            print(f"ERROR: Confession worker for guild {guild_id} stopped: {e}")
+        finally:
+            # However it ended, the next confession for the guild starts a new worker.
+            # Ones still queued here stay stored as unposted and resume on the next start.
+            if self.workers.get(guild_id) is asyncio.current_task():
+                del self.queues[guild_id], self.wakeups[guild_id], self.workers[guild_id]
+
+    async def _run_worker(self, guild_id: int):
+        # Confessions resumed at startup have to wait for the channel cache.
+        await self.client.wait_until_ready()
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            return  # the pipeline was closed while we waited
+        wakeup = self.wakeups[guild_id]
+        while True:
+            if not queue:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    # wait_for yields once more after timing out, so a confession
+                    # may have been queued in between.
+                    if queue:
+                        continue
+                    return
+            # The head stays queued while it is retried, so later confessions can't overtake it.
+            await self._post(guild_id, queue[0])
+            queue.popleft()
+
+    async def _post(self, guild_id: int, confession: dict):
+        while True:
+            try:
+                channel = self.client.get_channel(confession["channel_id"]) or await self.client.fetch_channel(confession["channel_id"])
+                await channel.send(embed=confession_embed(confession["short_id"], confession["content"]))
+            except (discord.Forbidden, discord.NotFound) as e:
+                # Retrying won't fix a missing channel or permission.
+                self.stats["failed"] += 1
+                print(f"ERROR: Could not post confession {confession['short_id']} in guild {guild_id}: {e}")
+                await self._record_failure(confession, MAX_ATTEMPTS)
+                return
+            except Exception as e:
+                confession["attempts"] += 1
+                await self._record_failure(confession, confession["attempts"])
+                if confession["attempts"] >= MAX_ATTEMPTS:
+                    self.stats["failed"] += 1
+                    print(f"ERROR: Giving up on confession {confession['short_id']} in guild {guild_id}: {e}")
+                    return
+                self.stats["retried"] += 1
+                await asyncio.sleep(RETRY_DELAYS[min(confession["attempts"], len(RETRY_DELAYS)) - 1])
+            else:
+                self.stats["posted"] += 1
+                self.posted_ids.append(confession["confession_id"])
+                self._schedule_flush()
+                return
+
+    async def _record_failure(self, confession: dict, attempts: int):
+        # Only bookkeeping for the next start; a locked database mustn't stop the worker.
+        try:
+            await run_write(_record_failure, confession["confession_id"], attempts)
+        except Exception as e:
+            print(f"ERROR: Could not record the failed attempt for confession {confession['short_id']}: {e}")
+
+    async def close(self):
+        """Stops the workers and writes pending submissions; unposted ones resume on the next start."""
+        self.closing = True
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        workers = list(self.workers.values())
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await self.flush()
+        self.queues.clear()
+        self.wakeups.clear()
+        self.workers.clear()
+
+
+_pipeline = None
+
+
+def get_confession_pipeline(client: discord.Client) -> ConfessionPipeline:
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ConfessionPipeline(client)
+        metrics.gauge("confession_queue_depth", _pipeline.queue_depth)
+        for name in _pipeline.stats:
+            metrics.gauge(f"confessions_{name}", lambda name=name: _pipeline.stats[name] if _pipeline else 0)
+    return _pipeline
+
+
+async def close_confession_pipeline():
+    global _pipeline
+    if _pipeline is not None:
+        await _pipeline.close()
+        _pipeline = None
@@ -0,0 +1,86 @@
+import asyncio
+from . import autocomplete, role_menu_cache
+from .database import run_read, run_write
+from .data_manager import PROCESS_ORIGIN, forget_guild
+from .metrics import metrics
+
+POLL_INTERVAL = 2.0        # how often other processes' config changes are picked up
+CHANGE_LOG_TTL = 60 * 60   # seconds a change stays in config_changes
+PRUNE_EVERY = 150          # polls between prunes of the change log (~5 minutes)
+
+
+def _latest_change(conn) -> int:
+    return conn.execute("SELECT COALESCE(MAX(change_id), 0) FROM config_changes").fetchone()[0]
+
+
+def _changes_since(conn, change_id: int) -> list:
+    return conn.execute(
+        "SELECT change_id, guild_id, origin FROM config_changes WHERE change_id > ? ORDER BY change_id",
+        (change_id,)
+    ).fetchall()
+
+
+def _prune(conn):
+    conn.execute("DELETE FROM config_changes WHERE changed_at < datetime('now', ?)", (f"-{CHANGE_LOG_TTL} seconds",))
+
+
+class ConfigSync:
+    """Keeps this process's guild config caches in step with writes made by other processes."""
+
+    def __init__(self):
+        self.task = None
+        self.last_change_id = 0
+        self.stats = {"invalidated": 0}
+
+    async def start(self):
+        if self.task is None:
+            # Everything before now is already what we'd load from the database.
+            self.last_change_id = await run_read(_latest_change)
+            self.task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        polls = 0
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                await self.poll()
+                polls += 1
+                if polls % PRUNE_EVERY == 0:
+                    await run_write(_prune)
+            except Exception as e:
+                print(f"ERROR: Could not check for config changes: {e}")
+
+    async def poll(self):
+        for change in await run_read(_changes_since, self.last_change_id):
+            self.last_change_id = change["change_id"]
+            if change["origin"] == PROCESS_ORIGIN:
+                continue
+            guild_id = change["guild_id"]
+            forget_guild(guild_id)
+            role_menu_cache.invalidate(guild_id)
+            autocomplete.invalidate(guild_id)
+            self.stats["invalidated"] += 1
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+
+_config_sync = None
+
+
+def get_config_sync() -> ConfigSync:
+    global _config_sync
+    if _config_sync is None:
+        _config_sync = ConfigSync()
+        metrics.gauge("config_invalidations", lambda: _config_sync.stats["invalidated"] if _config_sync else 0)
+    return _config_sync
+
+
+async def close_config_sync():
+    global _config_sync
+    if _config_sync is not None:
+        await _config_sync.close()
+        _config_sync = None
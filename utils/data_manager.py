@@ -1,28 +1,229 @@
 import os
 import json
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from .database import get_db_connection, run_read, run_write
+from .cache import retrieve_exception
+
+# Guild configs live in the guild_settings / role_categories tables and are
+# loaded on first use. Only the most recently used guilds stay in memory.
+LEGACY_DATA_FILE = "server_data.json"
+GUILD_CACHE_SIZE = 1000
+
+# Mutations are coalesced: a flush runs FLUSH_DELAY seconds after the last
+# change, but never later than MAX_FLUSH_DELAY after the first pending one.
+FLUSH_DELAY = 2.0
+MAX_FLUSH_DELAY = 10.0
+
+# Identifies this process in config_changes, so it skips its own writes.
+PROCESS_ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+_cache = OrderedDict()  # guild_id -> guild config dict, in LRU order
+_loading = {}  # guild_id -> Task for loads already in flight
+_dirty_guilds = set()
+_first_dirty_at = None
+_flush_handle = None
+_flush_lock = None
+
+
+def _default_guild_data() -> dict:
+    return {
+        "settings": {"log_channel": None},
+        "roles": {}
+    }
+
+
+def _read_guild(conn, guild_id: int):
+    row = conn.execute("SELECT settings FROM guild_settings WHERE guild_id = ?", (guild_id,)).fetchone()
+    categories = conn.execute(
+        "SELECT name, role_ids FROM role_categories WHERE guild_id = ? ORDER BY position",
+        (guild_id,)
+    ).fetchall()
+    if row is None and not categories:
+        return None
+    return {
+        "settings": json.loads(row["settings"]) if row else {"log_channel": None},
+        "roles": {category["name"]: json.loads(category["role_ids"]) for category in categories}
+    }
+
+
+def _guild_rows(guild_id: int, data: dict):
+    """Turns a guild config into the rows stored for it."""
+    settings = json.dumps(data.get("settings", {}), separators=(",", ":"))
+    categories = [
+        (guild_id, name, position, json.dumps(role_ids, separators=(",", ":")))
+        for position, (name, role_ids) in enumerate(data.get("roles", {}).items())
+    ]
+    return guild_id, settings, categories
+
+
+def _write_guilds(conn, snapshot):
+    for guild_id, settings, categories in snapshot:
+        conn.execute("INSERT OR REPLACE INTO guild_settings (guild_id, settings) VALUES (?, ?)", (guild_id, settings))
+        conn.execute("DELETE FROM role_categories WHERE guild_id = ?", (guild_id,))
+        conn.executemany(
+            "INSERT INTO role_categories (guild_id, name, position, role_ids) VALUES (?, ?, ?, ?)",
+            categories
+        )
+    conn.executemany(
+        "INSERT INTO config_changes (guild_id, origin) VALUES (?, ?)",
+        ((guild_id, PROCESS_ORIGIN) for guild_id, _, _ in snapshot)
+    )
+
+
+def import_legacy_data(path: str = LEGACY_DATA_FILE) -> int:
+    """One-time import of an old server_data.json into the database."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r') as f:
+        content = f.read()
+    legacy = json.loads(content) if content else {}
+
+    conn = get_db_connection()
+    with conn:
+        for guild_id_str, data in legacy.items():
+            guild_id = int(guild_id_str)
+            # Never clobber a guild that already has config in the database.
+            exists = conn.execute("SELECT 1 FROM guild_settings WHERE guild_id = ?", (guild_id,)).fetchone()
+            if not exists:
+                _write_guilds(conn, [_guild_rows(guild_id, data)])
+    conn.close()
+
+    os.replace(path, path + ".imported")
+    print(f"Imported {len(legacy)} guild configs from {path}.")
+    return len(legacy)
 
-DATA_FILE = "server_data.json"
-SERVER_DATA = {}
 
 def load_data():
-    global SERVER_DATA
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            content = f.read()
-            SERVER_DATA = json.loads(content) if content else {}
-    else:
-        SERVER_DATA = {}
-
-def save_data():
-    with open(DATA_FILE, 'w') as f:
-        json.dump(SERVER_DATA, f, indent=4)
-
-def get_guild_data(guild_id: int) -> dict:
+    """Prepares the config store at startup. Guilds themselves load lazily."""
+    _cache.clear()
+    _dirty_guilds.clear()
+    import_legacy_data()
+
+
+def _remember(guild_id: int, data: dict):
+    _cache[guild_id] = data
+    _cache.move_to_end(guild_id)
+    # Evict the coldest guilds, but never one with unsaved changes.
+    if len(_cache) > GUILD_CACHE_SIZE:
+        for cold_id in list(_cache):
+            if len(_cache) <= GUILD_CACHE_SIZE:
+                break
+            if cold_id not in _dirty_guilds:
+                del _cache[cold_id]
+
+
+async def get_guild_data(guild_id: int) -> dict:
     """Retrieve or initialize data for a specific guild."""
-    guild_id_str = str(guild_id)
-    if guild_id_str not in SERVER_DATA:
-        SERVER_DATA[guild_id_str] = {
-            "settings": {"log_channel": None},
-            "roles": {}
-        }
-    return SERVER_DATA[guild_id_str]
\ No newline at end of file
+    guild_id = int(guild_id)
+    if guild_id in _cache:
+        _cache.move_to_end(guild_id)
+        return _cache[guild_id]
+
+    # Share one load between interactions that arrive for the same guild,
+    # so everyone ends up mutating the same dict. It runs in its own task, so an
+    # interaction cancelled mid-load doesn't fail the others waiting for it.
+    task = _loading.get(guild_id)
+    if task is None:
+        task = _loading[guild_id] = asyncio.ensure_future(_load_guild(guild_id))
+        task.add_done_callback(retrieve_exception)
+    return await asyncio.shield(task)
+
+
+async def _load_guild(guild_id: int) -> dict:
+    try:
+        data = await run_read(_read_guild, guild_id)
+        if data is None:
+            # Defaults are only persisted once something actually changes.
+            data = _default_guild_data()
+        _remember(guild_id, data)
+        return data
+    finally:
+        del _loading[guild_id]
+
+
+def forget_guild(guild_id: int) -> bool:
+    """Drops a guild's cached config so the next use reloads it (changed by another process).
+
+    A guild with unsaved local changes is kept; those changes win when they're written.
+    """
+    guild_id = int(guild_id)
+    if guild_id in _dirty_guilds:
+        return False
+    return _cache.pop(guild_id, None) is not None
+
+
+def get_cached_guild_data(guild_id: int):
+    """Returns a guild's config only if it is already in memory."""
+    return _cache.get(int(guild_id))
+
+
+def save_data(guild_id: int):
+    """Marks a guild's config as changed and schedules a coalesced write."""
+    global _first_dirty_at
+    _dirty_guilds.add(int(guild_id))
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No event loop (scripts, shutdown): write straight away.
+        flush_data()
+        return
+
+    now = time.monotonic()
+    if _first_dirty_at is None:
+        _first_dirty_at = now
+    delay = min(FLUSH_DELAY, max(0.0, _first_dirty_at + MAX_FLUSH_DELAY - now))
+    _schedule_flush(loop, delay)
+
+
+def _schedule_flush(loop, delay: float):
+    global _flush_handle
+    if _flush_handle is not None:
+        _flush_handle.cancel()
+    _flush_handle = loop.call_later(delay, lambda: asyncio.ensure_future(flush_pending()))
+
+
+def _take_snapshot():
+    """Serializes just the dirty guilds into the rows that need writing."""
+    global _first_dirty_at
+    snapshot = [_guild_rows(guild_id, _cache[guild_id]) for guild_id in _dirty_guilds if guild_id in _cache]
+    _dirty_guilds.clear()
+    _first_dirty_at = None
+    return snapshot
+
+
+async def flush_pending():
+    """Writes any pending changes to the database without blocking the event loop."""
+    global _flush_handle, _flush_lock
+    if _flush_handle is not None:
+        _flush_handle.cancel()
+        _flush_handle = None
+    if _flush_lock is None:
+        _flush_lock = asyncio.Lock()
+
+    async with _flush_lock:
+        if not _dirty_guilds:
+            return
+        snapshot = _take_snapshot()
+        try:
+            await run_write(_write_guilds, snapshot)
+        except Exception as e:
+            print(f"ERROR: Could not save guild configs: {e}")
+            # Keep the changes pending so the next mutation retries the write.
+            _dirty_guilds.update(guild_id for guild_id, _, _ in snapshot)
+
+
+def flush_data():
+    """Synchronously writes any pending changes to the database."""
+    global _flush_handle
+    if _flush_handle is not None:
+        _flush_handle.cancel()
+        _flush_handle = None
+    if _dirty_guilds:
+        conn = get_db_connection()
+        with conn:
+            _write_guilds(conn, _take_snapshot())
+        conn.close()
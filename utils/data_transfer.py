@@ -0,0 +1,203 @@
+"""Streaming export and import of a guild's warnings and confessions.
+
+    python -m utils.data_transfer export --guild 123 --table warnings warnings.jsonl.gz
+    python -m utils.data_transfer export --guild 123 --table confessions --archived confessions.csv
+    python -m utils.data_transfer import --table warnings warnings.jsonl.gz [--guild 456]
+
+The format follows the file name: .jsonl or .csv, gzip-compressed when it ends
+in .gz. Rows are read and written in chunks, so memory use stays flat however
+big the guild is. Confession exports from /export_data leave the authors out,
+so only CLI exports can be imported back.
+"""
+import csv
+import gzip
+import json
+import uuid
+import sqlite3
+from .database import get_db_connection, SHORT_ID_LENGTH
+from .maintenance import iter_archive
+
+EXPORT_COLUMNS = {
+    "warnings": ("warning_id", "short_id", "guild_id", "user_id", "moderator_id", "reason", "timestamp"),
+    "confessions": ("confession_id", "short_id", "guild_id", "user_id", "channel_id", "content", "timestamp"),
+}
+ID_COLUMNS = {"warnings": "warning_id", "confessions": "confession_id"}
+INTEGER_COLUMNS = {"guild_id", "user_id", "moderator_id", "channel_id"}
+
+CHUNK_SIZE = 1000  # rows fetched per cursor round-trip, and inserted per import transaction
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        # Level 6 compresses nearly as well as 9 at a fraction of the CPU time
+        return gzip.open(path, mode + "t", compresslevel=6, encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith(".jsonl") or name.endswith(".json"):
+        return "jsonl"
+    raise ValueError(f"Can't tell the format of '{path}', use a .jsonl or .csv name (optionally .gz).")
+
+
+# --- Export ---
+
+def iter_rows(conn, table: str, guild_id: int, archived: bool = False, columns=None):
+    """Yields a guild's rows as dicts, archived ones first, fetching CHUNK_SIZE at a time."""
+    columns = columns or EXPORT_COLUMNS[table]
+    if archived:
+        for record in iter_archive(conn, guild_id, table):
+            yield {column: record.get(column) for column in columns}
+
+    # Unposted confessions aren't final yet, so they stay out of exports.
+    pending = " AND posted = 1" if table == "confessions" else ""
+    cursor = conn.execute(
+        f"SELECT {', '.join(columns)} FROM {table} WHERE guild_id = ?{pending} ORDER BY timestamp, rowid",
+        (guild_id,)
+    )
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            yield dict(zip(columns, row))
+
+
+def export_guild(path: str, table: str, guild_id: int, archived: bool = False, columns=None) -> int:
+    """Streams a guild's rows into `path` and returns how many were written. Blocking; run it in a thread."""
+    columns = columns or EXPORT_COLUMNS[table]
+    file_format = _format(path)
+    conn = get_db_connection()
+    count = 0
+    try:
+        with _open(path, "w") as f:
+            if file_format == "csv":
+                writer = csv.DictWriter(f, fieldnames=columns)
+                writer.writeheader()
+                write = writer.writerow
+            else:
+                write = lambda row: f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            for row in iter_rows(conn, table, guild_id, archived, columns):
+                write(row)
+                count += 1
+    finally:
+        conn.close()
+    return count
+
+
+# --- Import ---
+
+def _read_file(path: str):
+    with _open(path, "r") as f:
+        if _format(path) == "csv":
+            for row in csv.DictReader(f):
+                # CSV has no NULL; empty ID columns mean there was no value.
+                yield {key: (None if value == "" and key in INTEGER_COLUMNS else value) for key, value in row.items()}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _insert_chunk(conn, table: str, rows: list) -> tuple:
+    """Inserts one chunk in a single transaction; returns (inserted, skipped, renumbered)."""
+    id_column = ID_COLUMNS[table]
+    columns = list(rows[0])
+    # rowcount, unlike total_changes, leaves out rows the search index and
+    # warning counter triggers write.
+    inserted = conn.executemany(
+        f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        (tuple(row.values()) for row in rows)
+    ).rowcount
+    if inserted == len(rows):
+        return inserted, 0, 0
+
+    # A row is ignored either because it was imported before (same ID, skip it)
+    # or because its short ID is already taken in the guild (give it a new one).
+    ids = [row.get(id_column) for row in rows]
+    present = {
+        row[0] for row in conn.execute(
+            f"SELECT {id_column} FROM {table} WHERE {id_column} IN ({', '.join('?' * len(ids))})", ids
+        )
+    }
+    renumbered = 0
+    for row in rows:
+        if row.get(id_column) in present:
+            continue
+        _insert_renumbered(conn, table, row)
+        renumbered += 1
+    return inserted, len(rows) - inserted - renumbered, renumbered
+
+
+def _insert_renumbered(conn, table: str, row: dict, attempts: int = 5):
+    """Inserts a row under a fresh short ID, keeping its full ID so a re-import still recognises it."""
+    row.setdefault("short_id", None)
+    columns = list(row)
+    for _ in range(attempts):
+        row["short_id"] = uuid.uuid4().hex[:SHORT_ID_LENGTH]
+        try:
+            conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", tuple(row.values()))
+            return
+        except sqlite3.IntegrityError:
+            continue
+    raise sqlite3.IntegrityError(f"Could not import {table} row {row.get(ID_COLUMNS[table])}")
+
+
+def import_file(path: str, table: str, guild_id: int = None) -> dict:
+    """Bulk-loads an export, CHUNK_SIZE rows per transaction. Blocking; run it in a thread.
+
+    Re-importing the same file is harmless: rows whose ID already exists are skipped.
+    `guild_id` moves the rows to another guild.
+    """
+    columns = EXPORT_COLUMNS[table]
+    totals = {"inserted": 0, "skipped": 0, "renumbered": 0}
+    conn = get_db_connection()
+
+    def flush(chunk):
+        with conn:
+            for key, value in zip(totals, _insert_chunk(conn, table, chunk)):
+                totals[key] += value
+
+    try:
+        chunk = []
+        for record in _read_file(path):
+            row = {column: record.get(column) for column in columns if column in record}
+            if guild_id is not None:
+                row["guild_id"] = guild_id
+            if table == "confessions":
+                row["posted"] = 1  # already posted by the deployment it came from
+            chunk.append(row)
+            if len(chunk) >= CHUNK_SIZE:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    except (sqlite3.IntegrityError, KeyError, ValueError) as e:
+        raise ValueError(f"Import stopped after {totals['inserted']} row(s): {e}") from e
+    finally:
+        conn.close()
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+    from .database import initialize_database
+
+    parser = argparse.ArgumentParser(description="Export or import a guild's warnings/confessions.")
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("path", help="a .jsonl or .csv file, optionally ending in .gz")
+    parser.add_argument("--table", choices=tuple(EXPORT_COLUMNS), required=True)
+    parser.add_argument("--guild", type=int, help="guild to export (required), or to import into (default: as in the file)")
+    parser.add_argument("--archived", action="store_true", help="include archived rows in the export")
+    args = parser.parse_args()
+
+    initialize_database()
+    if args.action == "export":
+        if args.guild is None:
+            parser.error("--guild is required for export")
+        print(f"Exported {export_guild(args.path, args.table, args.guild, args.archived)} row(s) to {args.path}.")
+    else:
+        print(f"Imported {args.path}: {import_file(args.path, args.table, args.guild)}")
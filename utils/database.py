@@ -1,18 +1,200 @@
+import asyncio
 import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from .metrics import metrics
 
 DATABASE_FILE = "database.db"
 
+# Warnings and confessions are referred to by a short ID that is unique per guild.
+SHORT_ID_LENGTH = 8
+
+# Reads run on a small pool of threads, writes are funneled through a single
+# writer thread so SQLite never sees two writers from this process fighting over
+# the lock. Other processes (sharded workers, the CLI tools) are kept in line by
+# SQLite's own file locking.
+READER_THREADS = 4
+
+_local = threading.local()
+_open_connections = []
+_connections_lock = threading.Lock()
+_reader_pool = None
+_writer = None
+
+
 def get_db_connection():
     """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = sqlite3.connect(DATABASE_FILE, timeout=30, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    # Only takes effect on a new, empty file, so it must come before WAL mode
+    # writes the header. Existing files are switched over by _enable_incremental_vacuum.
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _thread_connection():
+    """Returns the long-lived connection owned by the current worker thread."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = get_db_connection()
+        _local.conn = conn
+        with _connections_lock:
+            _open_connections.append(conn)
     return conn
 
+
+def _get_reader_pool():
+    global _reader_pool
+    if _reader_pool is None:
+        _reader_pool = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix="db-reader")
+    return _reader_pool
+
+
+def _get_writer():
+    global _writer
+    if _writer is None:
+        _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+    return _writer
+
+
+def _read_job(func, args):
+    return func(_thread_connection(), *args)
+
+
+def _write_job(func, args):
+    conn = _thread_connection()
+    with conn:  # commits on success, rolls back on error
+        # Take the write lock up front: a job that reads before it writes then
+        # can't be overtaken by another process in between.
+        conn.execute("BEGIN IMMEDIATE")
+        return func(conn, *args)
+
+
+# --- Awaitable helpers used by the cogs ---
+
+async def run_read(func, *args):
+    """Runs func(conn, *args) on a reader thread and returns its result."""
+    loop = asyncio.get_running_loop()
+    # Timed from the caller's side, so time spent queued for a thread counts too
+    with metrics.track("db_query_seconds", op="read"):
+        return await loop.run_in_executor(_get_reader_pool(), _read_job, func, args)
+
+
+async def run_write(func, *args):
+    """Runs func(conn, *args) inside a single transaction on the writer thread."""
+    loop = asyncio.get_running_loop()
+    with metrics.track("db_query_seconds", op="write"):
+        return await loop.run_in_executor(_get_writer(), _write_job, func, args)
+
+
+async def fetch_one(query: str, params=()):
+    return await run_read(lambda conn: conn.execute(query, params).fetchone())
+
+
+async def fetch_all(query: str, params=()):
+    return await run_read(lambda conn: conn.execute(query, params).fetchall())
+
+
+async def execute(query: str, params=()) -> int:
+    """Runs a single write statement and returns the number of affected rows."""
+    return await run_write(lambda conn: conn.execute(query, params).rowcount)
+
+
+async def execute_many(query: str, seq_of_params) -> int:
+    return await run_write(lambda conn: conn.executemany(query, seq_of_params).rowcount)
+
+
+def insert_with_short_id(conn, table: str, id_column: str, values: dict, attempts: int = 5):
+    """Inserts a row with a fresh UUID and a per-guild unique short ID.
+
+    Returns (full_id, short_id). A clash on the (guild_id, short_id) index just
+    means we draw another UUID and try again.
+    """
+    columns = ", ".join([id_column, "short_id", *values])
+    placeholders = ", ".join("?" * (len(values) + 2))
+    for _ in range(attempts):
+        full_id = str(uuid.uuid4())
+        short_id = full_id[:SHORT_ID_LENGTH]
+        try:
+            conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", (full_id, short_id, *values.values()))
+            return full_id, short_id
+        except sqlite3.IntegrityError:
+            continue
+    raise RuntimeError(f"Could not generate a unique short ID for {table}")
+
+
+def insert_many_with_short_ids(conn, table: str, id_column: str, guild_id: int, rows: list, attempts: int = 5) -> list:
+    """Bulk version of insert_with_short_id for rows of one guild, using a single executemany.
+
+    Short IDs are checked against the guild's existing ones up front and redrawn
+    on a clash. Returns a (full_id, short_id) pair per row, in order.
+    """
+    if not rows:
+        return []
+    ids = [None] * len(rows)
+    pending = list(range(len(rows)))
+    taken = set()
+    for _ in range(attempts):
+        drawn = {}  # short_id -> (row index, full_id)
+        for i in pending:
+            full_id = str(uuid.uuid4())
+            short_id = full_id[:SHORT_ID_LENGTH]
+            if short_id not in taken and short_id not in drawn:
+                drawn[short_id] = (i, full_id)
+        short_ids = list(drawn)
+        clashes = set()
+        for start in range(0, len(short_ids), 500):  # stay well under SQLite's variable limit
+            chunk = short_ids[start:start + 500]
+            clashes.update(row[0] for row in conn.execute(
+                f"SELECT short_id FROM {table} WHERE guild_id = ? AND short_id IN ({', '.join('?' * len(chunk))})",
+                (guild_id, *chunk)
+            ))
+        for short_id, (i, full_id) in drawn.items():
+            if short_id not in clashes:
+                ids[i] = (full_id, short_id)
+                taken.add(short_id)
+        pending = [i for i in pending if ids[i] is None]
+        if not pending:
+            break
+    else:
+        raise RuntimeError(f"Could not generate unique short IDs for {table}")
+
+    columns = [id_column, "short_id", "guild_id", *rows[0]]
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        ((full_id, short_id, guild_id, *values.values()) for (full_id, short_id), values in zip(ids, rows))
+    )
+    return ids
+
+
+def normalize_short_id(text: str) -> str:
+    """Cleans up a short ID typed by a user (whitespace, backticks, case)."""
+    return text.strip().strip("`").lower()
+
+
+def close_database():
+    """Waits for pending queries and closes every pooled connection."""
+    global _reader_pool, _writer
+    for pool in (_writer, _reader_pool):
+        if pool is not None:
+            pool.shutdown(wait=True)
+    _reader_pool = None
+    _writer = None
+    with _connections_lock:
+        for conn in _open_connections:
+            conn.close()
+        _open_connections.clear()
+
+
 def initialize_database():
     """Creates the necessary tables if they don't already exist."""
     conn = get_db_connection()
+    _enable_incremental_vacuum(conn)
     cursor = conn.cursor()
-    
+
     # --- UPDATED WARNINGS TABLE ---
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS warnings (
@@ -24,7 +206,7 @@ def initialize_database():
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     """)
-    
+
      # --- UPDATED CONFESSIONS TABLE ---
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS confessions (
@@ -35,7 +217,237 @@ def initialize_database():
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     """)
-    
+
+    # --- GUILD CONFIG TABLES ---
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER PRIMARY KEY,
+            settings TEXT NOT NULL -- JSON object of the guild's settings
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS role_categories (
+            guild_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            role_ids TEXT NOT NULL, -- JSON list of role ID strings
+            PRIMARY KEY (guild_id, name)
+        )
+    """)
+
+    # --- TRUTH OR DARE QUESTION LIBRARY ---
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS questions (
+            question_type TEXT NOT NULL, -- 'truths' or 'dares'
+            rating TEXT NOT NULL,
+            question TEXT NOT NULL,
+            UNIQUE (question_type, rating, question)
+        )
+    """)
+
     conn.commit()
+    _apply_migrations(conn)
     conn.close()
-    print("Database initialized successfully.")
\ No newline at end of file
+    print("Database initialized successfully.")
+
+
+def _enable_incremental_vacuum(conn):
+    """Lets maintenance hand free pages back to the OS a few at a time (PRAGMA incremental_vacuum)."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return
+    # New files already got the setting in get_db_connection; a database
+    # created before that needs one full VACUUM to switch over.
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    if conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone():
+        print("Switching the database to incremental auto-vacuum (one-time full VACUUM)...")
+        conn.execute("VACUUM")
+        rebuild_search_indexes(conn)
+
+
+# --- Schema migrations ---
+# Each migration runs once, in order; PRAGMA user_version records how many have run.
+
+def _backfill_short_ids(conn, table: str, id_column: str):
+    """Gives existing rows a short ID, lengthening the prefix on the rare clash."""
+    taken = set()
+    rows = conn.execute(f"SELECT rowid, guild_id, {id_column} FROM {table} ORDER BY timestamp").fetchall()
+    for row in rows:
+        full_id = row[id_column].lower()
+        length = SHORT_ID_LENGTH
+        short_id = full_id[:length]
+        while (row["guild_id"], short_id) in taken and length < len(full_id):
+            length += 4
+            short_id = full_id[:length]
+        taken.add((row["guild_id"], short_id))
+        conn.execute(f"UPDATE {table} SET short_id = ? WHERE rowid = ?", (short_id, row["rowid"]))
+
+
+def _migration_short_ids(conn):
+    for table, id_column in (("warnings", "warning_id"), ("confessions", "confession_id")):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN short_id TEXT")
+        _backfill_short_ids(conn, table, id_column)
+        conn.execute(f"CREATE UNIQUE INDEX idx_{table}_short_id ON {table} (guild_id, short_id)")
+
+
+def _migration_warning_history_index(conn):
+    # SQLite can walk this index backwards, so it serves "newest first" pages
+    # and the rowid tie-breaker without a temp sort.
+    conn.execute("CREATE INDEX idx_warnings_user_time ON warnings (guild_id, user_id, timestamp)")
+
+
+def _migration_confession_delivery(conn):
+    # Confessions are stored first and posted by a background worker. Rows that
+    # were never posted (posted = 0) are picked up again after a restart.
+    conn.execute("ALTER TABLE confessions ADD COLUMN channel_id INTEGER")
+    conn.execute("ALTER TABLE confessions ADD COLUMN posted INTEGER NOT NULL DEFAULT 1")
+    conn.execute("ALTER TABLE confessions ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX idx_confessions_unposted ON confessions (posted) WHERE posted = 0")
+
+
+def _migration_archive(conn):
+    # Rows past a guild's retention period move here in compressed chunks.
+    conn.execute("""
+        CREATE TABLE archive (
+            archive_id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL, -- 'warnings' or 'confessions'
+            guild_id INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            first_timestamp DATETIME NOT NULL,
+            last_timestamp DATETIME NOT NULL,
+            archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            payload BLOB NOT NULL -- zlib-compressed JSON list of the archived rows
+        )
+    """)
+    conn.execute("CREATE INDEX idx_archive_guild ON archive (guild_id, source)")
+    # Retention sweeps walk each guild's oldest rows first.
+    conn.execute("CREATE INDEX idx_warnings_guild_time ON warnings (guild_id, timestamp)")
+    conn.execute("CREATE INDEX idx_confessions_guild_time ON confessions (guild_id, timestamp)")
+
+
+# Full-text indexes over warning reasons and confession text. They are
+# external-content FTS5 tables keyed by rowid (so a full VACUUM, which may
+# renumber rowids, must be followed by a rebuild). guild_id is indexed as a token
+# too, so a search only walks the guild's own matches.
+SEARCH_INDEXES = {
+    "warnings": "reason",
+    "confessions": "content",
+}
+
+
+def _migration_full_text_search(conn):
+    for table, column in SEARCH_INDEXES.items():
+        fts = f"{table}_fts"
+        conn.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5(guild_id, {column}, content='{table}', content_rowid='rowid', "
+            f"tokenize='porter unicode61')"
+        )
+        conn.execute(f"""
+            CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts} (rowid, guild_id, {column}) VALUES (new.rowid, new.guild_id, new.{column});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, guild_id, {column}) VALUES ('delete', old.rowid, old.guild_id, old.{column});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER {fts}_update AFTER UPDATE OF guild_id, {column} ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, guild_id, {column}) VALUES ('delete', old.rowid, old.guild_id, old.{column});
+                INSERT INTO {fts} (rowid, guild_id, {column}) VALUES (new.rowid, new.guild_id, new.{column});
+            END
+        """)
+    # Index what is already there
+    rebuild_search_indexes(conn)
+
+
+def rebuild_search_indexes(conn):
+    """Re-reads every warning and confession into the full-text indexes."""
+    for table in SEARCH_INDEXES:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (f"{table}_fts",)).fetchone():
+            conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+            conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('optimize')")
+
+
+def _migration_config_changes(conn):
+    # Every guild config write is logged here, so other processes (sharded
+    # workers) know to drop their cached copy.
+    conn.execute("""
+        CREATE TABLE config_changes (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            origin TEXT NOT NULL, -- the process that made the change
+            changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+# SQL run by the warning_counts triggers for one warning added (new.) or removed (old.)
+_COUNT_WARNING = """
+    INSERT INTO warning_counts (guild_id, user_id, warning_count, last_warning_at) VALUES (new.guild_id, new.user_id, 1, new.timestamp)
+    ON CONFLICT (guild_id, user_id) DO UPDATE SET
+        warning_count = warning_count + 1,
+        last_warning_at = MAX(last_warning_at, excluded.last_warning_at);
+"""
+_UNCOUNT_WARNING = """
+    UPDATE warning_counts SET
+        warning_count = warning_count - 1,
+        last_warning_at = (SELECT MAX(timestamp) FROM warnings WHERE guild_id = old.guild_id AND user_id = old.user_id)
+    WHERE guild_id = old.guild_id AND user_id = old.user_id;
+    DELETE FROM warning_counts WHERE guild_id = old.guild_id AND user_id = old.user_id AND warning_count <= 0;
+"""
+
+
+def _migration_warning_counts(conn):
+    # Per-user warning totals, kept up to date by triggers so /warn, /warnings
+    # and /top_warned never have to count the warnings table.
+    conn.execute("""
+        CREATE TABLE warning_counts (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            warning_count INTEGER NOT NULL,
+            last_warning_at DATETIME,
+            PRIMARY KEY (guild_id, user_id)
+        ) WITHOUT ROWID
+    """)
+    # Leaderboard order, read straight off the index
+    conn.execute("CREATE INDEX idx_warning_counts_top ON warning_counts (guild_id, warning_count DESC, last_warning_at DESC)")
+    conn.execute(f"CREATE TRIGGER warning_counts_insert AFTER INSERT ON warnings BEGIN {_COUNT_WARNING} END")
+    conn.execute(f"CREATE TRIGGER warning_counts_delete AFTER DELETE ON warnings BEGIN {_UNCOUNT_WARNING} END")
+    conn.execute(f"CREATE TRIGGER warning_counts_update AFTER UPDATE OF guild_id, user_id ON warnings BEGIN {_UNCOUNT_WARNING} {_COUNT_WARNING} END")
+    rebuild_warning_counts(conn)
+
+
+def rebuild_warning_counts(conn):
+    """Recounts every user's warnings from scratch."""
+    conn.execute("DELETE FROM warning_counts")
+    conn.execute("""
+        INSERT INTO warning_counts (guild_id, user_id, warning_count, last_warning_at)
+        SELECT guild_id, user_id, COUNT(*), MAX(timestamp) FROM warnings GROUP BY guild_id, user_id
+    """)
+
+
+MIGRATIONS = [
+    _migration_short_ids,
+    _migration_warning_history_index,
+    _migration_confession_delivery,
+    _migration_archive,
+    _migration_full_text_search,
+    _migration_config_changes,
+    _migration_warning_counts,
+]
+
+
+def _apply_migrations(conn):
+    while True:
+        with conn:
+            # Holding the write lock while checking the version means that when
+            # several processes start at once, one migrates and the rest wait.
+            conn.execute("BEGIN IMMEDIATE")  # also makes the DDL part of the transaction
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= len(MIGRATIONS):
+                return
+            migration = MIGRATIONS[version]
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+        print(f"Applied database migration {version + 1}: {migration.__name__}")
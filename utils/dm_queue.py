@@ -0,0 +1,125 @@
+import asyncio
+import aiohttp
+import discord
+from .cache import TTLCache
+from .metrics import metrics
+
+DM_CONCURRENCY = 5            # DMs being sent at once
+RETRY_DELAYS = (5, 30)        # seconds before each retry of a transient failure
+CLOSED_DM_TTL = 6 * 60 * 60   # how long we remember that a user rejects DMs
+CLOSED_DM_CACHE_SIZE = 10000
+CLOSE_TIMEOUT = 5.0           # how long shutdown waits for queued DMs
+
+# Delivery outcomes
+DM_SENT = "sent"
+DM_CLOSED = "closed"   # the user doesn't accept DMs from us
+DM_FAILED = "failed"
+
+
+class DMDeliveryQueue:
+    """Sends DMs from a small pool of background workers and reports how each one went."""
+
+    def __init__(self, concurrency: int = DM_CONCURRENCY):
+        self.concurrency = concurrency
+        self.queue = None
+        self.workers = []
+        self.closed_dms = TTLCache(maxsize=CLOSED_DM_CACHE_SIZE, ttl=CLOSED_DM_TTL)
+        self.stats = {"queued": 0, "sent": 0, "closed": 0, "skipped": 0, "retried": 0, "failed": 0}
+
+    def queue_depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    def deliver(self, user: discord.abc.User, embed: discord.Embed) -> asyncio.Future:
+        """Queues a DM and returns a future that resolves to DM_SENT, DM_CLOSED or DM_FAILED."""
+        future = asyncio.get_running_loop().create_future()
+        if self.closed_dms.get(user.id):
+            # Known to reject DMs; don't spend two requests finding that out again.
+            self.stats["skipped"] += 1
+            future.set_result(DM_CLOSED)
+            return future
+
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+            self.workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self.queue.put_nowait((user, embed, future))
+        self.stats["queued"] += 1
+        return future
+
+    async def _worker(self):
+        while True:
+            user, embed, future = await self.queue.get()
+            try:
+                status = await self._send(user, embed)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.set_result(DM_FAILED)
+                raise
+            except Exception as e:
+                # Anything _send doesn't expect must not take the worker down with it.
+                print(f"ERROR: Could not DM user {user.id}: {e}")
+                self.stats["failed"] += 1
+                status = DM_FAILED
+            finally:
+                self.queue.task_done()
+            if not future.done():
+                future.set_result(status)
+
+    async def _send(self, user: discord.abc.User, embed: discord.Embed) -> str:
+        for attempt in range(len(RETRY_DELAYS) + 1):
+            try:
+                await user.send(embed=embed)
+                self.stats["sent"] += 1
+                return DM_SENT
+            except discord.Forbidden:
+                # DMs closed, bot blocked or no shared server
+                self.closed_dms.set(user.id, True)
+                self.stats["closed"] += 1
+                return DM_CLOSED
+            except (discord.DiscordServerError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == len(RETRY_DELAYS):
+                    print(f"ERROR: Could not DM user {user.id}: {e}")
+                    break
+                self.stats["retried"] += 1
+                await asyncio.sleep(RETRY_DELAYS[attempt])
+            except discord.HTTPException as e:
+                print(f"ERROR: Could not DM user {user.id}: {e}")
+                break
+        self.stats["failed"] += 1
+        return DM_FAILED
+
+    async def close(self):
+        """Gives queued DMs a moment to go out, then stops the workers."""
+        if self.queue is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=CLOSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        if self.queue is not None:
+            while not self.queue.empty():
+                _, _, future = self.queue.get_nowait()
+                if not future.done():
+                    future.set_result(DM_FAILED)
+        self.workers = []
+
+
+_dm_queue = None
+
+
+def get_dm_queue() -> DMDeliveryQueue:
+    global _dm_queue
+    if _dm_queue is None:
+        _dm_queue = DMDeliveryQueue()
+        metrics.gauge("dm_queue_depth", _dm_queue.queue_depth)
+        for name in _dm_queue.stats:
+            metrics.gauge(f"dm_{name}", lambda name=name: _dm_queue.stats[name] if _dm_queue else 0)
+    return _dm_queue
+
+
+async def close_dm_queue():
+    global _dm_queue
+    if _dm_queue is not None:
+        await _dm_queue.close()
+        _dm_queue = None
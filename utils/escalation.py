@@ -0,0 +1,78 @@
+import discord
+from datetime import timedelta
+
+# Per-guild settings keys; unset (None) turns that step off
+TIMEOUT_AT_SETTING = "timeout_at_warnings"
+TIMEOUT_MINUTES_SETTING = "timeout_minutes"
+KICK_AT_SETTING = "kick_at_warnings"
+
+DEFAULT_TIMEOUT_MINUTES = 60
+MAX_TIMEOUT_MINUTES = 28 * 24 * 60  # Discord's limit
+
+
+# --- Database jobs (run on the reader/writer threads) ---
+
+def warning_count(conn, guild_id: int, user_id: int) -> int:
+    row = conn.execute(
+        "SELECT warning_count FROM warning_counts WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def warning_counts(conn, guild_id: int, user_ids: list) -> dict:
+    counts = dict.fromkeys(user_ids, 0)
+    for start in range(0, len(user_ids), 500):
+        chunk = user_ids[start:start + 500]
+        counts.update(conn.execute(
+            f"SELECT user_id, warning_count FROM warning_counts WHERE guild_id = ? AND user_id IN ({', '.join('?' * len(chunk))})",
+            (guild_id, *chunk)
+        ).fetchall())
+    return counts
+
+
+def top_warned_users(conn, guild_id: int, limit: int) -> list:
+    return conn.execute(
+        "SELECT user_id, warning_count, last_warning_at FROM warning_counts WHERE guild_id = ? "
+        "ORDER BY warning_count DESC, last_warning_at DESC LIMIT ?",
+        (guild_id, limit)
+    ).fetchall()
+
+
+# --- Thresholds ---
+
+def escalation_for(settings: dict, count: int):
+    """What a user's `count`th warning leads to: ("kick", None), ("timeout", minutes) or None."""
+    kick_at = settings.get(KICK_AT_SETTING)
+    if kick_at and count >= kick_at:
+        return "kick", None
+    timeout_at = settings.get(TIMEOUT_AT_SETTING)
+    if timeout_at and count >= timeout_at:
+        return "timeout", settings.get(TIMEOUT_MINUTES_SETTING) or DEFAULT_TIMEOUT_MINUTES
+    return None
+
+
+def describe(escalation) -> str:
+    action, minutes = escalation
+    return "kicked from the server" if action == "kick" else f"timed out for {minutes} minute(s)"
+
+
+async def escalate(member: discord.Member, escalation, count: int, reason: str, dm_delivery=None) -> tuple:
+    """Applies the escalation; returns (succeeded, text for the moderator).
+
+    Kicks wait for `dm_delivery` first, since the DM can't arrive once the
+    member no longer shares a server with the bot.
+    """
+    action, minutes = escalation
+    audit_reason = f"{count} warnings, latest: {reason}"[:512]
+    try:
+        if action == "timeout":
+            await member.timeout(timedelta(minutes=minutes), reason=audit_reason)
+        else:
+            if dm_delivery is not None:
+                await dm_delivery
+            await member.kick(reason=audit_reason)
+    except discord.Forbidden:
+        return False, f"Could not {action} {member.mention}: missing permissions or their role is above mine."
+    except discord.HTTPException as e:
+        return False, f"Could not {action} {member.mention}: {e.text or e.status}"
+    return True, f"{member.mention} was {describe(escalation)} ({count} warnings)."
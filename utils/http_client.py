@@ -0,0 +1,128 @@
+import time
+import asyncio
+import aiohttp
+from urllib.parse import urlsplit
+from .metrics import metrics
+
+DEFAULT_TIMEOUT = 5.0       # seconds for a whole request, connect included
+CONNECTION_LIMIT = 20       # pooled keep-alive connections shared by all hosts
+FAILURE_THRESHOLD = 5       # consecutive failures before a host's circuit opens
+RESET_AFTER = 30.0          # seconds an open circuit waits before letting a trial through
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that has been failing."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_after: float = RESET_AFTER):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half-open":
+            # Let exactly one trial request through; it re-opens or closes the circuit.
+            self.opened_at = time.monotonic()
+            return True
+        return state == "closed"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class HttpClient:
+    """One pooled aiohttp session with timeouts, per-host circuit breakers and latency stats."""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, limit: int = CONNECTION_LIMIT):
+        self.timeout = timeout
+        self.limit = limit
+        self.session = None
+        self.breakers = {}  # host -> CircuitBreaker
+        self.metrics = {}   # host -> {"requests", "failures", "rejected", "total_ms", "max_ms"}
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(limit=self.limit, ttl_dns_cache=300, keepalive_timeout=30)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _host_metrics(self, host: str) -> dict:
+        if host not in self.metrics:
+            self.metrics[host] = {"requests": 0, "failures": 0, "rejected": 0, "total_ms": 0.0, "max_ms": 0.0}
+        return self.metrics[host]
+
+    def stats(self) -> dict:
+        """Per-host request counts, average/max latency and circuit state."""
+        report = {}
+        for host, host_metrics in self.metrics.items():
+            requests = host_metrics["requests"]
+            report[host] = {
+                **host_metrics,
+                "avg_ms": host_metrics["total_ms"] / requests if requests else 0.0,
+                "circuit": self.breakers[host].state if host in self.breakers else "closed",
+            }
+        return report
+
+    async def get_json(self, url: str, params: dict = None):
+        """GETs a URL and returns the decoded JSON body.
+
+        Raises CircuitOpenError without touching the network while the host's
+        circuit is open, aiohttp/timeout errors for failed requests and
+        ValueError when the body isn't JSON.
+        """
+        if self.session is None:
+            raise RuntimeError("HttpClient.start() has not been called")
+
+        host = urlsplit(url).netloc
+        breaker = self.breakers.setdefault(host, CircuitBreaker())
+        host_metrics = self._host_metrics(host)
+        if not breaker.allow():
+            host_metrics["rejected"] += 1
+            metrics.inc("http_circuit_rejections_total", host=host)
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        host_metrics["requests"] += 1
+        started = time.perf_counter()
+        try:
+            async with self.session.get(url, params=params) as response:
+                if response.status >= 500 or response.status == 429:
+                    breaker.record_failure()
+                    host_metrics["failures"] += 1
+                    metrics.inc("http_request_errors_total", host=host)
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+            breaker.record_success()
+            return data
+        except aiohttp.ClientResponseError:
+            raise  # already counted above when it was the upstream's fault
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            # A body that isn't JSON (say, an HTML error page sent with a 200) counts as a failure too
+            breaker.record_failure()
+            host_metrics["failures"] += 1
+            metrics.inc("http_request_errors_total", host=host)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.observe("http_request_seconds", elapsed, host=host)
+            host_metrics["total_ms"] += elapsed * 1000
+            host_metrics["max_ms"] = max(host_metrics["max_ms"], elapsed * 1000)
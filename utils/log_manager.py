@@ -1,21 +1,144 @@
+import asyncio
 import discord
-from discord import Embed
-from datetime import datetime
+from collections import deque
 from .data_manager import get_guild_data
+from .metrics import metrics
+
+# Discord accepts at most 10 embeds (and 6000 characters of embed text) per message.
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+FLUSH_INTERVAL = 1.0      # how long a worker waits for a burst to fill up a message
+MAX_QUEUE_SIZE = 500      # per guild; the oldest entries are dropped past this
+IDLE_TIMEOUT = 300.0      # a guild's worker exits after this long without logs
+
+
+class LogDispatcher:
+    """Queues log embeds per guild and posts them in batches from background workers."""
+
+    def __init__(self, client: discord.Client):
+        self.client = client
+        self.queues = {}   # guild_id -> deque of (channel_id, embed)
+        self.wakeups = {}  # guild_id -> Event set when the queue gets something
+        self.workers = {}  # guild_id -> worker task
+        self.sending = {}  # guild_id -> task posting the batch its worker took off the queue
+        self.stats = {"enqueued": 0, "sent": 0, "messages": 0, "dropped": 0, "overflow": 0}
+
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def enqueue(self, guild_id: int, channel_id: int, embed: discord.Embed):
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            queue = self.queues[guild_id] = deque()
+            self.wakeups[guild_id] = asyncio.Event()
+            self.workers[guild_id] = asyncio.create_task(self._worker(guild_id))
+
+        if len(queue) >= MAX_QUEUE_SIZE:
+            # Under a flood, keep the newest events and count what we shed.
+            queue.popleft()
+            self.stats["overflow"] += 1
+        queue.append((channel_id, embed))
+        self.stats["enqueued"] += 1
+        self.wakeups[guild_id].set()
+
+    def _take_batch(self, queue: deque):
+        """Pops the next run of entries that can share one message."""
+        channel_id, embed = queue.popleft()
+        batch = [embed]
+        size = len(embed)
+        while queue and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            next_channel_id, next_embed = queue[0]
+            if next_channel_id != channel_id or size + len(next_embed) > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            queue.popleft()
+            batch.append(next_embed)
+            size += len(next_embed)
+        return channel_id, batch
+
+    async def _worker(self, guild_id: int):
+        queue = self.queues[guild_id]
+        wakeup = self.wakeups[guild_id]
+        while True:
+            if not queue:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    # wait_for yields once more after timing out, so an entry
+                    # may have been queued in between.
+                    if queue:
+                        continue
+                    del self.queues[guild_id], self.wakeups[guild_id], self.workers[guild_id]
+                    return
+                # Give a burst a moment to fill up a message.
+                if len(queue) < MAX_EMBEDS_PER_MESSAGE:
+                    await asyncio.sleep(FLUSH_INTERVAL)
+            channel_id, batch = self._take_batch(queue)
+            # Shielded, so close() can let a batch that's already off the queue finish.
+            send = self.sending[guild_id] = asyncio.create_task(self._send(guild_id, channel_id, batch))
+            await asyncio.shield(send)
+            del self.sending[guild_id]
+
+    async def _send(self, guild_id: int, channel_id: int, embeds: list):
+        log_channel = self.client.get_channel(channel_id)
+        if not log_channel:
+            self.stats["dropped"] += len(embeds)
+            return
+        try:
+            await log_channel.send(embeds=embeds)
+            self.stats["sent"] += len(embeds)
+            self.stats["messages"] += 1
+        except discord.Forbidden:
+            self.stats["dropped"] += len(embeds)
+            print(f"ERROR: Missing permissions to send to log channel {channel_id} in guild {guild_id}")
+        except Exception as e:
+            self.stats["dropped"] += len(embeds)
+            print(f"ERROR: Could not send log message: {e}")
+
+    async def close(self):
+        """Stops the workers and sends whatever is still queued."""
+        workers = list(self.workers.values())
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # Batches the workers were posting go out before what's left behind them.
+        await asyncio.gather(*self.sending.values(), return_exceptions=True)
+        for guild_id, queue in self.queues.items():
+            while queue:
+                channel_id, batch = self._take_batch(queue)
+                await self._send(guild_id, channel_id, batch)
+        self.queues.clear()
+        self.wakeups.clear()
+        self.workers.clear()
+        self.sending.clear()
+
+
+_dispatcher = None
+
+
+def get_log_dispatcher(client: discord.Client) -> LogDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = LogDispatcher(client)
+        metrics.gauge("log_queue_depth", _dispatcher.queue_depth)
+        for name in _dispatcher.stats:
+            metrics.gauge(f"log_embeds_{name}", lambda name=name: _dispatcher.stats[name] if _dispatcher else 0)
+    return _dispatcher
+
+
+async def close_log_dispatcher():
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.close()
+        _dispatcher = None
+
 
 async def send_log(interaction: discord.Interaction, embed: discord.Embed):
-    """A centralized function to send embeds to the server's log channel."""
-    guild_data = get_guild_data(interaction.guild_id)
+    """A centralized function to queue embeds for the server's log channel."""
+    guild_data = await get_guild_data(interaction.guild_id)
     log_channel_id = guild_data["settings"].get("log_channel")
 
     if not log_channel_id:
         return
 
-    log_channel = interaction.client.get_channel(log_channel_id)
-    if log_channel:
-        try:
-            await log_channel.send(embed=embed)
-        except discord.Forbidden:
-            print(f"ERROR: Missing permissions to send to log channel {log_channel_id} in guild {interaction.guild_id}")
-        except Exception as e:
-            print(f"ERROR: Could not send log message: {e}")
\ No newline at end of file
+    get_log_dispatcher(interaction.client).enqueue(interaction.guild_id, log_channel_id, embed)
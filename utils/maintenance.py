@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import asyncio
+from datetime import datetime, timedelta, timezone
+from . import database
+from .database import get_db_connection, run_read, run_write
+from .data_manager import flush_pending
+from .metrics import metrics
+
+# Maintenance runs once a day by default, starting a little while after login.
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL_HOURS", "24")) * 3600
+FIRST_RUN_DELAY = 15 * 60
+
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))  # newest backups kept, 0 disables backups
+
+ARCHIVE_BATCH_SIZE = 500      # rows moved per transaction, so other writes can slot in between
+VACUUM_STEP_PAGES = 256       # pages released per PRAGMA incremental_vacuum step
+BACKUP_STEP_PAGES = 1024      # pages copied per backup step (4 MB with the default page size)
+BACKUP_STEP_SLEEP = 0.01      # pause between backup steps, the source is unlocked meanwhile
+BACKUP_MAX_RESTARTS = 3       # steps restart when another connection writes; after this many, copy in one go
+
+# Per-guild settings keys: days to keep rows, unset (None) keeps them forever
+RETENTION_SETTINGS = {
+    "warnings": "warning_retention_days",
+    "confessions": "confession_retention_days",
+}
+
+
+class _BackupInterrupted(Exception):
+    pass
+
+
+# --- Database jobs (run on the writer/reader threads) ---
+
+def _retention_policies(conn) -> list:
+    """(guild_id, table, days) for every guild that set a retention period."""
+    policies = []
+    for table, key in RETENTION_SETTINGS.items():
+        rows = conn.execute(
+            f"SELECT guild_id, json_extract(settings, '$.{key}') AS days FROM guild_settings "
+            f"WHERE json_extract(settings, '$.{key}') > 0"
+        ).fetchall()
+        policies.extend((row["guild_id"], table, row["days"]) for row in rows)
+    return policies
+
+
+def _archive_batch(conn, table: str, guild_id: int, cutoff: str) -> int:
+    """Moves up to ARCHIVE_BATCH_SIZE of a guild's rows older than `cutoff` into one archive chunk."""
+    # Confessions still waiting to be posted are never archived.
+    pending = " AND posted = 1" if table == "confessions" else ""
+    rows = conn.execute(
+        f"SELECT rowid, * FROM {table} WHERE guild_id = ? AND timestamp < ?{pending} ORDER BY timestamp LIMIT ?",
+        (guild_id, cutoff, ARCHIVE_BATCH_SIZE)
+    ).fetchall()
+    if not rows:
+        return 0
+
+    records = [{key: row[key] for key in row.keys() if key != "rowid"} for row in rows]
+    payload = zlib.compress(json.dumps(records, separators=(",", ":")).encode(), 9)
+    conn.execute(
+        "INSERT INTO archive (source, guild_id, row_count, first_timestamp, last_timestamp, payload) VALUES (?, ?, ?, ?, ?, ?)",
+        (table, guild_id, len(rows), rows[0]["timestamp"], rows[-1]["timestamp"], payload)
+    )
+    conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", ((row["rowid"],) for row in rows))
+    return len(rows)
+
+
+def _free_pages(conn) -> int:
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def _vacuum_step(conn) -> int:
+    """Releases up to VACUUM_STEP_PAGES free pages; returns how many are left."""
+    conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+    return _free_pages(conn)
+
+
+def iter_archive(conn, guild_id: int, source: str):
+    """Yields every archived row of one kind for a guild, oldest first, one chunk in memory at a time."""
+    cursor = conn.execute(
+        "SELECT payload FROM archive WHERE guild_id = ? AND source = ? ORDER BY archive_id",
+        (guild_id, source)
+    )
+    for chunk in cursor:
+        yield from json.loads(zlib.decompress(chunk["payload"]))
+
+
+class MaintenanceScheduler:
+    """Archives expired rows, compacts the file and takes an online backup on a schedule.
+
+    Every step runs off the event loop in small pieces: archiving one batch per
+    write transaction, vacuuming a few pages at a time and backing up through
+    SQLite's backup API in steps, so commands keep being served throughout.
+    """
+
+    def __init__(self):
+        self.task = None
+        self.running = None  # the maintenance pass in progress, if any
+        self.backup_future = None
+        self.stopping = False
+        self.stats = {"runs": 0, "rows_archived": 0, "pages_vacuumed": 0, "backups": 0, "last_run_seconds": 0.0}
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        await asyncio.sleep(FIRST_RUN_DELAY)
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"ERROR: Database maintenance failed: {e}")
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+
+    async def run_once(self, backup: bool = True) -> dict:
+        """Runs one full pass; a second caller just waits for the pass already running."""
+        if self.running is None:
+            self.running = asyncio.ensure_future(self._run(backup))
+            self.running.add_done_callback(lambda _: setattr(self, "running", None))
+        return await asyncio.shield(self.running)
+
+    async def _run(self, backup: bool) -> dict:
+        started = time.perf_counter()
+        report = {"archived": await self.archive_expired(), "vacuumed": await self.vacuum()}
+        if backup and BACKUP_KEEP > 0:
+            report["backup"] = await self.backup()
+        self.stats["runs"] += 1
+        self.stats["last_run_seconds"] = time.perf_counter() - started
+        print(f"Database maintenance done in {self.stats['last_run_seconds']:.1f}s: {report}")
+        return report
+
+    # --- Retention ---
+
+    async def archive_expired(self) -> int:
+        # Retention changes still sitting in the write-behind cache count too.
+        await flush_pending()
+        now = datetime.now(timezone.utc)
+        archived = 0
+        for guild_id, table, days in await run_read(_retention_policies):
+            cutoff = (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+            while not self.stopping:
+                moved = await run_write(_archive_batch, table, guild_id, cutoff)
+                archived += moved
+                if moved < ARCHIVE_BATCH_SIZE:
+                    break
+        self.stats["rows_archived"] += archived
+        return archived
+
+    # --- Compaction ---
+
+    async def vacuum(self) -> int:
+        before = remaining = await run_read(_free_pages)
+        while remaining and not self.stopping:
+            left = await run_write(_vacuum_step)
+            if left >= remaining:
+                break  # not in incremental mode, nothing more to gain
+            remaining = left
+        self.stats["pages_vacuumed"] += before - remaining
+        return before - remaining
+
+    # --- Backups ---
+
+    async def backup(self) -> str:
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        path = os.path.join(BACKUP_DIR, f"database-{datetime.now():%Y%m%d-%H%M%S}.db")
+        loop = asyncio.get_running_loop()
+        # Shielded, so a cancelled pass still waits for the copy thread in close().
+        self.backup_future = loop.run_in_executor(None, self._backup_to, path)
+        await asyncio.shield(self.backup_future)
+        self.backup_future = None
+        self.stats["backups"] += 1
+        self._prune_backups()
+        return path
+
+    def _backup_to(self, path: str):
+        source = get_db_connection()
+        partial = path + ".partial"
+        target = sqlite3.connect(partial)
+        last_remaining = None
+        restarts = 0
+
+        def progress(status, remaining, total):
+            nonlocal last_remaining, restarts
+            if self.stopping:
+                raise _BackupInterrupted("shutting down")
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > BACKUP_MAX_RESTARTS:
+                    raise _BackupInterrupted("too many restarts")
+            last_remaining = remaining
+
+        try:
+            try:
+                source.backup(target, pages=BACKUP_STEP_PAGES, progress=progress, sleep=BACKUP_STEP_SLEEP)
+            except _BackupInterrupted:
+                if self.stopping:
+                    raise
+                # Writes keep restarting the stepped copy; a single step holds a WAL
+                # read snapshot instead, which doesn't block writers either.
+                source.backup(target)
+        except BaseException:
+            target.close()
+            os.remove(partial)
+            raise
+        finally:
+            source.close()
+        target.close()
+        os.replace(partial, path)
+
+    def _prune_backups(self):
+        backups = sorted(name for name in os.listdir(BACKUP_DIR) if name.startswith("database-") and name.endswith(".db"))
+        for name in backups[:-BACKUP_KEEP]:
+            os.remove(os.path.join(BACKUP_DIR, name))
+
+    async def close(self):
+        self.stopping = True
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        if self.running is not None:
+            await asyncio.gather(self.running, return_exceptions=True)
+        if self.backup_future is not None:
+            await asyncio.gather(self.backup_future, return_exceptions=True)
+
+
+_scheduler = None
+
+
+def get_maintenance() -> MaintenanceScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = MaintenanceScheduler()
+        for name in _scheduler.stats:
+            metrics.gauge(f"maintenance_{name}", lambda name=name: _scheduler.stats[name] if _scheduler else 0)
+    return _scheduler
+
+
+async def close_maintenance():
+    global _scheduler
+    if _scheduler is not None:
+        await _scheduler.close()
+        _scheduler = None
+
+
+# Run one pass by hand (e.g. from cron): python -m utils.maintenance [--no-backup]
+if __name__ == "__main__":
+    import sys
+
+    async def _main():
+        database.initialize_database()
+        try:
+            await get_maintenance().run_once(backup="--no-backup" not in sys.argv)
+        finally:
+            await close_maintenance()
+            database.close_database()
+
+    asyncio.run(_main())
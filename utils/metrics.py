@@ -0,0 +1,164 @@
+import time
+import asyncio
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds (seconds) for latency histograms; anything slower lands in +Inf.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by interpolating inside the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+                upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return LATENCY_BUCKETS[-1]
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _format_labels(key: tuple, le: str = None) -> str:
+    if le is not None:
+        key = key + (("le", le),)
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """Counters, latency histograms and pull-based gauges, cheap enough to leave on."""
+
+    def __init__(self):
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.counters = {}    # (name, labels) -> number
+        self.gauges = {}      # name -> zero-argument callable
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _label_key(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, _label_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def gauge(self, name: str, read):
+        """Registers a callable that is read whenever metrics are exported."""
+        self.gauges[name] = read
+
+    @contextmanager
+    def track(self, name: str, **labels):
+        """Times a block into `name` and counts `<name minus _seconds>_errors_total` if it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name.removesuffix('_seconds')}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name: str, **labels):
+        """Decorator version of track() for coroutine functions such as UI callbacks."""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.track(name, **labels):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def series(self, name: str) -> dict:
+        """All histograms recorded under a metric name, keyed by their label dict's items."""
+        return {labels: histogram for (metric, labels), histogram in self.histograms.items() if metric == name}
+
+    def counter_value(self, name: str, **labels) -> float:
+        return self.counters.get((name, _label_key(labels)), 0)
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in self.series(name).items():
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels, str(bound))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, '+Inf')} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in self.counters.items():
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name, read in sorted(self.gauges.items()):
+            try:
+                value = read()
+            except Exception:
+                continue
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+# --- Local scrape endpoint ---
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain the headers; we don't need any of them.
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        if request_line.split(b" ")[1:2] == [b"/metrics"]:
+            body = metrics.render_prometheus().encode()
+            status = "200 OK"
+        else:
+            body = b"Not found\n"
+            status = "404 Not Found"
+        writer.write(
+            f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str = "127.0.0.1", port: int = 9108):
+    """Serves GET /metrics in the Prometheus text format."""
+    server = await asyncio.start_server(_handle_scrape, host, port)
+    print(f"Metrics available at http://{host}:{port}/metrics")
+    return server
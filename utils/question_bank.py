@@ -0,0 +1,132 @@
+import os
+import json
+import random
+import asyncio
+from collections import deque
+from .database import execute_many, fetch_all
+
+# The old flat-file library; imported into the questions table once.
+LEGACY_QUESTIONS_FILE = "questions.json"
+QUESTION_TYPES = ("truths", "dares")
+RATINGS = ("pg", "pg13", "r")
+
+PREFETCH_SIZE = 5         # fresh upstream questions kept ready per type/rating
+REFILL_INTERVAL = 2.0     # pause between upstream fetches while refilling
+RETRY_INTERVAL = 30.0     # pause after the upstream failed
+
+
+def _read_legacy_file(path: str):
+    with open(path, 'r') as f:
+        content = f.read()
+    data = json.loads(content) if content else {}
+    return [
+        (question_type, rating, question)
+        for question_type, ratings in data.items()
+        for rating, questions in ratings.items()
+        for question in questions
+    ]
+
+
+class QuestionBank:
+    """All known truth/dare questions, held in memory and appended to the database."""
+
+    def __init__(self):
+        self.questions = {}  # (question_type, rating) -> list of questions
+        self.seen = {}       # (question_type, rating) -> set of the same questions
+        self.buffers = {}    # (question_type, rating) -> deque of fresh, not yet served questions
+        self.pending = []    # new questions not yet written to the database
+        self.needs_refill = asyncio.Event()
+        self.loaded = False
+
+    async def load(self):
+        if os.path.exists(LEGACY_QUESTIONS_FILE):
+            loop = asyncio.get_running_loop()
+            legacy = await loop.run_in_executor(None, _read_legacy_file, LEGACY_QUESTIONS_FILE)
+            await execute_many("INSERT OR IGNORE INTO questions (question_type, rating, question) VALUES (?, ?, ?)", legacy)
+            os.replace(LEGACY_QUESTIONS_FILE, LEGACY_QUESTIONS_FILE + ".imported")
+            print(f"Imported {len(legacy)} questions from {LEGACY_QUESTIONS_FILE}.")
+
+        rows = await fetch_all("SELECT question_type, rating, question FROM questions ORDER BY rowid")
+        for row in rows:
+            self._remember(row["question_type"], row["rating"], row["question"])
+        self.loaded = True
+        self.needs_refill.set()
+
+    def _remember(self, question_type: str, rating: str, question: str) -> bool:
+        key = (question_type, rating)
+        seen = self.seen.setdefault(key, set())
+        if question in seen:
+            return False
+        seen.add(question)
+        self.questions.setdefault(key, []).append(question)
+        return True
+
+    def add(self, question_type: str, rating: str, question: str) -> bool:
+        """Adds a question unless it is already known. Returns True if it was new."""
+        if not self._remember(question_type, rating, question):
+            return False
+        self.pending.append((question_type, rating, question))
+        return True
+
+    async def persist_pending(self):
+        """Appends newly learned questions to the database in one batch."""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        try:
+            await execute_many("INSERT OR IGNORE INTO questions (question_type, rating, question) VALUES (?, ?, ?)", batch)
+        except Exception as e:
+            print(f"ERROR: Could not save questions: {e}")
+            self.pending = batch + self.pending
+
+    def next_question(self, question_type: str, rating: str):
+        """A fresh prefetched question if one is ready, otherwise a random known one."""
+        key = (question_type, rating)
+        buffer = self.buffers.get(key)
+        if buffer:
+            question = buffer.popleft()
+            self.needs_refill.set()
+            return question
+        known = self.questions.get(key)
+        return random.choice(known) if known else None
+
+    def _low_buffers(self):
+        return [
+            (question_type, rating)
+            for question_type in QUESTION_TYPES
+            for rating in RATINGS
+            if len(self.buffers.get((question_type, rating), ())) < PREFETCH_SIZE
+        ]
+
+    async def refill_forever(self, fetch_question):
+        """Background task: keeps every buffer topped up using fetch_question(type, rating)."""
+        while True:
+            await self.needs_refill.wait()
+            self.needs_refill.clear()
+            for question_type, rating in self._low_buffers():
+                try:
+                    question = await fetch_question(question_type, rating)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Could not prefetch a {rating} {question_type[:-1]}: {e}")
+                    await asyncio.sleep(RETRY_INTERVAL)
+                    self.needs_refill.set()
+                    break
+                if question:
+                    self.add(question_type, rating, question)
+                    self.buffers.setdefault((question_type, rating), deque()).append(question)
+                    if self._low_buffers():
+                        self.needs_refill.set()
+                await asyncio.sleep(REFILL_INTERVAL)
+            await self.persist_pending()
+
+
+_bank = None
+
+
+def get_question_bank() -> QuestionBank:
+    global _bank
+    if _bank is None:
+        _bank = QuestionBank()
+    return _bank
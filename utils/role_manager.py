@@ -0,0 +1,46 @@
+import asyncio
+import discord
+
+# How many member edits a bulk operation keeps in flight at once.
+BULK_CONCURRENCY = 5
+
+
+def can_manage(role: discord.Role) -> bool:
+    """Whether the bot is able to hand out or take away this role."""
+    return not role.is_default() and not role.managed and role.is_assignable()
+
+
+async def apply_role_changes(member: discord.Member, add=(), remove=(), reason: str = None) -> bool:
+    """Applies a whole role diff to a member with a single member edit.
+
+    Returns False when the member already had exactly the requested roles.
+    """
+    remove_ids = {role.id for role in remove}
+    current = [role for role in member.roles if not role.is_default()]
+    current_ids = {role.id for role in current}
+
+    new_roles = [role for role in current if role.id not in remove_ids]
+    new_roles += [role for role in add if role.id not in current_ids]
+    if {role.id for role in new_roles} == current_ids:
+        return False
+
+    await member.edit(roles=new_roles, reason=reason)
+    return True
+
+
+async def bulk_add_role(members, role: discord.Role, reason: str = None):
+    """Gives `role` to every member that lacks it. Returns (changed, failed) counts."""
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+    changed = failed = 0
+
+    async def assign(member: discord.Member):
+        nonlocal changed, failed
+        async with semaphore:
+            try:
+                if await apply_role_changes(member, add=[role], reason=reason):
+                    changed += 1
+            except discord.HTTPException:
+                failed += 1
+
+    await asyncio.gather(*(assign(member) for member in members if role not in member.roles))
+    return changed, failed
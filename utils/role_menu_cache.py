@@ -0,0 +1,76 @@
+import discord
+from collections import OrderedDict
+from .data_manager import get_guild_data, save_data
+
+# Discord allows at most 25 options in one select menu.
+OPTIONS_PER_SELECT = 25
+MAX_CACHED_GUILDS = 1000
+
+# guild_id -> {category: [pages of SelectOption]}; the "categories" menu lives under None.
+_menus = OrderedDict()
+
+
+def _paginate(options: list) -> list:
+    return [options[i:i + OPTIONS_PER_SELECT] for i in range(0, len(options), OPTIONS_PER_SELECT)]
+
+
+def _store(guild_id: int, category, pages: list):
+    menus = _menus.setdefault(guild_id, {})
+    menus[category] = pages
+    _menus.move_to_end(guild_id)
+    while len(_menus) > MAX_CACHED_GUILDS:
+        _menus.popitem(last=False)
+
+
+def _lookup(guild_id: int, category):
+    menus = _menus.get(guild_id)
+    if menus is None or category not in menus:
+        return None
+    _menus.move_to_end(guild_id)
+    return menus[category]
+
+
+def invalidate(guild_id: int):
+    """Forgets every prebuilt menu for a guild (role edits, admin changes, ...)."""
+    _menus.pop(guild_id, None)
+
+
+async def get_category_pages(guild_id: int) -> list:
+    """Pages of options for the category picker."""
+    pages = _lookup(guild_id, None)
+    if pages is None:
+        guild_data = await get_guild_data(guild_id)
+        options = [discord.SelectOption(label=category) for category in guild_data.get("roles", {})]
+        pages = _paginate(options)
+        _store(guild_id, None, pages)
+    return pages
+
+
+async def get_role_pages(guild: discord.Guild, category: str) -> list:
+    """Pages of options for one category's roles, with deleted roles pruned from the config."""
+    pages = _lookup(guild.id, category)
+    if pages is not None:
+        return pages
+
+    guild_data = await get_guild_data(guild.id)
+    role_ids = guild_data["roles"].get(category, [])
+    live_ids = []
+    options = []
+    for role_id in role_ids:
+        role = guild.get_role(int(role_id))
+        if role:
+            live_ids.append(role_id)
+            options.append(discord.SelectOption(
+                label=role.name,
+                value=str(role.id),
+                description="Select to add or remove this role."
+            ))
+
+    # Only trust a missing role while the guild is actually available.
+    if len(live_ids) != len(role_ids) and not guild.unavailable and category in guild_data["roles"]:
+        guild_data["roles"][category] = live_ids
+        save_data(guild.id)
+
+    pages = _paginate(options)
+    _store(guild.id, category, pages)
+    return pages
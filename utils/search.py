@@ -0,0 +1,143 @@
+import re
+import discord
+from discord.ui import View
+from .database import run_read, SEARCH_INDEXES
+
+RESULTS_PER_PAGE = 5
+MAX_COUNTED_RESULTS = 1000  # past this we just say "1000+", counting every match isn't worth it
+RANK_WINDOW = 2000          # only the newest matches are ranked, so common words stay fast
+SNIPPET_TOKENS = 24
+
+_QUERY_TERMS = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def build_match_query(guild_id: int, text: str, column: str):
+    """Turns what a moderator typed into a safe FTS5 query limited to one guild.
+
+    Every word must match (stemmed, case-insensitive), "quoted words" must
+    appear together and a trailing * matches any ending. Returns None if there is
+    nothing to search for.
+    """
+    terms = []
+    for phrase, word in _QUERY_TERMS.findall(text):
+        prefix = bool(word) and word.endswith("*")
+        term = (phrase or word).strip("*").replace('"', '""').strip()
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    if not terms:
+        return None
+    return f'guild_id : "{guild_id}" AND {column} : ({" AND ".join(terms)})'
+
+
+# --- Database jobs (run on the reader threads) ---
+
+def _search(conn, table: str, match: str, offset: int):
+    """Returns (total, rows) for one page of results, best match first."""
+    fts = f"{table}_fts"
+    # Unposted confessions aren't public yet. The filter is a join checked after
+    # the MATCH: as a `rowid IN (...)` constraint FTS5 would run one index lookup
+    # per posted confession instead. CROSS JOIN keeps the FTS table as the outer loop.
+    if table == "confessions":
+        source = f"{fts} CROSS JOIN {table} AS c ON c.rowid = {fts}.rowid"
+        visible = " AND c.posted = 1"
+    else:
+        source, visible = fts, ""
+    # Rank on rowids alone first: snippets are only worth building for the one page
+    # shown. FTS5 walks matches newest first for free, bm25 is what costs.
+    page = [row[0] for row in conn.execute(
+        f"SELECT rowid FROM (SELECT {fts}.rowid AS rowid, bm25({fts}, 0.0, 1.0) AS score FROM {source} "
+        f"WHERE {fts} MATCH ?{visible} ORDER BY {fts}.rowid DESC LIMIT ?) ORDER BY score, rowid DESC LIMIT ? OFFSET ?",
+        (match, RANK_WINDOW, RESULTS_PER_PAGE, offset)
+    )]
+    if not page:
+        return 0, []
+
+    placeholders = ", ".join("?" * len(page))
+    snippets = dict(conn.execute(
+        f"SELECT rowid, snippet({fts}, 1, '**', '**', '…', {SNIPPET_TOKENS}) FROM {fts} WHERE {fts} MATCH ? AND rowid IN ({placeholders})",
+        (match, *page)
+    ).fetchall())
+    extra = ", user_id, moderator_id" if table == "warnings" else ""
+    details = {row["rowid"]: row for row in conn.execute(
+        f"SELECT rowid, short_id, timestamp{extra} FROM {table} WHERE rowid IN ({placeholders})", page
+    )}
+    rows = [{**dict(details[rowid]), "snippet": snippets.get(rowid, "")} for rowid in page if rowid in details]
+
+    total = conn.execute(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM {source} WHERE {fts} MATCH ?{visible} LIMIT ?)",
+        (match, MAX_COUNTED_RESULTS + 1)
+    ).fetchone()[0] if offset == 0 else None
+    return total, rows
+
+
+async def search(table: str, match: str, offset: int = 0):
+    return await run_read(_search, table, match, offset)
+
+
+class SearchPaginator(View):
+    """Pages through ranked search results, RESULTS_PER_PAGE at a time."""
+
+    def __init__(self, interaction: discord.Interaction, table: str, query: str, match: str, total: int, rows, format_row):
+        super().__init__(timeout=180.0)
+        self.moderator_id = interaction.user.id
+        self.table = table
+        self.query = query
+        self.match = match
+        self.total = total
+        self.rows = rows
+        self.format_row = format_row  # row -> (field name, field value)
+        self.page = 0
+        self.update_buttons()
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-min(self.total, MAX_COUNTED_RESULTS) // RESULTS_PER_PAGE))
+
+    def update_buttons(self):
+        self.previous_button.disabled = self.page == 0
+        self.next_button.disabled = self.page + 1 >= self.page_count
+
+    def build_embed(self) -> discord.Embed:
+        total = f"{MAX_COUNTED_RESULTS}+" if self.total > MAX_COUNTED_RESULTS else str(self.total)
+        embed = discord.Embed(title=f"Search {self.table}: {self.query}"[:256], color=discord.Color.blurple())
+        for row in self.rows:
+            name, value = self.format_row(row)
+            embed.add_field(name=name, value=value[:1024], inline=False)
+        embed.set_footer(text=f"{total} result(s), best matches first • Page {self.page + 1} of {self.page_count}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.moderator_id:
+            await interaction.response.send_message("Only the moderator who ran this search can page through it.", ephemeral=True)
+            return False
+        return True
+
+    async def turn_page(self, interaction: discord.Interaction, step: int):
+        page = self.page + step
+        _, rows = await search(self.table, self.match, page * RESULTS_PER_PAGE)
+        if rows:
+            self.page, self.rows = page, rows
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn_page(interaction, -1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn_page(interaction, 1)
+
+
+async def send_search_results(interaction: discord.Interaction, table: str, query: str, format_row):
+    """Runs a guild-scoped search and answers the (deferred) interaction with the first page."""
+    match = build_match_query(interaction.guild_id, query, SEARCH_INDEXES[table])
+    if match is None:
+        await interaction.followup.send("Give me at least one word to search for.", ephemeral=True)
+        return
+    total, rows = await search(table, match)
+    if not rows:
+        await interaction.followup.send(f"No {table} match `{query}`.", ephemeral=True)
+        return
+    view = SearchPaginator(interaction, table, query, match, total, rows, format_row)
+    await interaction.followup.send(embed=view.build_embed(), view=view if total > RESULTS_PER_PAGE else discord.utils.MISSING, ephemeral=True)
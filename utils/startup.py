@@ -0,0 +1,36 @@
+import time
+from contextlib import contextmanager
+
+# Measured from when this module is first imported, i.e. right at process start.
+PROCESS_STARTED = time.perf_counter()
+
+
+class StartupReport:
+    """Records how long each startup phase took and prints them as a table."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []  # (name, seconds, status)
+
+    def record(self, name: str, seconds: float, status: str = "ok"):
+        self.phases.append((name, seconds, status))
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.record(name, time.perf_counter() - started, f"failed: {e}")
+            raise
+        self.record(name, time.perf_counter() - started)
+
+    def render(self) -> str:
+        width = max([len(name) for name, _, _ in self.phases] + [len("since process start")])
+        lines = ["--- Startup report ---", f"{'phase':<{width}}  {'time':>9}  status"]
+        for name, seconds, status in self.phases:
+            lines.append(f"{name:<{width}}  {seconds * 1000:>7.1f}ms  {status}")
+        total = time.perf_counter() - self.started
+        lines.append(f"{'setup total':<{width}}  {total * 1000:>7.1f}ms")
+        lines.append(f"{'since process start':<{width}}  {(time.perf_counter() - PROCESS_STARTED) * 1000:>7.1f}ms")
+        return "\n".join(lines)